@@ -0,0 +1,156 @@
+# Offline crawl benchmark: replays a synthetic registry (see
+# sayari_graph_scraping/synthetic_registry.py) through the spider, then the
+# crawled data lake through SayariGraphScrapingPipeline and postprocess.py.
+# Every stage runs in its own process, reports wall time, items/sec,
+# edges/sec and peak RSS. Nothing touches the network or output/.
+# Run from root directory: python experiments/crawl_benchmark.py --businesses 100000
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+
+
+def run_stage(name, command, cwd=root_path):
+    """
+    Run one stage in a child process. Returns wall seconds and peak RSS (MB).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd)
+    _, status, rusage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"{name} stage failed: {' '.join(command)}")
+    return seconds, rusage.ru_maxrss / 1024
+
+
+def count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def pipeline_stage(lake_path, output_dir, timings_path):
+    """
+    Child process of the pipeline stage: replay the data lake through the
+    pipeline the way the crawl does, timing process_item and close_spider.
+    """
+    from sayari_graph_scraping.data_lake import iter_latest_records
+    from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+    logging.disable(logging.WARNING)  # data quality warnings are not what is measured
+    pipeline = SayariGraphScrapingPipeline(output_dir=output_dir, docs_dir=output_dir, render_mode="off")
+    pipeline.open_spider(None)
+    items = list(iter_latest_records(lake_path))
+    start = time.perf_counter()
+    for item in items:
+        pipeline.process_item(item, None)
+    process_seconds = time.perf_counter() - start
+    num_edges = pipeline.graph.num_edges
+    start = time.perf_counter()
+    pipeline.close_spider(None)
+    close_seconds = time.perf_counter() - start
+    with open(timings_path, "w") as f:
+        json.dump(
+            {"items": len(items), "edges": num_edges, "process_item": process_seconds, "close_spider": close_seconds},
+            f,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline crawl, pipeline and postprocess benchmark.")
+    parser.add_argument("--businesses", type=int, default=100000)
+    parser.add_argument("--work-dir", default=os.path.join("/tmp", "sayari_crawl_benchmark"))
+    parser.add_argument("--regenerate", action="store_true", help="Write the synthetic archive again.")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra Scrapy setting for the spider stage, ex. --set CONCURRENT_REQUESTS=64.")
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file.")
+    parser.add_argument("--pipeline-stage", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.pipeline_stage:
+        pipeline_stage(*args.pipeline_stage)
+        return
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    archive_path = os.path.join(work_dir, f"registry_{args.businesses}.sqlite")
+    lake_path = os.path.join(work_dir, "company_records.jsonl")
+    report = {"businesses": args.businesses}
+
+    if args.regenerate or not os.path.exists(archive_path):
+        for path in (archive_path, archive_path + "-wal", archive_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        seconds, rss = run_stage("generate", [
+            sys.executable, "-m", "sayari_graph_scraping.synthetic_registry",
+            "--businesses", str(args.businesses), "--archive", archive_path,
+        ])
+        report["generate"] = {"seconds": seconds, "peak_rss_mb": rss}
+
+    # Spider: replay only, pipelines off so the stage measures the crawl itself
+    settings = {
+        "HTTP_ARCHIVE_MODE": "replay",
+        "HTTP_ARCHIVE_PATH": archive_path,
+        "ITEM_PIPELINES": "{}",
+        "FEEDS": json.dumps({lake_path: {"format": "jsonl", "overwrite": True}}),
+        "LOG_FILE": os.path.join(work_dir, "spider.log"),
+        "LOG_LEVEL": "INFO",
+        "CRAWL_STATE_PATH": os.path.join(work_dir, "crawl_state.sqlite"),
+        "DRAWER_SEEN_SET_PATH": os.path.join(work_dir, "drawer_seen.npy"),
+        "SEARCH_SHARD_RESUME": "False",
+        "INCREMENTAL_CRAWL_ENABLED": "False",
+    }
+    settings.update(setting.split("=", 1) for setting in args.set)
+    command = [sys.executable, "-m", "scrapy", "crawl", "business_spider"]
+    for name, value in settings.items():
+        command += ["-s", f"{name}={value}"]
+    seconds, rss = run_stage("spider", command)
+    items = count_lines(lake_path)
+    report["spider"] = {"seconds": seconds, "items": items, "items_per_sec": items / seconds, "peak_rss_mb": rss}
+
+    timings_path = os.path.join(work_dir, "pipeline_timings.json")
+    pipeline_dir = os.path.join(work_dir, "pipeline")
+    seconds, rss = run_stage("pipeline", [
+        sys.executable, os.path.abspath(__file__), "--pipeline-stage", lake_path, pipeline_dir, timings_path,
+    ])
+    with open(timings_path) as f:
+        timings = json.load(f)
+    report["pipeline"] = {
+        "seconds": seconds,
+        "items_per_sec": timings["items"] / timings["process_item"],
+        "edges_per_sec": timings["edges"] / timings["process_item"],
+        "process_item_seconds": timings["process_item"],
+        "close_spider_seconds": timings["close_spider"],
+        "edges": timings["edges"],
+        "peak_rss_mb": rss,
+    }
+
+    postprocess_dir = os.path.join(work_dir, "postprocess")
+    os.makedirs(postprocess_dir, exist_ok=True)
+    seconds, rss = run_stage("postprocess", [
+        sys.executable, os.path.join(root_path, "sayari_graph_scraping", "postprocess.py"),
+        "--input", lake_path, "--output-dir", postprocess_dir, "--render", "off",
+    ])
+    report["postprocess"] = {
+        "seconds": seconds,
+        "items_per_sec": items / seconds,
+        "edges_per_sec": timings["edges"] / seconds,
+        "peak_rss_mb": rss,
+    }
+
+    for stage in ("generate", "spider", "pipeline", "postprocess"):
+        if stage in report:
+            print(f"{stage:12s} " + "  ".join(
+                f"{key} {value:,.1f}" for key, value in report[stage].items()
+            ))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
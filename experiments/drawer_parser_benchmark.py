@@ -0,0 +1,27 @@
+# Micro-benchmark: per-item cost of SayariGraphScrapingPipeline.write_to_knowledge_graph,
+# the part of process_item that runs on the reactor thread for every item.
+# Run from root directory: python experiments/drawer_parser_benchmark.py
+import json
+import logging
+import os
+import sys
+import timeit
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)  # data quality warnings are not what is measured
+    with open(os.path.join(root_path, "output", "company_records.jsonl")) as f:
+        items = [json.loads(line) for line in f]
+    pipeline = SayariGraphScrapingPipeline(render_mode="off")
+
+    def run():
+        pipeline.graph.clear()
+        for item in items:
+            pipeline.write_to_knowledge_graph(item)
+
+    number = 200
+    seconds = min(timeit.repeat(run, number=number, repeat=5)) / number
+    print(f"write_to_knowledge_graph {seconds / len(items) * 1e6:8.3f} us per item")
@@ -0,0 +1,45 @@
+# Micro-benchmark: per-item field extraction cost, jmespath.search (re-parses the
+# expression on every call) vs compiled extraction rules.
+# Run from root directory: python experiments/extraction_benchmark.py
+import json
+import os
+import sys
+import timeit
+import jmespath
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+from sayari_graph_scraping.extraction import load_extraction_rules
+
+if __name__ == "__main__":
+    with open(os.path.join(root_path, "output", "company_records.jsonl")) as f:
+        items = [json.loads(line) for line in f]
+
+    item_rules = load_extraction_rules()["item"]
+    expressions = ["TITLE[0]", "TITLE[1]", "RECORD_NUM"]
+    compiled_jmespath = [jmespath.compile(expression) for expression in expressions]
+    lowered = [item_rules["company_title"], item_rules["company_type"], item_rules["record_num"]]
+
+    def before():
+        for item in items:
+            for expression in expressions:
+                jmespath.search(expression, item)
+
+    def compiled_only():
+        for item in items:
+            for expression in compiled_jmespath:
+                expression.search(item)
+
+    def after():
+        for item in items:
+            for rule in lowered:
+                rule(item)
+
+    number = 50
+    for name, fn, n in (
+        ("item fields, jmespath.search", before, len(items)),
+        ("item fields, jmespath.compile", compiled_only, len(items)),
+        ("item fields, compiled rules", after, len(items)),
+    ):
+        seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<32} {seconds / n * 1e6:8.3f} us per item")
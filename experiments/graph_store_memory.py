@@ -0,0 +1,59 @@
+# Memory benchmark: graph held as edge lists and a NodeRegistry with eager
+# tooltips (old pipeline format) vs GraphStore.
+# Synthetic registry: 100k companies, 20k agents shared between companies, 2 owners per company.
+# Run from root directory: python experiments/graph_store_memory.py
+import os
+import sys
+import tracemalloc
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+from sayari_graph_scraping.graph_store import COMPANY, ENTITY, GraphStore
+from sayari_graph_scraping.node_registry import COMPANY_TOOLTIP, ENTITY_TOOLTIP, NodeRegistry
+
+NUM_COMPANIES = 100000
+
+
+def relationships():
+    for i in range(NUM_COMPANIES):
+        company = f"X COMPANY {i}"
+        yield company, f"REGISTERED AGENT {i % 20000}", "REGISTERED_AGENT", i
+        yield company, f"OWNER {i}", "OWNER_NAME", i
+        yield company, f"OWNER {i + 1}", "OWNER_NAME", i
+
+
+def old_format():
+    edges, nodes = [], NodeRegistry()
+    for company, entity, relationship, i in relationships():
+        nodes.add(company, {"label": "", "title": COMPANY_TOOLTIP.format(company, "LLC", f"{i:010d}")})
+        nodes.add(entity, {"label": "", "title": ENTITY_TOOLTIP.format(relationship, entity)})
+        edges.append([entity, company, {"label": relationship, "title": relationship}])
+    return edges, nodes
+
+
+def graph_store():
+    graph = GraphStore()
+    for company, entity, relationship, i in relationships():
+        graph.add_node(company, (COMPANY, "LLC", f"{i:010d}"))
+        graph.add_node(entity, (ENTITY, relationship))
+        graph.add_edge(entity, company, relationship)
+    return graph
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+if __name__ == "__main__":
+    num_edges = NUM_COMPANIES * 3
+    for name, build in (("edge lists + NodeRegistry", old_format), ("GraphStore", graph_store)):
+        size = measure(build)
+        print(f"{name:>26}: {size / 2**20:7.1f} MiB total")
+    graph = graph_store()
+    edge_bytes = sum(column.itemsize for column in (graph.src, graph.dst, graph.rel))
+    print(f"GraphStore edge columns: {edge_bytes} bytes per edge ({num_edges} edges)")
@@ -0,0 +1,135 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# AIMD (additive increase, multiplicative decrease) concurrency control, the
+# TCP congestion control scheme applied to in-flight requests. Every round of
+# healthy responses (as many as the limit) adds one request to the limit, 429s,
+# 5xx, timeouts or a p95 latency above target halve it. Signals arriving from
+# requests sent before the last change are ignored, so one burst of 429s only
+# halves the limit once.
+
+
+def percentile(values, q):
+    """
+    Nearest rank percentile of values, None when empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AimdController:
+    """
+    Concurrency limit of one download slot (host). Feed it every response
+    with record(), read the limit back from limit.
+    """
+
+    def __init__(
+        self,
+        concurrency=4,
+        min_concurrency=1,
+        max_concurrency=32,
+        target_latency=2.0,
+        increase=1,
+        decrease_factor=0.5,
+        window=100,
+    ):
+        self.concurrency = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.increase_step = increase
+        self.decrease_factor = decrease_factor
+        self.latencies = deque(maxlen=window)  # last window response latencies
+        # Responses since the last change. Throttling only counts once the
+        # requests in flight at the last change (in_flight_at_change) are
+        # answered, growing waits for a full round at the current limit.
+        self.since_change = 0
+        self.in_flight_at_change = 0
+        self.pause_until = 0.0  # monotonic time, from Retry-After
+        self.responses = 0
+        self.throttled = 0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        return max(self.min_concurrency, int(self.concurrency))
+
+    def p95(self):
+        return percentile(self.latencies, 0.95)
+
+    def record(self, latency, throttled=False, retry_after=None, now=None):
+        """
+        Record one response (latency None for failed downloads). Returns
+        "increase", "decrease" or None.
+        """
+        now = time.monotonic() if now is None else now
+        self.responses += 1
+        self.since_change += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if retry_after:
+            self.pause_until = max(self.pause_until, now + retry_after)
+        if throttled:
+            self.throttled += 1
+            if self.since_change >= self.in_flight_at_change:
+                return self.decrease()
+        elif self.since_change >= self.limit:
+            p95 = self.p95()  # None without latencies, ex. replayed responses
+            if p95 is not None and p95 > self.target_latency:
+                return self.decrease()
+            return self.increase()
+        return None
+
+    def increase(self):
+        self.changed()
+        self.concurrency = min(self.max_concurrency, self.concurrency + self.increase_step)
+        self.increases += 1
+        return "increase"
+
+    def decrease(self):
+        self.changed()
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+        self.decreases += 1
+        return "decrease"
+
+    def changed(self):
+        self.in_flight_at_change = self.limit
+        self.since_change = 0
+
+    def pause_remaining(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.pause_until - now)
+
+    def metrics(self):
+        p95 = self.p95()
+        return {
+            "concurrency": self.limit,
+            "p95_latency_ms": None if p95 is None else round(p95 * 1000),
+            "responses": self.responses,
+            "throttled": self.throttled,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+def parse_retry_after(value, max_seconds=300):
+    """
+    Seconds to wait from a Retry-After header value (seconds or HTTP
+    date), capped at max_seconds. None when missing or unparseable.
+    """
+    if not value:
+        return None
+    value = value.decode("latin-1").strip() if isinstance(value, bytes) else value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), max_seconds)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Search row fields that change without the business changing
+VOLATILE_ROW_FIELDS = ("SORT_INDEX", "ID_key")
+
+
+def content_hash(obj, exclude=()):
+    """
+    Stable hash of JSON data. Keys are sorted so field order
+    returned by the API does not matter.
+    """
+    if isinstance(obj, dict) and exclude:
+        obj = {k: v for k, v in obj.items() if k not in exclude}
+    encoded = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class CrawlStateStore:
+    """
+    On-disk (SQLite) store of crawl progress.
+    - drawers: previously fetched drawers, keyed by business ID. Used by
+      incremental crawls to skip or conditionally revalidate businesses
+      that have not changed since the last run.
+    - shards: search shard (prefix) completion, so an interrupted
+      full-registry crawl resumes at the shard level.
+    """
+
+    def __init__(self, path, commit_every=500):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.commit_every = commit_every
+        self.pending_writes = 0
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS drawers (
+                business_id TEXT PRIMARY KEY,
+                row_hash TEXT,
+                drawer_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS shards (
+                prefix TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                num_rows INTEGER,
+                updated_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, business_id):
+        """
+        Return stored drawer state as a dict, or None if business was never fetched.
+        """
+        row = self.conn.execute(
+            "SELECT row_hash, drawer_hash, etag, last_modified, fetched_at "
+            "FROM drawers WHERE business_id = ?",
+            (str(business_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("row_hash", "drawer_hash", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    @staticmethod
+    def is_fresh(state, row_hash, max_age):
+        """
+        True if search row is unchanged and drawer was fetched within max_age seconds.
+        state is the dict returned by get.
+        """
+        if state is None or state["row_hash"] != row_hash:
+            return False
+        return (time.time() - state["fetched_at"]) < max_age
+
+    def upsert(self, business_id, row_hash, drawer_hash, etag=None, last_modified=None):
+        self.conn.execute(
+            """
+            INSERT INTO drawers (business_id, row_hash, drawer_hash, etag, last_modified, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(business_id) DO UPDATE SET
+                row_hash = excluded.row_hash,
+                drawer_hash = excluded.drawer_hash,
+                etag = COALESCE(excluded.etag, drawers.etag),
+                last_modified = COALESCE(excluded.last_modified, drawers.last_modified),
+                fetched_at = excluded.fetched_at
+            """,
+            (str(business_id), row_hash, drawer_hash, etag, last_modified, time.time()),
+        )
+        self._maybe_commit()
+
+    def touch(self, business_id, row_hash):
+        """
+        Mark business as revalidated without changes.
+        """
+        self.conn.execute(
+            "UPDATE drawers SET row_hash = ?, fetched_at = ? WHERE business_id = ?",
+            (row_hash, time.time(), str(business_id)),
+        )
+        self._maybe_commit()
+
+    def unfinished_shards(self):
+        """
+        Shards scheduled by a previous run that never completed, in prefix order.
+        """
+        rows = self.conn.execute(
+            "SELECT prefix FROM shards WHERE status = 'pending' ORDER BY prefix"
+        ).fetchall()
+        return [prefix for (prefix,) in rows]
+
+    def reset_shards(self):
+        self.conn.execute("DELETE FROM shards")
+        self.conn.commit()
+
+    def mark_shards_pending(self, prefixes):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO shards (prefix, status, updated_at) VALUES (?, 'pending', ?)",
+            [(prefix, now) for prefix in prefixes],
+        )
+        self.conn.commit()
+
+    def mark_shard_done(self, prefix, num_rows):
+        # Commit straight away, shard completion is what resume relies on
+        self.conn.execute(
+            "UPDATE shards SET status = 'done', num_rows = ?, updated_at = ? WHERE prefix = ?",
+            (num_rows, time.time(), prefix),
+        )
+        self.commit()
+
+    def _maybe_commit(self):
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.pending_writes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
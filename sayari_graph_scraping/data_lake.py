@@ -0,0 +1,223 @@
+import hashlib
+import json
+import mmap
+import os
+import random
+
+
+def record_id(record):
+    """
+    Business ID of a data lake record.
+    """
+    return record.get("ID") or record.get("ID_key") or record.get("KEY_ID")
+
+
+def _iter_lines(paths):
+    for path in paths:
+        with open(path) as f:
+            yield from f
+
+
+def iter_latest_records(paths):
+    """
+    Yield data lake records, keeping only the last line written for each business.
+    paths is one JSONL file or a list of JSONL shards, read in order.
+
+    Incremental crawls append changed businesses to the data lake, so the
+    same business can appear more than once. The first pass only remembers
+    the line number of the latest version of each business, the second pass
+    yields those lines in file order.
+    """
+    paths = [paths] if isinstance(paths, str) else paths
+    latest_line = {}
+    for line_num, line in enumerate(_iter_lines(paths)):
+        latest_line[record_id(json.loads(line))] = line_num
+
+    keep = set(latest_line.values())
+    for line_num, line in enumerate(_iter_lines(paths)):
+        if line_num in keep:
+            yield json.loads(line)
+
+
+def line_digest(line):
+    """
+    Short hash of a data lake line (bytes), stored in the sidecar index.
+    """
+    return hashlib.sha1(line).hexdigest()[:16]
+
+
+class DataLakeReader:
+    """
+    Random access to the JSONL data lake through a memory map and a
+    persisted sidecar index of business ID / RECORD_NUM -> (offset, length).
+
+    The sidecar (<lake>.idx) is append-only like the feed: opening the
+    reader (or calling refresh) only indexes lines appended since the last
+    time. When a business appears more than once, the latest line wins.
+    The index is rebuilt when the lake was rewritten (ex. feed overwrite):
+    its first line, or the last indexed line, no longer matches.
+    Single record fetch is a dictionary lookup plus a slice of the map.
+
+    Usage, ex. in a notebook:
+        reader = DataLakeReader("output/company_records.jsonl")
+        reader.get(84218)
+        reader.get_by_record_num("0000084583")
+        reader.sample(5)
+    """
+
+    INDEX_VERSION = "lake_index v2"
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self.offsets = {}  # business id -> (offset, length)
+        self.record_nums = {}  # RECORD_NUM -> business id
+        self.indexed_size = 0
+        self.head_hash = None
+        self.last_line = None  # (offset, length, hash) of the last indexed line
+        self._mmap = None
+        self._file = None
+        self.refresh()
+
+    def _head_hash(self):
+        """
+        Hash of the first line, it changes when the lake is rewritten
+        (ex. feed overwrite) but not when lines are appended.
+        """
+        with open(self.path, "rb") as f:
+            return hashlib.sha1(f.readline()).hexdigest()
+
+    def _load_index(self, head_hash):
+        """
+        Load sidecar index. Returns False if it is missing or stale.
+        """
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path) as f:
+            header = f.readline().rstrip("\n")
+            if header != f"# {self.INDEX_VERSION} {head_hash}":
+                return False
+            for line in f:
+                self._add_entry(*line.rstrip("\n").split("\t"))
+        return self.indexed_size <= os.path.getsize(self.path) and self._tail_matches()
+
+    def _tail_matches(self):
+        """
+        Whether the last indexed line is still in the lake at its offset.
+        A rewritten lake with the same first line fails this check.
+        """
+        if self.last_line is None:
+            return True
+        offset, length, line_hash = self.last_line
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return line_digest(f.read(length)) == line_hash
+
+    def _add_entry(self, business_id, record_num, offset, length, line_hash):
+        offset, length = int(offset), int(length)
+        self.offsets[business_id] = (offset, length)
+        if record_num:
+            self.record_nums[record_num] = business_id
+        if offset + length >= self.indexed_size:
+            self.indexed_size = offset + length
+            self.last_line = (offset, length, line_hash)
+
+    def refresh(self):
+        """
+        Index lines appended to the lake since the last refresh.
+        Partially written last lines are left for the next refresh.
+        """
+        size = os.path.getsize(self.path)
+        head_hash = self._head_hash()
+        if head_hash != self.head_hash or size < self.indexed_size or not self._tail_matches():
+            self.reset_index()
+            if not self._load_index(head_hash):
+                # Missing or stale sidecar, rebuild it
+                self.reset_index()
+                with open(self.index_path, "w") as f:
+                    f.write(f"# {self.INDEX_VERSION} {head_hash}\n")
+            self.head_hash = head_hash
+
+        new_entries = []
+        with open(self.path, "rb") as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    record = json.loads(line)
+                    entry = (
+                        str(record_id(record)),
+                        str(record.get("RECORD_NUM") or ""),
+                        offset,
+                        len(line),
+                        line_digest(line),
+                    )
+                    self._add_entry(*entry)
+                    new_entries.append(entry)
+                offset += len(line)
+                self.indexed_size = offset
+
+        if new_entries:
+            with open(self.index_path, "a") as f:
+                f.writelines("\t".join(map(str, entry)) + "\n" for entry in new_entries)
+        self._remap()
+
+    def reset_index(self):
+        self.offsets, self.record_nums, self.indexed_size, self.last_line = {}, {}, 0, None
+
+    def _remap(self):
+        self.close()
+        if self.indexed_size:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_raw(self, business_id):
+        """
+        Zero-copy view of a record's JSON line, or None. The view stays
+        valid after refresh and close, it keeps its memory map alive.
+        """
+        location = self.offsets.get(str(business_id))
+        if location is None:
+            return None
+        offset, length = location
+        return memoryview(self._mmap)[offset:offset + length]
+
+    def get(self, business_id):
+        raw = self.get_raw(business_id)
+        return None if raw is None else json.loads(bytes(raw))
+
+    def get_by_record_num(self, record_num):
+        business_id = self.record_nums.get(str(record_num))
+        return None if business_id is None else self.get(business_id)
+
+    def sample(self, k, seed=None):
+        """
+        Random sample of k records (latest versions).
+        """
+        business_ids = random.Random(seed).sample(list(self.offsets), min(k, len(self)))
+        return [self.get(business_id) for business_id in business_ids]
+
+    def iter_latest(self):
+        """
+        Latest version of every business, in file order.
+        Same records as iter_latest_records, without rescanning the lake.
+        """
+        for offset, length in sorted(self.offsets.values()):
+            yield json.loads(self._mmap[offset:offset + length])
+
+    def __contains__(self, business_id):
+        return str(business_id) in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # views from get_raw still use the map, it is unmapped once they are released
+            self._file.close()
+            self._mmap = self._file = None
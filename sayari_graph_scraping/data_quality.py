@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+import polars as pl
+
+# Data quality issues of crawled items (missing titles, non string values,
+# drawers without relationships, ...). Instead of one warning per problem
+# item, issues are counted by category, with a bounded random sample of
+# example businesses per category. The first issue of a category is logged
+# right away, later ones at most once every log_interval seconds per
+# category. Counts and samples are written as a JSON and a Parquet report at
+# close (see DATA_QUALITY_* in settings.py).
+MAX_DETAIL_LENGTH = 200
+
+logger = logging.getLogger(__name__)
+
+
+class DataQualityCollector:
+    """
+    Count data quality issues by category and keep up to sample_size
+    example (business id, SOS control ID, detail) per category, a uniform
+    sample of all issues of the category (reservoir sampling).
+
+    With log_interval None nothing is logged. With keep_issues, every
+    issue is also kept until drain(), so worker processes can hand their
+    issues to the collector of the crawl process.
+    """
+
+    def __init__(self, sample_size=20, log_interval=60.0, keep_issues=False, seed=0):
+        self.sample_size = sample_size
+        self.log_interval = log_interval
+        self.keep_issues = keep_issues
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()  # items may be processed on a worker thread
+        self.counts = {}
+        self.examples = {}
+        self.next_log = {}  # category -> time of the next log line
+        self.issues = []
+
+    def record(self, category, business_id=None, control_id=None, detail=None):
+        if detail is not None:
+            detail = str(detail)[:MAX_DETAIL_LENGTH]
+        example = (business_id, control_id, detail)
+        now = time.monotonic()
+        with self.lock:
+            count = self.counts.get(category, 0) + 1
+            self.counts[category] = count
+            examples = self.examples.setdefault(category, [])
+            if len(examples) < self.sample_size:
+                examples.append(example)
+            else:
+                slot = self.rng.randrange(count)
+                if slot < self.sample_size:
+                    examples[slot] = example
+            if self.keep_issues:
+                self.issues.append((category, business_id, control_id, detail))
+            log = self.log_interval is not None and now >= self.next_log.get(category, now)
+            if log:
+                self.next_log[category] = now + self.log_interval
+        if not log:
+            return
+        message = category if detail is None else f"{category} : {detail}"
+        message += f" for business id: {business_id} and SOS Control ID#: {control_id}"
+        if count > 1:
+            message += f" ({count} items with this issue so far)"
+        logger.warning(message)
+
+    def drain(self):
+        """
+        Issues recorded since the last drain, for record(*issue) elsewhere.
+        """
+        with self.lock:
+            issues, self.issues = self.issues, []
+        return issues
+
+    def summary(self):
+        with self.lock:
+            return {
+                "total_issues": sum(self.counts.values()),
+                "categories": {
+                    category: {
+                        "count": count,
+                        "examples": [
+                            {"business_id": business_id, "control_id": control_id, "detail": detail}
+                            for business_id, control_id, detail in self.examples[category]
+                        ],
+                    }
+                    for category, count in sorted(self.counts.items(), key=lambda kv: -kv[1])
+                },
+            }
+
+    def log_summary(self):
+        for category, count in sorted(self.counts.items(), key=lambda kv: -kv[1]):
+            logger.warning(f"Data quality: {count} items with issue: {category}")
+
+    def write_report(self, path):
+        """
+        Write the summary to path (JSON) and the sampled examples, one row
+        per example with its category count, next to it as Parquet.
+        Returns the Parquet path.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+        summary["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        rows = [
+            {
+                "category": category,
+                "count": entry["count"],
+                "business_id": None if example["business_id"] is None else str(example["business_id"]),
+                "control_id": None if example["control_id"] is None else str(example["control_id"]),
+                "detail": example["detail"],
+            }
+            for category, entry in summary["categories"].items()
+            for example in entry["examples"]
+        ]
+        parquet_path = os.path.splitext(path)[0] + ".parquet"
+        schema = {
+            "category": pl.String,
+            "count": pl.Int64,
+            "business_id": pl.String,
+            "control_id": pl.String,
+            "detail": pl.String,
+        }
+        pl.DataFrame(rows, schema=schema).write_parquet(parquet_path)
+        return parquet_path
+
+
+class RootLoggerHandler(logging.Handler):
+    """
+    Hand records to the root logger's handlers (Scrapy's log file).
+    """
+
+    def emit(self, record):
+        logging.root.handle(record)
+
+
+class QueueLogging:
+    """
+    Make one logger's records asynchronous: the logging thread only puts
+    them on a queue, a listener thread formats and writes them through the
+    root logger's handlers.
+    """
+
+    def __init__(self, name=__name__):
+        self.logger = logging.getLogger(name)
+        self.handler = None
+        self.listener = None
+
+    def start(self):
+        if self.listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        self.handler = QueueHandler(log_queue)
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.listener = QueueListener(log_queue, RootLoggerHandler())
+        self.listener.start()
+
+    def stop(self):
+        """
+        Write every queued record, then log synchronously again.
+        """
+        if self.listener is None:
+            return
+        self.logger.removeHandler(self.handler)
+        self.logger.propagate = True
+        self.listener.stop()
+        self.handler = self.listener = None
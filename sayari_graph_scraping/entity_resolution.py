@@ -0,0 +1,220 @@
+import os
+import numpy as np
+import polars as pl
+from sayari_graph_scraping.graph_spill import EDGE_SCHEMA
+from sayari_graph_scraping.node_registry import merge_tooltips
+
+# Fuzzy entity resolution for agent and owner names. Names are compared by
+# resolution key (punctuation dropped, legal suffix spellings folded, ex.
+# "REGISTERED AGENTS, INC." and "REGISTERED AGENTS INCORPORATED" share a key).
+# Keys are only compared within blocks of keys sharing one of their rarest
+# tokens, sorted and paired with their next few neighbours, so the number of
+# candidate pairs grows linearly with the number of names instead of
+# quadratically. Candidates are scored with a vectorized Levenshtein kernel.
+LEGAL_SUFFIXES = {
+    "INCORPORATED": "INC",
+    "CORPORATION": "CORP",
+    "COMPANY": "CO",
+    "LIMITED": "LTD",
+}
+STOP_TOKENS = ["THE"]
+BLOCKING_TOKENS = 2  # rarest tokens of a key used as blocking keys
+PAIRS_PER_CHUNK = 50000
+
+
+def resolution_key_expr(expr):
+    """
+    Resolution key of names, names with the same key are one entity.
+    """
+    return (
+        expr.str.to_uppercase()
+        .str.replace_all(r"[.']", "")
+        .str.replace_all(r"[^\p{L}\p{N}]+", " ")
+        .str.strip_chars()
+        .str.split(" ")
+        .list.eval(
+            pl.element()
+            .replace(LEGAL_SUFFIXES)
+            .filter((pl.element() != "") & ~pl.element().is_in(STOP_TOKENS))
+        )
+        .list.join(" ")
+    )
+
+
+def levenshtein_similarity(a, b, len_a, len_b):
+    """
+    1 - edit distance / longer length, for every pair of rows of a and b
+    (code point arrays padded with 0). One NumPy pass per character of a,
+    insertions within a row are a running minimum.
+    """
+    n, width = b.shape
+    offsets = np.arange(width + 1, dtype=np.int32)
+    prev = np.broadcast_to(offsets, (n, width + 1))
+    distance = len_b.astype(np.int32)  # a is empty
+    for i in range(1, int(len_a.max(initial=0)) + 1):
+        substitute = prev[:, :-1] + (a[:, i - 1, None] != b)
+        best = np.empty((n, width + 1), dtype=np.int32)
+        best[:, 0] = i
+        np.minimum(substitute, prev[:, 1:] + 1, out=best[:, 1:])
+        prev = np.minimum.accumulate(best - offsets, axis=1) + offsets
+        done = np.flatnonzero(len_a == i)
+        distance[done] = prev[done, len_b[done]]
+    return 1 - distance / np.maximum(np.maximum(len_a, len_b), 1)
+
+
+def candidate_pairs(keys, window):
+    """
+    Sorted neighbourhood blocking. Returns unique (i, j) pairs, i < j,
+    of indices into keys.
+    """
+    tokens = (
+        pl.DataFrame({"key": keys})
+        .with_row_index("key_id")
+        .with_columns(token=pl.col("key").str.split(" "))
+        .explode("token")
+        .filter(pl.col("token") != "")
+        .unique(["key_id", "token"])
+    )
+    blocks = (
+        tokens.with_columns(frequency=pl.len().over("token"))
+        .sort("key_id", "frequency", "token")
+        .group_by("key_id", maintain_order=True)
+        .head(BLOCKING_TOKENS)
+        .sort("token", "key")
+    )
+    block = blocks["token"].cast(pl.Categorical).to_physical().to_numpy()
+    key_id = blocks["key_id"].to_numpy().astype(np.int64)
+    # Pairs are encoded as i * len(keys) + j, to deduplicate them with a 1D sort
+    pairs = [np.empty(0, dtype=np.int64)]
+    for offset in range(1, window + 1):
+        same_block = np.flatnonzero(block[offset:] == block[:-offset])
+        i, j = key_id[same_block], key_id[same_block + offset]
+        pairs.append(np.minimum(i, j) * len(keys) + np.maximum(i, j))
+    pairs = np.unique(np.concatenate(pairs))
+    return np.stack([pairs // len(keys), pairs % len(keys)], axis=1)
+
+
+def key_codes(keys, width):
+    """
+    Code points of keys as a (len(keys), width) array padded with 0.
+    """
+    return np.array(keys, dtype=f"<U{max(width, 1)}").view(np.uint32).reshape(len(keys), max(width, 1))
+
+
+def find(parent, node):
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def resolve_entities(names, counts=None, threshold=0.9, window=8):
+    """
+    Map names to canonical names. Returns a data frame of name,
+    canonical_id and canonical, one row per distinct name. The canonical
+    name of a cluster is its most frequent name (counts, ex. number of
+    relationships), ties go to the shortest then first in sort order.
+    """
+    names = pl.DataFrame(
+        {"name": names, "count": counts if counts is not None else [1] * len(names)},
+        schema={"name": pl.String, "count": pl.Int64},
+    ).group_by("name").agg(pl.col("count").sum())
+    names = names.with_columns(key=resolution_key_expr(pl.col("name")))
+    # Names without any letter or digit are left alone
+    names = names.with_columns(
+        key=pl.when(pl.col("key") == "").then(pl.col("name")).otherwise(pl.col("key"))
+    )
+    keys = names["key"].unique().sort()
+    key_index = pl.DataFrame({"key": keys}).with_row_index("key_id")
+
+    pairs = candidate_pairs(keys, window)
+    key_length = keys.str.len_chars().to_numpy()
+    # Numbers (ex. "ELITE GOLF 2") must match exactly
+    digits = keys.str.replace_all(r"\D", "").cast(pl.Categorical).to_physical().to_numpy()
+    len_a, len_b = key_length[pairs[:, 0]], key_length[pairs[:, 1]]
+    # Edit distance is at least the length difference
+    keep = (np.minimum(len_a, len_b) >= threshold * np.maximum(len_a, len_b)) & (
+        digits[pairs[:, 0]] == digits[pairs[:, 1]]
+    )
+    pairs = pairs[keep]
+    # Similar lengths in the same chunk, less padding to compare
+    pairs = pairs[np.argsort(np.maximum(key_length[pairs[:, 0]], key_length[pairs[:, 1]]), kind="stable")]
+
+    keys_list = keys.to_list()
+    parent = list(range(len(keys)))
+    for start in range(0, len(pairs), PAIRS_PER_CHUNK):
+        chunk = pairs[start:start + PAIRS_PER_CHUNK]
+        len_a, len_b = key_length[chunk[:, 0]], key_length[chunk[:, 1]]
+        # Full keys, padded to the longest key of the chunk
+        width = int(max(len_a.max(), len_b.max()))
+        similarity = levenshtein_similarity(
+            key_codes([keys_list[i] for i in chunk[:, 0]], width),
+            key_codes([keys_list[j] for j in chunk[:, 1]], width),
+            len_a,
+            len_b,
+        )
+        for i, j in chunk[similarity >= threshold].tolist():
+            a, b = find(parent, i), find(parent, j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    clusters = pl.DataFrame(
+        {"key_id": np.arange(len(keys), dtype=np.uint32), "cluster": [find(parent, i) for i in range(len(keys))]},
+        schema={"key_id": pl.UInt32, "cluster": pl.Int64},
+    )
+    names = names.join(key_index, on="key").join(clusters, on="key_id")
+    canonical = (
+        names.sort(
+            pl.col("count"), pl.col("name").str.len_chars(), pl.col("name"),
+            descending=[True, False, False],
+        )
+        .group_by("cluster", maintain_order=True)
+        .agg(canonical=pl.col("name").first())
+        .sort("canonical")
+        .with_row_index("canonical_id")
+    )
+    return (
+        names.join(canonical, on="cluster")
+        .select("name", "canonical_id", "canonical")
+        .sort("name")
+    )
+
+
+def resolve_graph_entities(graph_path, nodes_path, threshold=0.9, window=8):
+    """
+    Resolve the entity names of graph.csv and the node table in place.
+    Nodes merged into one keep every tooltip, edges that resolution made
+    identical are dropped (edges that were duplicates before are kept).
+    Returns (number of names merged, number of edges).
+    """
+    edges = pl.read_csv(graph_path, schema=EDGE_SCHEMA)
+    entity_counts = edges.group_by("entity").len()
+    resolved = resolve_entities(entity_counts["entity"], entity_counts["len"], threshold, window)
+    renamed = resolved.filter(pl.col("name") != pl.col("canonical"))
+    if renamed.is_empty():
+        return 0, edges.height
+
+    mapping = dict(zip(renamed["name"], renamed["canonical"]))
+    # Company columns too, a company that is also an entity stays one node
+    edges = (
+        edges.with_columns(duplicate=pl.int_range(pl.len()).over(list(EDGE_SCHEMA)))
+        .with_columns(pl.col("entity").replace(mapping), pl.col("company").replace(mapping))
+        .unique(maintain_order=True)
+        .drop("duplicate")
+    )
+    edges.write_csv(graph_path + ".tmp")
+    os.replace(graph_path + ".tmp", graph_path)
+
+    (
+        pl.read_ipc(nodes_path, memory_map=False)
+        .with_columns(pl.col("name").replace(mapping))
+        .group_by("name", maintain_order=True)
+        .agg(
+            pl.col("label").first(),
+            pl.col("title").unique(maintain_order=True),
+        )
+        .with_columns(pl.col("title").map_elements(merge_tooltips, return_dtype=pl.String))
+        .write_ipc(nodes_path + ".tmp")
+    )
+    os.replace(nodes_path + ".tmp", nodes_path)
+    return len(mapping), edges.height
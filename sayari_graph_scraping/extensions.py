@@ -0,0 +1,130 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from sayari_graph_scraping.metrics import metrics
+
+# Scrapy extensions, see EXTENSIONS in settings.py
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsExtension:
+    """
+    Turns on the metrics registry (metrics.py) for the crawl. Every
+    interval seconds, samples the engine's queue depths and writes the
+    metrics and Scrapy stats to json_path and prometheus_path. With a
+    port, also serves the Prometheus text at http://127.0.0.1:<port>/metrics.
+    """
+
+    def __init__(
+        self,
+        crawler,
+        interval=30.0,
+        json_path=None,
+        prometheus_path=None,
+        port=None,
+        profile_stage=None,
+        profiler="cprofile",
+        profile_path="output/profile",
+    ):
+        self.crawler = crawler
+        self.interval = interval
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.port = port
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.profile_path = profile_path
+        self.task = None
+        self.server = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured("METRICS_ENABLED is off")
+        extension = cls(
+            crawler,
+            interval=settings.getfloat("METRICS_INTERVAL", 30.0),
+            json_path=settings.get("METRICS_JSON_PATH"),
+            prometheus_path=settings.get("METRICS_PROMETHEUS_PATH"),
+            port=settings.getint("METRICS_PROMETHEUS_PORT") or None,
+            profile_stage=settings.get("METRICS_PROFILE_STAGE"),
+            profiler=settings.get("METRICS_PROFILER", "cprofile"),
+            profile_path=settings.get("METRICS_PROFILE_PATH", "output/profile"),
+        )
+        # Enabled right away, pipelines open before spider_opened
+        metrics.configure(True, extension.profile_stage, extension.profiler, extension.profile_path)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        # Imported here, like the reactor (see item_offload.py)
+        from twisted.internet.task import LoopingCall
+
+        self.task = LoopingCall(self.dump)
+        self.task.start(self.interval, now=False)
+        if self.port:
+            self.server = serve_metrics(self.port, self.crawler.stats)
+            logger.info(f"Serving metrics on http://127.0.0.1:{self.server.server_port}/metrics")
+
+    def sample_queues(self):
+        """
+        Depths of the engine's queues: scheduled requests, downloads in
+        flight, responses waiting for the spider and items in the pipelines.
+        """
+        engine = self.crawler.engine
+        slot = getattr(engine, "slot", None)
+        if slot is not None:
+            metrics.observe_depth("scheduler", len(slot.scheduler))
+        metrics.observe_depth("downloader", len(engine.downloader.active))
+        scraper_slot = getattr(engine.scraper, "slot", None)
+        if scraper_slot is not None:
+            metrics.observe_depth("scraper", len(scraper_slot.queue))
+            metrics.observe_depth("pipelines", scraper_slot.itemproc_size)
+
+    def dump(self):
+        if self.crawler.engine is not None:
+            self.sample_queues()
+        metrics.dump(self.json_path, self.prometheus_path, extra=self.crawler.stats.get_stats())
+
+    def spider_closed(self, spider, reason):
+        if self.task is not None and self.task.running:
+            self.task.stop()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        profile_path = metrics.close_profiler()
+        if profile_path:
+            logger.info(f"Wrote {self.profile_stage} profile to {profile_path}")
+        self.dump()
+        metrics.enabled = False
+
+
+def serve_metrics(port, stats=None, host="127.0.0.1"):
+    """
+    Serve the Prometheus text of the metrics registry (and stats) from a
+    daemon thread. Returns the server, shutdown() stops it.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text(stats.get_stats() if stats is not None else None).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
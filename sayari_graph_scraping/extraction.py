@@ -0,0 +1,74 @@
+import os
+import re
+import jmespath
+import yaml
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(__file__), "config", "extraction_rules.yaml"
+)
+
+# KEY, [0], KEY[0], KEY.SUB[1] ... (no projections, filters or functions)
+SIMPLE_PATH_RE = re.compile(r"^(?:[A-Za-z_]\w*|\[-?\d+\])(?:\.[A-Za-z_]\w*|\[-?\d+\])*$")
+PATH_STEP_RE = re.compile(r"([A-Za-z_]\w*)|\[(-?\d+)\]")
+
+
+def lower_simple_path(expression):
+    """
+    Turn a simple jmespath path into a direct indexing function with the
+    same semantics as jmespath (None when a key or index is missing, or the
+    value has the wrong type). Returns None for expressions that are not
+    simple paths.
+    """
+    if not SIMPLE_PATH_RE.match(expression):
+        return None
+    steps = [
+        key if key else int(index) for key, index in PATH_STEP_RE.findall(expression)
+    ]
+
+    def get(obj):
+        for step in steps:
+            if isinstance(step, int):
+                if not isinstance(obj, list):
+                    return None
+                try:
+                    obj = obj[step]
+                except IndexError:
+                    return None
+            else:
+                if not isinstance(obj, dict):
+                    return None
+                obj = obj.get(step)
+        return obj
+
+    return get
+
+
+class ExtractionRule:
+    """
+    One compiled extraction rule. Call it with the object to extract from.
+    """
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+        self.is_simple_path = SIMPLE_PATH_RE.match(expression) is not None
+        self.search = lower_simple_path(expression) or jmespath.compile(expression).search
+
+    def __call__(self, obj):
+        return self.search(obj)
+
+    def __repr__(self):
+        return f"ExtractionRule({self.name!r}, {self.expression!r})"
+
+
+def load_extraction_rules(path=None):
+    """
+    Load and compile extraction rules from YAML config.
+    Returns {section: {rule name: ExtractionRule}}.
+    """
+    with open(path or DEFAULT_RULES_PATH) as f:
+        config = yaml.safe_load(f)
+    return {
+        section: {name: ExtractionRule(name, expression) for name, expression in rules.items()}
+        for section, rules in config.items()
+    }
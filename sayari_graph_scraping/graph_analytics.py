@@ -0,0 +1,258 @@
+from collections import Counter, defaultdict
+from sayari_graph_scraping.graph_db import name_key
+from sayari_graph_scraping.node_registry import normalize_name
+
+# Graph analytics side tables in the graph database (see
+# sql/create_analytics_tables.sql), kept up to date from the relationships
+# every batch adds or removes instead of being recomputed from scratch:
+# - node_degrees: relationships per agent, owner or company
+# - relationship_degrees: the same, per relationship type
+# - node_components / components: connected component membership and sizes
+# Degrees and sizes are indexed, so top-K hubs and largest components are
+# index scans no matter how large the graph is.
+ANALYTICS_TABLES = ("node_degrees", "relationship_degrees", "node_components", "components")
+
+
+def find(parent, node):
+    """
+    Union-find root, with path halving.
+    """
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+class GraphAnalytics:
+    """
+    Maintains the analytics side tables of a GraphDatabase, inside the
+    transaction of each batch it writes.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.param = database.param
+        database.execute_script("create_analytics_tables.sql")
+        cursor = database.conn.cursor()
+        # Databases written before analytics existed are backfilled once
+        if not self.has_rows(cursor, "node_degrees") and self.has_rows(cursor, "relationships"):
+            self.rebuild()
+
+    @staticmethod
+    def has_rows(cursor, table):
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        return cursor.fetchone() is not None
+
+    def update(self, cursor, added, removed, names):
+        """
+        Apply added and removed (entity ID, company ID, relationship) rows.
+        The relationships table already reflects them. names maps node
+        IDs of added rows to names.
+        """
+        self.update_degrees(cursor, added, removed, names)
+        if added:
+            self.merge_components(cursor, added)
+        if removed:
+            self.split_components(cursor, removed)
+
+    def update_degrees(self, cursor, added, removed, names):
+        node_delta = Counter()
+        relationship_delta = Counter()
+        for sign, rows in ((1, added), (-1, removed)):
+            for entity, company, relationship in rows:
+                for node in (entity, company):
+                    node_delta[node] += sign
+                    relationship_delta[node, relationship] += sign
+        self.database.insert_many(
+            cursor, "node_degrees", ("node_id", "name", "degree"),
+            [(node, names.get(node, ""), delta) for node, delta in sorted(node_delta.items()) if delta],
+            "(node_id) DO UPDATE SET degree = node_degrees.degree + excluded.degree",
+        )
+        self.database.insert_many(
+            cursor, "relationship_degrees", ("node_id", "relationship", "degree"),
+            [key + (delta,) for key, delta in sorted(relationship_delta.items()) if delta],
+            "(node_id, relationship) DO UPDATE SET degree = relationship_degrees.degree + excluded.degree",
+        )
+        if removed:
+            cursor.execute("DELETE FROM node_degrees WHERE degree <= 0")
+            cursor.execute("DELETE FROM relationship_degrees WHERE degree <= 0")
+
+    def merge_components(self, cursor, added):
+        """
+        Union the components joined by added rows. The smaller components
+        are relabelled to the largest one, so a node is relabelled
+        O(log n) times at most over the life of the graph.
+        """
+        nodes = sorted({node for entity, company, _ in added for node in (entity, company)})
+        component = dict(self.database.select_in(
+            cursor, "SELECT node_id, component_id FROM node_components WHERE node_id IN ({})", nodes
+        ))
+        size = dict(self.database.select_in(
+            cursor, "SELECT component_id, size FROM components WHERE component_id IN ({})",
+            sorted(set(component.values())),
+        ))
+        existing = set(size)
+        new_nodes = [node for node in nodes if node not in component]
+        for node in new_nodes:
+            # A component is identified by one of its nodes
+            component[node] = node
+            size[node] = 1
+
+        parent = {component_id: component_id for component_id in size}
+        for entity, company, _ in added:
+            a, b = find(parent, component[entity]), find(parent, component[company])
+            if a == b:
+                continue
+            if (size[a], -a) < (size[b], -b):
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+        merged = sorted(
+            (find(parent, component_id), component_id)
+            for component_id in existing
+            if find(parent, component_id) != component_id
+        )
+        cursor.executemany(
+            f"UPDATE node_components SET component_id = {self.param} WHERE component_id = {self.param}",
+            merged,
+        )
+        cursor.executemany(
+            f"DELETE FROM components WHERE component_id = {self.param}",
+            [(component_id,) for _, component_id in merged],
+        )
+        self.database.insert_many(
+            cursor, "node_components", ("node_id", "component_id"),
+            [(node, find(parent, node)) for node in new_nodes],
+            "(node_id) DO NOTHING",
+        )
+        roots = sorted({find(parent, component_id) for component_id in parent})
+        self.database.insert_many(
+            cursor, "components", ("component_id", "size"),
+            [(root, size[root]) for root in roots],
+            "(component_id) DO UPDATE SET size = excluded.size",
+        )
+
+    def split_components(self, cursor, removed):
+        """
+        Recompute only the components removed rows belonged to. A component
+        that fell apart is replaced by its pieces, nodes left without any
+        relationship are dropped.
+        """
+        nodes = sorted({node for entity, company, _ in removed for node in (entity, company)})
+        component_ids = sorted({component_id for _, component_id in self.database.select_in(
+            cursor, "SELECT node_id, component_id FROM node_components WHERE node_id IN ({})", nodes
+        )})
+        for component_id in component_ids:
+            cursor.execute(
+                f"SELECT node_id FROM node_components WHERE component_id = {self.param}",
+                (component_id,),
+            )
+            members = [node for (node,) in cursor.fetchall()]
+            # Both ends of a relationship are in the same component
+            cursor.execute(
+                "SELECT r.entity_id, r.company_id FROM relationships r "
+                "JOIN node_components n ON n.node_id = r.company_id "
+                f"WHERE n.component_id = {self.param}",
+                (component_id,),
+            )
+            parent = {}
+            for entity, company in cursor.fetchall():
+                a = find(parent, parent.setdefault(entity, entity))
+                b = find(parent, parent.setdefault(company, company))
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            pieces = defaultdict(list)
+            for node in parent:
+                pieces[find(parent, node)].append(node)
+            if len(pieces) == 1 and len(parent) == len(members):
+                continue
+
+            cursor.execute(
+                f"DELETE FROM node_components WHERE component_id = {self.param}", (component_id,)
+            )
+            cursor.execute(f"DELETE FROM components WHERE component_id = {self.param}", (component_id,))
+            self.database.insert_many(
+                cursor, "node_components", ("node_id", "component_id"),
+                [(node, root) for root, piece in sorted(pieces.items()) for node in piece],
+                "(node_id) DO NOTHING",
+            )
+            self.database.insert_many(
+                cursor, "components", ("component_id", "size"),
+                [(root, len(piece)) for root, piece in sorted(pieces.items())],
+                "(component_id) DO NOTHING",
+            )
+
+    def rebuild(self):
+        """
+        Recompute every side table from the relationships table.
+        """
+        cursor = self.database.conn.cursor()
+        try:
+            cursor.execute("SELECT entity_id, company_id, relationship FROM relationships")
+            relationships = sorted(cursor.fetchall())
+            cursor.execute("SELECT entity_id, name FROM entities UNION SELECT company_id, name FROM companies")
+            names = dict(cursor.fetchall())
+            for table in ANALYTICS_TABLES:
+                cursor.execute(f"DELETE FROM {table}")
+            self.update(cursor, relationships, [], names)
+            self.database.conn.commit()
+        except Exception:
+            self.database.conn.rollback()
+            raise
+
+    def top_hubs(self, k=10, relationship=None):
+        """
+        The k nodes with the most relationships (of one type), as
+        (name, degree) pairs.
+        """
+        cursor = self.database.conn.cursor()
+        if relationship is None:
+            cursor.execute(
+                f"SELECT name, degree FROM node_degrees ORDER BY degree DESC, name LIMIT {self.param}",
+                (k,),
+            )
+        else:
+            cursor.execute(
+                "SELECT n.name, r.degree FROM relationship_degrees r "
+                "JOIN node_degrees n ON n.node_id = r.node_id "
+                f"WHERE r.relationship = {self.param} ORDER BY r.degree DESC, n.name LIMIT {self.param}",
+                (relationship, k),
+            )
+        return cursor.fetchall()
+
+    def largest_components(self, k=10):
+        """
+        The k largest connected components, as (component ID, size) pairs.
+        """
+        cursor = self.database.conn.cursor()
+        cursor.execute(
+            "SELECT component_id, size FROM components "
+            f"ORDER BY size DESC, component_id LIMIT {self.param}",
+            (k,),
+        )
+        return cursor.fetchall()
+
+    def degree(self, name):
+        """
+        Number of relationships of a node, by relationship type.
+        """
+        cursor = self.database.conn.cursor()
+        cursor.execute(
+            "SELECT relationship, degree FROM relationship_degrees "
+            f"WHERE node_id = {self.param} ORDER BY relationship",
+            (name_key(normalize_name(name)),),
+        )
+        return dict(cursor.fetchall())
+
+    def component(self, name):
+        """
+        (component ID, size) of the component a node belongs to, or None.
+        """
+        cursor = self.database.conn.cursor()
+        cursor.execute(
+            "SELECT c.component_id, c.size FROM node_components n "
+            f"JOIN components c ON c.component_id = n.component_id WHERE n.node_id = {self.param}",
+            (name_key(normalize_name(name)),),
+        )
+        return cursor.fetchone()
@@ -0,0 +1,180 @@
+import polars as pl
+from sayari_graph_scraping.node_registry import COMPANY_TOOLTIP, ENTITY_TOOLTIP, merge_tooltips
+from sayari_graph_scraping.parquet_lake import is_parquet_lake, scan_parquet_lake
+
+# The batch engine implements the default extraction rules
+# (config/extraction_rules.yaml) as polars expressions, it does not read
+# custom rules (postprocess.py rejects --rules with --engine polars).
+
+# interesting relationships to capture with company, same as
+# pipelines.RELATIONSHIP_LABELS
+INTERESTED_LABELS = [
+    "COMMERCIAL_REGISTERED_AGENT",
+    "REGISTERED_AGENT",
+    "OWNER_NAME",
+    "OWNERS",
+]
+
+# Only the data lake columns the graph needs are decoded
+LAKE_SCHEMA = {
+    "ID": pl.Int64,
+    "ID_key": pl.String,
+    "KEY_ID": pl.String,
+    "TITLE": pl.List(pl.String),
+    "RECORD_NUM": pl.String,
+    "DRAWER_DETAIL_LIST": pl.List(pl.Struct({"LABEL": pl.String, "VALUE": pl.String})),
+}
+
+
+def normalize_name_expr(expr):
+    """
+    Vectorized node_registry.normalize_name
+    """
+    return expr.str.to_uppercase().str.strip_chars().str.replace_all(r"\s+", " ")
+
+
+def normalize_label_expr(expr):
+    """
+    Vectorized SayariGraphScrapingPipeline.normalize_label_str
+    """
+    return (
+        expr.fill_null("None")
+        .str.to_uppercase()
+        .str.split(" ")
+        .list.eval(pl.element().filter(pl.element() != ""))
+        .list.join("_")
+    )
+
+
+def scan_lake(paths):
+    """
+    Lazily scan only the columns the graph needs, from JSONL file(s)
+    or from the Parquet lake directory.
+    """
+    if is_parquet_lake(paths):
+        return scan_parquet_lake(paths).select(
+            "ID", "ID_key", pl.lit(None, dtype=pl.String).alias("KEY_ID"),
+            "TITLE", "RECORD_NUM", "DRAWER_DETAIL_LIST",
+        )
+    return pl.scan_ndjson(paths, schema=LAKE_SCHEMA)
+
+
+def scan_lake_items(paths, title_prefix="X"):
+    """
+    Lazily read data lake records, keep the latest record per business
+    (like data_lake.iter_latest_records) and normalize company titles.
+    """
+    return (
+        scan_lake(paths)
+        .with_row_index("item_idx")
+        .with_columns(
+            business_id=pl.coalesce(
+                pl.col("ID").cast(pl.String), pl.col("ID_key"), pl.col("KEY_ID")
+            ),
+        )
+        .unique("business_id", keep="last", maintain_order=True)
+        .with_columns(
+            company=normalize_name_expr(pl.col("TITLE").list.get(0, null_on_oob=True)),
+            company_type=pl.col("TITLE").list.get(1, null_on_oob=True),
+        )
+        # If company title does not start with title prefix (x), don't incorporate into knowledge graph
+        .filter(
+            pl.col("company").is_null()
+            | (pl.col("company") == "")
+            | pl.col("company").str.starts_with(title_prefix)
+        )
+    )
+
+
+def build_edges(items):
+    """
+    Explode drawer details into graph edges, in the same order the
+    row-wise pipeline produces them. OWNERS is followed by continuation
+    rows whose LABEL is "", every one of them is an owner.
+    """
+    details = (
+        items.select("item_idx", "company", "DRAWER_DETAIL_LIST")
+        .explode("DRAWER_DETAIL_LIST")
+        .with_columns(detail_idx=pl.int_range(pl.len()).over("item_idx"))
+        .unnest("DRAWER_DETAIL_LIST")
+        .with_columns(
+            label=normalize_label_expr(pl.col("LABEL")),
+            is_continuation=(pl.col("LABEL") == "").fill_null(False),
+        )
+        .with_columns(
+            # Last real label seen in this drawer
+            anchor=pl.when(~pl.col("is_continuation"))
+            .then(pl.col("label"))
+            .forward_fill()
+            .over("item_idx"),
+        )
+    )
+    relationship = (
+        pl.when(~pl.col("is_continuation") & pl.col("label").is_in(INTERESTED_LABELS))
+        .then(pl.col("label"))
+        .when(pl.col("is_continuation") & (pl.col("anchor") == "OWNERS"))
+        .then(pl.lit("OWNERS"))
+    )
+    return (
+        details.with_columns(relationship=relationship)
+        .filter(pl.col("relationship").is_not_null())
+        .select(
+            "item_idx",
+            "detail_idx",
+            # Store only string before \n
+            entity=normalize_name_expr(pl.col("VALUE").str.split("\n").list.first()),
+            company="company",
+            relationship=pl.col("relationship").replace("OWNERS", "OWNER_NAME"),
+        )
+    )
+
+
+def build_nodes(items, edges):
+    """
+    Company and entity nodes with merged tooltips, in first seen order.
+    """
+    company_nodes = items.select(
+        "item_idx",
+        detail_idx=pl.lit(-1, dtype=pl.Int64),
+        name="company",
+        title=pl.format(
+            COMPANY_TOOLTIP,
+            pl.col("company").fill_null("None"),
+            pl.col("company_type").fill_null("None"),
+            pl.col("RECORD_NUM").fill_null("None"),
+        ),
+    )
+    entity_nodes = edges.select(
+        "item_idx",
+        pl.col("detail_idx").cast(pl.Int64),
+        name="entity",
+        title=pl.format(ENTITY_TOOLTIP, "relationship", pl.col("entity").fill_null("None")),
+    )
+    return (
+        pl.concat([company_nodes, entity_nodes])
+        .sort("item_idx", "detail_idx")
+        .group_by("name", maintain_order=True)
+        .agg(
+            label=pl.lit(""),
+            title=pl.col("title").unique(maintain_order=True),
+        )
+        .with_columns(pl.col("title").map_elements(merge_tooltips, return_dtype=pl.String))
+    )
+
+
+def build_graph_batch(paths, graph_path, nodes_path, title_prefix="X"):
+    """
+    Build graph.csv (and the node table) from data lake JSONL file(s), or the
+    Parquet lake directory, in one
+    vectorized polars query. Output is identical to replaying every record
+    through SayariGraphScrapingPipeline.process_item.
+    Returns number of edges written.
+    """
+    items = scan_lake_items(paths, title_prefix)
+    edges, nodes = pl.collect_all([
+        build_edges(items),
+        build_nodes(items, build_edges(items)),
+    ])
+    edges.select("entity", "company", "relationship").write_csv(graph_path)
+    nodes.write_ipc(nodes_path)
+    return edges.height
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from sayari_graph_scraping.graph_store import COMPANY
+from sayari_graph_scraping.node_registry import normalize_name
+
+# Graph database: companies, entities (agents, owners) and the relationships
+# between them in normalized, indexed tables, see sql/create_graph_tables.sql.
+# The SQL is portable, a local SQLite file is used by default and a Postgres
+# DSN (postgresql://...) works as well when psycopg or psycopg2 is installed.
+#   python -m sayari_graph_scraping.graph_db --entity "JANE DOE"
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+# Bound parameters per statement, SQLite builds before 3.32 allow 999
+MAX_PARAMS = {"sqlite": 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999, "postgres": 65535}
+
+
+def name_key(name):
+    """
+    Stable 63 bit ID of a normalized name. IDs are computed client side,
+    so batches need no round trip to look up generated keys and reruns
+    map every name to the same row.
+    """
+    return int.from_bytes(hashlib.sha1(name.encode("utf-8")).digest()[:8], "big") >> 1
+
+
+def connect(database_url):
+    """
+    Connect to a postgresql:// DSN, or a SQLite file (path or sqlite:///path).
+    Returns (connection, dialect).
+    """
+    if database_url.startswith(("postgres://", "postgresql://")):
+        try:
+            import psycopg as driver
+        except ImportError:
+            try:
+                import psycopg2 as driver
+            except ImportError:
+                raise ImportError("psycopg or psycopg2 is required for Postgres graph databases")
+        return driver.connect(database_url), "postgres"
+
+    path = database_url.removeprefix("sqlite:///")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Batches may be written on the graph pipeline's offload worker, one
+    # thread at a time (see GraphDatabasePipeline)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn, "sqlite"
+
+
+class GraphDatabase:
+    """
+    Bulk upserts of GraphStore batches into the graph database.
+
+    Every batch is one transaction of multi-row INSERT ... ON CONFLICT
+    statements. A company's relationships are replaced the first time the
+    company is written in a session, so rerunning a load is idempotent and
+    agents or owners removed from a drawer do not linger. With analytics,
+    the relationships each batch adds or removes also update the degree and
+    component side tables (see graph_analytics.py) in the same transaction.
+    """
+
+    def __init__(self, database_url, analytics=True):
+        self.conn, self.dialect = connect(database_url)
+        self.param = "?" if self.dialect == "sqlite" else "%s"
+        self.replaced_companies = set()  # company IDs already written this session
+        self.create_tables()
+        self.analytics = None
+        if analytics:
+            # Imported here, graph_analytics.py imports this module
+            from sayari_graph_scraping.graph_analytics import GraphAnalytics
+
+            self.analytics = GraphAnalytics(self)
+
+    def execute_script(self, file_name):
+        with open(os.path.join(SQL_DIR, file_name)) as f:
+            statements = [statement.strip() for statement in f.read().split(";")]
+        cursor = self.conn.cursor()
+        for statement in statements:
+            if statement:
+                cursor.execute(statement)
+        self.conn.commit()
+
+    def create_tables(self):
+        self.execute_script("create_graph_tables.sql")
+
+    def insert_many(self, cursor, table, columns, rows, on_conflict):
+        """
+        Insert rows with as few multi-row INSERT statements as the
+        driver's parameter limit allows.
+        """
+        row_sql = "(" + ", ".join([self.param] * len(columns)) + ")"
+        chunk_size = MAX_PARAMS[self.dialect] // len(columns)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                + ", ".join([row_sql] * len(chunk))
+                + f" ON CONFLICT {on_conflict}",
+                [value for row in chunk for value in row],
+            )
+
+    def select_in(self, cursor, sql, values):
+        """
+        Run a query with an IN ({}) list of values, in chunks
+        the driver's parameter limit allows. Returns all rows.
+        """
+        rows = []
+        chunk_size = MAX_PARAMS[self.dialect]
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            cursor.execute(sql.format(", ".join([self.param] * len(chunk))), chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def write_graph(self, graph):
+        """
+        Upsert the companies, entities and relationships of a GraphStore.
+        Returns the number of relationships written. Nodes without a name
+        (missing title or drawer value, already counted as data quality
+        issues) are skipped with their relationships, other non string
+        names are stored as strings.
+        """
+        updated_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        names = [name if name is None or isinstance(name, str) else str(name) for name in graph.node_names]
+        keys = [None if name is None else name_key(name) for name in names]
+
+        # Rows are deduplicated, Postgres rejects upserting a row twice in one
+        # statement, and sorted by key so index pages are written in order
+        companies = {}
+        for node_id, source_ids in enumerate(graph.node_sources):
+            if keys[node_id] is None:
+                continue
+            for source_id in (source_ids,) if isinstance(source_ids, int) else source_ids:
+                source = graph.sources[source_id]
+                if source[0] == COMPANY:
+                    companies[keys[node_id]] = (
+                        keys[node_id], names[node_id], source[1], source[2], updated_at
+                    )
+        entities = {keys[src]: (keys[src], names[src]) for src in set(graph.src) if keys[src] is not None}
+        relationships = set(
+            (keys[src], keys[dst], graph.relationships[rel])
+            for src, dst, rel in zip(graph.src, graph.dst, graph.rel)
+            if keys[src] is not None and keys[dst] is not None
+        )
+
+        cursor = self.conn.cursor()
+        try:
+            # Only the difference to what is stored is written
+            existing = set(self.select_in(
+                cursor,
+                "SELECT entity_id, company_id, relationship FROM relationships WHERE company_id IN ({})",
+                sorted(companies),
+            ))
+            new_companies = set(companies) - self.replaced_companies
+            removed = sorted(
+                row for row in existing if row[1] in new_companies and row not in relationships
+            )
+            added = sorted(relationships - existing)
+
+            self.insert_many(
+                cursor, "companies",
+                ("company_id", "name", "company_type", "record_num", "updated_at"),
+                [companies[key] for key in sorted(companies)],
+                "(company_id) DO UPDATE SET company_type = excluded.company_type, "
+                "record_num = excluded.record_num, updated_at = excluded.updated_at",
+            )
+            self.insert_many(
+                cursor, "entities", ("entity_id", "name"), [entities[key] for key in sorted(entities)],
+                "(entity_id) DO NOTHING",
+            )
+            cursor.executemany(
+                f"DELETE FROM relationships WHERE entity_id = {self.param} "
+                f"AND company_id = {self.param} AND relationship = {self.param}",
+                removed,
+            )
+            self.insert_many(
+                cursor, "relationships", ("entity_id", "company_id", "relationship"),
+                added, "(entity_id, relationship, company_id) DO NOTHING",
+            )
+            if self.analytics is not None:
+                self.analytics.update(cursor, added, removed, dict(zip(keys, names)))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.replaced_companies.update(new_companies)
+        return len(relationships)
+
+    def related_companies(self, entity, relationship=None):
+        """
+        Companies an entity (agent, owner) is related to, as
+        (company, relationship) pairs. A primary key range scan.
+        """
+        sql = (
+            "SELECT c.name, r.relationship FROM relationships r "
+            f"JOIN companies c ON c.company_id = r.company_id WHERE r.entity_id = {self.param}"
+        )
+        params = [name_key(normalize_name(entity))]
+        if relationship is not None:
+            sql += f" AND r.relationship = {self.param}"
+            params.append(relationship)
+        cursor = self.conn.cursor()
+        cursor.execute(sql + " ORDER BY c.name, r.relationship", params)
+        return cursor.fetchall()
+
+    def related_entities(self, company):
+        """
+        Entities related to a company, as (entity, relationship) pairs.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT e.name, r.relationship FROM relationships r "
+            f"JOIN entities e ON e.entity_id = r.entity_id WHERE r.company_id = {self.param} "
+            "ORDER BY e.name, r.relationship",
+            [name_key(normalize_name(company))],
+        )
+        return cursor.fetchall()
+
+    def counts(self):
+        cursor = self.conn.cursor()
+        counts = {}
+        for table in ("companies", "entities", "relationships"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Query the graph database.")
+    parser.add_argument("--database", default=os.path.join(root_dir, "output", "graph.sqlite"),
+                        help="SQLite file or postgresql:// DSN.")
+    parser.add_argument("--entity", default=None,
+                        help="List the companies an agent or owner is related to.")
+    parser.add_argument("--company", default=None,
+                        help="List the agents and owners of a company.")
+    parser.add_argument("--relationship", default=None,
+                        help="Only this relationship with --entity or --hubs, ex. REGISTERED_AGENT.")
+    parser.add_argument("--hubs", type=int, default=None,
+                        help="List the N agents, owners and companies with the most relationships.")
+    parser.add_argument("--components", type=int, default=None,
+                        help="List the sizes of the N largest connected components.")
+    args = parser.parse_args()
+
+    database = GraphDatabase(args.database)
+    if args.entity:
+        rows = database.related_companies(args.entity, args.relationship)
+    elif args.company:
+        rows = database.related_entities(args.company)
+    elif args.hubs:
+        rows = database.analytics.top_hubs(args.hubs, args.relationship)
+    elif args.components:
+        rows = database.analytics.largest_components(args.components)
+    else:
+        rows = sorted(database.counts().items())
+    for name, value in rows:
+        print(f"{name}\t{value}")
+    database.close()
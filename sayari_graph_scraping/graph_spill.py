@@ -0,0 +1,125 @@
+import glob
+import os
+import shutil
+import time
+import polars as pl
+from sayari_graph_scraping.node_registry import merge_tooltips
+
+EDGE_SCHEMA = {"entity": pl.String, "company": pl.String, "relationship": pl.String}
+NODE_SCHEMA = {"name": pl.String, "label": pl.String, "title": pl.String}
+
+
+def nodes_frame(nodes):
+    """
+    Nodes ((name, {"label": ..., "title": ...})) as a NODE_SCHEMA data frame.
+    """
+    nodes = list(nodes)
+    return pl.DataFrame(
+        {
+            "name": [name for name, _ in nodes],
+            "label": [attributes.get("label", "") for _, attributes in nodes],
+            "title": [attributes.get("title", "") for _, attributes in nodes],
+        },
+        schema=NODE_SCHEMA,
+    )
+
+
+def write_node_table(nodes, nodes_path):
+    """
+    Write the in memory node registry as the node table compaction and
+    batch mode write, so every mode publishes the same graph artifact.
+    """
+    nodes_frame(nodes).write_ipc(nodes_path + ".tmp")
+    os.replace(nodes_path + ".tmp", nodes_path)
+
+
+class GraphPartWriter:
+    """
+    Spill graph edges and nodes to append-only Arrow IPC part files.
+
+    Each run writes to its own directory under parts_dir, so part files
+    written before a crash are never overwritten and can be compacted
+    later (see compact_graph_parts).
+    """
+
+    def __init__(self, parts_dir, batch_size=10000, run_id=None):
+        self.batch_size = batch_size
+        # Sortable, unique per run even when runs start within the same second
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S") + f".{time.time_ns() % 10**9:09d}"
+        self.run_dir = os.path.join(parts_dir, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.part_num = 0
+
+    def write_part(self, graph):
+        """
+        Write the edges and nodes of one batch (a GraphStore) as part files.
+        Files are written to a temp path first and renamed, so a crash
+        mid-write never leaves a corrupt part behind.
+        """
+        if not graph.num_edges and not graph.num_nodes:
+            return
+        for kind, df in (("edges", graph.edges_frame()), ("nodes", graph.nodes_frame())):
+            path = os.path.join(self.run_dir, f"{kind}-{self.part_num:06d}.arrow")
+            df.write_ipc(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        self.part_num += 1
+
+
+def list_part_runs(parts_dir):
+    """
+    Return run directories that still hold uncompacted parts, oldest first.
+    """
+    return sorted(
+        run_dir
+        for run_dir in glob.glob(os.path.join(parts_dir, "*"))
+        if glob.glob(os.path.join(run_dir, "edges-*.arrow"))
+    )
+
+
+def compact_graph_parts(run_dir, graph_path, nodes_path, remove_parts=True):
+    """
+    Compact a run's part files into graph.csv and a deduplicated node table.
+    Part files are streamed through polars' lazy engine, edges keep
+    the order they were scraped in. Node tooltips seen in different batches
+    are merged, the same way NodeRegistry merges them in memory. Both files
+    are written to a temp path and renamed, like the part files.
+    """
+    edge_parts = sorted(glob.glob(os.path.join(run_dir, "edges-*.arrow")))
+    node_parts = sorted(glob.glob(os.path.join(run_dir, "nodes-*.arrow")))
+    if not edge_parts:
+        return 0
+
+    edges = pl.scan_ipc(edge_parts)
+    edges.sink_csv(graph_path + ".tmp")
+
+    (
+        pl.scan_ipc(node_parts)
+        .group_by("name", maintain_order=True)
+        .agg(
+            pl.col("label").first(),
+            pl.col("title").unique(maintain_order=True),
+        )
+        .with_columns(pl.col("title").map_elements(merge_tooltips, return_dtype=pl.String))
+        .sink_ipc(nodes_path + ".tmp")
+    )
+    os.replace(graph_path + ".tmp", graph_path)
+    os.replace(nodes_path + ".tmp", nodes_path)
+    num_edges = edges.select(pl.len()).collect().item()
+    if remove_parts:
+        shutil.rmtree(run_dir)
+    return num_edges
+
+
+def load_compacted_graph(graph_path, nodes_path):
+    """
+    Load compacted graph back into the pipeline's in memory edge and node format.
+    """
+    edges = [
+        [entity, company, {"label": relationship, "title": relationship}]
+        for entity, company, relationship in pl.read_csv(graph_path, schema=EDGE_SCHEMA).iter_rows()
+    ]
+    nodes = [
+        (name, {"label": label, "title": title})
+        for name, label, title in pl.read_ipc(nodes_path, memory_map=False).iter_rows()
+    ]
+    return edges, nodes
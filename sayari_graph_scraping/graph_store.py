@@ -0,0 +1,189 @@
+from array import array
+import networkx as nx
+import numpy as np
+import polars as pl
+from sayari_graph_scraping.graph_spill import EDGE_SCHEMA, nodes_frame
+from sayari_graph_scraping.node_registry import (
+    COMPANY_TOOLTIP,
+    ENTITY_TOOLTIP,
+    NodeRegistry,
+    normalize_name,
+)
+
+# Tooltip sources, rendered into text only at export time
+COMPANY = 0  # (COMPANY, company type, SOS control ID)
+ENTITY = 1  # (ENTITY, relationship)
+TEXT = 2  # (TEXT, already rendered tooltip), ex. loaded from a node table
+
+
+def render_tooltip(name, source):
+    kind = source[0]
+    if kind == COMPANY:
+        return COMPANY_TOOLTIP.format(name, source[1], source[2])
+    if kind == ENTITY:
+        return ENTITY_TOOLTIP.format(source[1], name)
+    return source[1]
+
+
+class GraphStore:
+    """
+    Compact in memory graph.
+
+    Node names are interned once and referred to by integer ID. Edges are
+    three typed array columns (entity ID, company ID, relationship enum),
+    about 9 bytes per edge instead of a list, a dict and two strings.
+    Tooltips are kept as small interned source tuples and only rendered
+    when nodes are exported (iter_nodes, nodes frame, networkx).
+    """
+
+    def __init__(self):
+        self.node_ids = {}  # name -> node ID
+        self.node_names = []  # node ID -> name
+        self.node_sources = []  # node ID -> tooltip source ID, or tuple of them
+        self.source_ids = {}  # tooltip source -> source ID
+        self.sources = []  # source ID -> tooltip source
+        self.relationship_ids = {}  # relationship -> enum value
+        self.relationships = []  # enum value -> relationship
+        self.src = array("i")  # entity node ID
+        self.dst = array("i")  # company node ID
+        self.rel = array("B")  # relationship enum
+
+    def add_node(self, name, source):
+        """
+        Add node, or add a tooltip source to it if it already exists.
+        Returns node ID.
+        """
+        name = normalize_name(name)
+        source_id = self.source_ids.get(source)
+        if source_id is None:
+            source_id = self.source_ids[source] = len(self.sources)
+            self.sources.append(source)
+        node_id = self.node_ids.get(name)
+        if node_id is None:
+            node_id = self.node_ids[name] = len(self.node_names)
+            self.node_names.append(name)
+            self.node_sources.append(source_id)
+            return node_id
+        current = self.node_sources[node_id]
+        if isinstance(current, int):
+            if current != source_id:
+                self.node_sources[node_id] = (current, source_id)
+        elif source_id not in current:
+            self.node_sources[node_id] = current + (source_id,)
+        return node_id
+
+    def add_edge(self, entity, company, relationship):
+        """
+        Add edge between two existing nodes, by name.
+        """
+        self.add_edge_ids(
+            self.node_ids[normalize_name(entity)], self.node_ids[normalize_name(company)], relationship
+        )
+
+    def add_edge_ids(self, entity_id, company_id, relationship):
+        """
+        Add edge between two existing nodes, by node ID (returned by add_node).
+        """
+        rel = self.relationship_ids.get(relationship)
+        if rel is None:
+            rel = self.relationship_ids[relationship] = len(self.relationships)
+            self.relationships.append(relationship)
+        self.src.append(entity_id)
+        self.dst.append(company_id)
+        self.rel.append(rel)
+
+    def node_title(self, node_id):
+        """
+        Tooltip of a node, merged from all of its sources the same way
+        NodeRegistry merges tooltips.
+        """
+        name = self.node_names[node_id]
+        source_ids = self.node_sources[node_id]
+        if isinstance(source_ids, int):
+            return render_tooltip(name, self.sources[source_ids])
+        attributes = {}
+        for source_id in source_ids:
+            NodeRegistry.merge_attributes(
+                attributes, {"title": render_tooltip(name, self.sources[source_id])}
+            )
+        return attributes["title"]
+
+    def merge(self, other):
+        """
+        Add every node and edge of another store, in order.
+        """
+        for node_id, name in enumerate(other.node_names):
+            source_ids = other.node_sources[node_id]
+            for source_id in (source_ids,) if isinstance(source_ids, int) else source_ids:
+                self.add_node(name, other.sources[source_id])
+        for src, dst, rel in zip(other.src, other.dst, other.rel):
+            self.add_edge(other.node_names[src], other.node_names[dst], other.relationships[rel])
+
+    def clear(self):
+        self.__init__()
+
+    @property
+    def num_edges(self):
+        return len(self.src)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_names)
+
+    def iter_nodes(self):
+        """
+        Yield (name, attributes) pairs, the format networkx add_nodes_from
+        and graph_spill.nodes_frame expect.
+        """
+        for node_id, name in enumerate(self.node_names):
+            yield name, {"label": "", "title": self.node_title(node_id)}
+
+    def iter_edges(self):
+        """
+        Yield edges as [entity, company, {"label": relationship, "title": relationship}].
+        """
+        for src, dst, rel in zip(self.src, self.dst, self.rel):
+            relationship = self.relationships[rel]
+            yield [
+                self.node_names[src],
+                self.node_names[dst],
+                {"label": relationship, "title": relationship},
+            ]
+
+    def edge_arrays(self):
+        """
+        Edge columns as NumPy arrays (no copy).
+        """
+        return (
+            np.frombuffer(self.src, dtype=np.int32),
+            np.frombuffer(self.dst, dtype=np.int32),
+            np.frombuffer(self.rel, dtype=np.uint8),
+        )
+
+    def edges_frame(self):
+        """
+        Edges as an EDGE_SCHEMA data frame, names are looked up by ID in bulk.
+        """
+        src, dst, rel = (pl.Series(column, dtype=pl.UInt32) for column in self.edge_arrays())
+        names = pl.Series(self.node_names, dtype=pl.String, strict=False)
+        relationships = pl.Series(self.relationships, dtype=pl.String, strict=False)
+        return pl.DataFrame(
+            {
+                "entity": names.gather(src),
+                "company": names.gather(dst),
+                "relationship": relationships.gather(rel),
+            },
+            schema=EDGE_SCHEMA,
+        )
+
+    def nodes_frame(self):
+        return nodes_frame(self.iter_nodes())
+
+    def write_csv(self, path):
+        self.edges_frame().write_csv(path)
+
+    def to_networkx(self):
+        G = nx.Graph()
+        G.add_nodes_from(self.iter_nodes())
+        G.add_edges_from(self.iter_edges())
+        return G
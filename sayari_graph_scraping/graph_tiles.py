@@ -0,0 +1,131 @@
+import gzip
+import json
+import os
+import shutil
+import numpy as np
+
+# Max number of nodes whose home is one tile. Components up to this size
+# are kept whole, larger ones are split into hub neighbourhoods.
+TILE_MAX_NODES = 2000
+# Canvas units (layout.py) to viewer pixels
+VIEWER_SCALE = 60
+
+
+def hub_neighbourhoods(G, nodes, max_nodes):
+    """
+    Split a large component into groups of at most max_nodes nodes:
+    biggest unassigned hub first, together with its unassigned neighbours.
+    """
+    groups = []
+    assigned = set()
+    for hub in sorted(nodes, key=lambda node: (-G.degree(node), str(node))):
+        if hub in assigned:
+            continue
+        group = [hub]
+        assigned.add(hub)
+        for neighbour in G.adj[hub]:
+            if neighbour not in assigned:
+                if len(group) == max_nodes:
+                    groups.append(group)
+                    group = []
+                group.append(neighbour)
+                assigned.add(neighbour)
+        groups.append(group)
+    return groups
+
+
+def assign_tiles(G, names, component_ids, max_nodes=TILE_MAX_NODES):
+    """
+    Give every node a home tile. Small components are bundled into tiles
+    of up to max_nodes nodes, large components are split per hub
+    neighbourhood. Returns {node: tile number}.
+    """
+    components = {}
+    for name, component in zip(names, component_ids):
+        components.setdefault(component, []).append(name)
+    groups = []
+    for nodes in components.values():
+        if len(nodes) <= max_nodes:
+            groups.append(nodes)
+        else:
+            groups.extend(hub_neighbourhoods(G, nodes, max_nodes))
+
+    home = {}
+    tile, tile_size = 0, 0
+    for group in groups:
+        if tile_size and tile_size + len(group) > max_nodes:
+            tile, tile_size = tile + 1, 0
+        for node in group:
+            home[node] = tile
+        tile_size += len(group)
+    return home
+
+
+def write_json_gz(path, obj):
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(obj, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def search_prefix(name):
+    """
+    Search index shard of a name: its first 2 alphanumeric characters.
+    The viewer derives the same key from what is typed in the search box.
+    """
+    key = "".join(c for c in name.lower() if c.isalnum())[:2]
+    return key.ljust(2, "_")
+
+
+def export_graph_tiles(G, names, xy, component_ids, data_dir, max_nodes=TILE_MAX_NODES, top_hubs=20):
+    """
+    Write the graph for the level-of-detail viewer (docs/viewer/) as
+    gzip-compressed JSON:
+
+    - tiles/<n>.json.gz: nodes whose home is tile n (name, tooltip,
+      position), every edge touching them, and the home tile and position
+      of neighbours living in other tiles so the viewer can expand them
+      on demand
+    - search/<prefix>.json.gz: name -> home tile, sharded by name prefix
+    - manifest.json: counts and the biggest hubs, for the landing view
+
+    Positions come from layout.py, so tiles loaded together line up.
+    """
+    if os.path.exists(data_dir):
+        shutil.rmtree(data_dir)
+    os.makedirs(os.path.join(data_dir, "tiles"))
+    os.makedirs(os.path.join(data_dir, "search"))
+
+    home = assign_tiles(G, names, component_ids, max_nodes)
+    num_tiles = max(home.values(), default=-1) + 1
+    tiles = [{"nodes": [], "edges": [], "external": {}} for _ in range(num_tiles)]
+    # vis-network y axis points down
+    positions = dict(zip(names, (np.round(xy * VIEWER_SCALE, 1) * (1, -1)).tolist()))
+    for name in names:
+        tiles[home[name]]["nodes"].append([name, G.nodes[name].get("title", name), *positions[name]])
+    for u, v, attributes in G.edges(data=True):
+        edge = [u, v, attributes.get("title", "")]
+        tiles[home[u]]["edges"].append(edge)
+        if home[v] != home[u]:
+            tiles[home[v]]["edges"].append(edge)
+            tiles[home[u]]["external"][v] = [home[v], *positions[v]]
+            tiles[home[v]]["external"][u] = [home[u], *positions[u]]
+    for tile_num, tile in enumerate(tiles):
+        write_json_gz(os.path.join(data_dir, "tiles", f"{tile_num}.json.gz"), tile)
+
+    search = {}
+    for name in names:
+        search.setdefault(search_prefix(str(name)), {})[name] = home[name]
+    for prefix, entries in search.items():
+        write_json_gz(os.path.join(data_dir, "search", f"{prefix}.json.gz"), entries)
+
+    hubs = sorted(G.degree(), key=lambda item: (-item[1], str(item[0])))[:top_hubs]
+    manifest = {
+        "num_nodes": G.number_of_nodes(),
+        "num_edges": G.number_of_edges(),
+        "num_tiles": num_tiles,
+        "search_prefixes": sorted(search),
+        "hubs": [{"name": name, "degree": degree, "tile": home[name]} for name, degree in hubs],
+    }
+    with open(os.path.join(data_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return num_tiles
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+
+# Recorded HTTP responses for offline crawls (see HttpArchiveMiddleware and
+# HTTP_ARCHIVE_MODE). One SQLite row per request, keyed by method, URL and
+# body (search shards are POSTs to one URL), response bodies zlib compressed.
+
+
+def request_key(method, url, body=b""):
+    digest = hashlib.sha1()
+    for part in (method.upper().encode(), url.encode(), body or b""):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class HttpArchive:
+    """
+    Archive of HTTP responses. Headers are stored as a JSON object of
+    header name to list of values.
+    """
+
+    def __init__(self, path, commit_every=1000, compress_level=6):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                request_key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+        self.commit_every = commit_every
+        self.compress_level = compress_level
+        self.pending_writes = 0
+
+    def put(self, method, url, body, status, headers, response_body):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                request_key(method, url, body),
+                method.upper(),
+                url,
+                status,
+                json.dumps(headers),
+                zlib.compress(response_body, self.compress_level),
+            ),
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.commit()
+
+    def get(self, method, url, body=b""):
+        """
+        (status, headers, body) of the recorded response, or None.
+        """
+        row = self.conn.execute(
+            "SELECT status, headers, body FROM responses WHERE request_key = ?",
+            (request_key(method, url, body),),
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, response_body = row
+        return status, json.loads(headers), zlib.decompress(response_body)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+        self.pending_writes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from twisted.internet import defer
+from sayari_graph_scraping.metrics import metrics
+
+# Item offloading: the graph pipeline's per item CPU work runs on a worker
+# thread (or a process pool) instead of the reactor thread, so it no longer
+# steals time from downloads. Items are consumed in the order they were
+# submitted, the graph comes out the same as processing them inline.
+STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class ItemOffloader:
+    """
+    Hand items to a background thread, in order.
+
+    consume runs on one worker thread for every item, in submission order.
+    With workers > 0, extract(item) first runs in a pool of worker
+    processes and consume receives its result, still in submission order.
+
+    At most max_pending items are in flight. Past that, submit returns a
+    Deferred that only fires once the worker catches up. Scrapy waits for
+    it before handing the item to the next pipeline, its scraper slot fills
+    up and the engine stops scheduling downloads (backpressure).
+    """
+
+    def __init__(
+        self,
+        consume,
+        extract=None,
+        workers=0,
+        max_pending=1000,
+        initializer=None,
+        initargs=(),
+        call_from_thread=None,
+    ):
+        self.consume = consume
+        self.extract = extract
+        self.max_pending = max_pending
+        self.pending = 0  # items queued or being consumed
+        self.waiting = deque()  # (item, Deferred) over max_pending
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.pool = None
+        if workers > 0:
+            # spawn, forking a process that runs the reactor and threads is unsafe
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        if call_from_thread is None:
+            # Imported here, importing the reactor at module level would
+            # install the default reactor before Scrapy installs its own
+            from twisted.internet import reactor
+
+            call_from_thread = reactor.callFromThread
+        self.call_from_thread = call_from_thread
+        self.thread = threading.Thread(target=self.run, name="item-offload", daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        self.queue.put(self.pool.submit(self.extract, item) if self.pool else item)
+
+    def submit(self, item):
+        """
+        Queue an item. Returns a Deferred that fires with the item once it
+        is queued, right away unless max_pending items are in flight.
+        """
+        deferred = defer.Deferred()
+        metrics.observe_depth("item_offload", self.pending + len(self.waiting))
+        with self.lock:
+            if self.waiting or self.pending >= self.max_pending:
+                self.waiting.append((item, deferred))
+                return deferred
+            self.pending += 1
+            self.put(item)
+        deferred.callback(item)
+        return deferred
+
+    def run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is STOP:
+                return
+            try:
+                self.consume(entry.result() if self.pool else entry)
+            except Exception:
+                logger.exception("Offloaded item processing failed")
+            self.call_from_thread(self.item_done)
+
+    def item_done(self):
+        """
+        Called on the reactor thread after each item, queues waiting items.
+        """
+        released = []
+        with self.lock:
+            self.pending -= 1
+            while self.waiting and self.pending < self.max_pending:
+                item, deferred = self.waiting.popleft()
+                self.pending += 1
+                self.put(item)
+                released.append((item, deferred))
+        for item, deferred in released:
+            deferred.callback(item)
+
+    def close(self):
+        """
+        Queue every waiting item and wait until all items are consumed.
+        """
+        with self.lock:
+            released = list(self.waiting)
+            self.waiting.clear()
+            for item, _ in released:
+                self.pending += 1
+                self.put(item)
+        for item, deferred in released:
+            deferred.callback(item)
+        self.queue.put(STOP)
+        self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -0,0 +1,108 @@
+import io
+import json
+
+try:
+    # Fast incremental parser (C backend when available)
+    import ijson
+except ImportError:  # pragma: no cover - depends on environment
+    ijson = None
+
+WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def iter_object_items(body, key, backend=None):
+    """
+    Iterate (key, value) pairs of the object stored under a top level key
+    of a JSON document, without decoding the whole document first.
+
+    Only one value is decoded at a time, so callers can start working on
+    the first row before the rest is parsed. Uses ijson when installed,
+    otherwise the stdlib decoder. The stdlib fallback first decodes a bytes
+    body to one str, so its memory still grows with the response size;
+    only the ijson backend keeps it bounded by the largest value.
+
+    Raises KeyError if key is not found and TypeError if it is not an object.
+    """
+    backend = backend or ("ijson" if ijson is not None else "stdlib")
+    if backend == "ijson":
+        return _iter_object_items_ijson(body, key)
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    return _iter_object_items_stdlib(body, key)
+
+
+def _iter_object_items_ijson(body, key):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    # use_float so numbers decode the same way as json.loads
+    events = ijson.parse(io.BytesIO(body), use_float=True)
+    for prefix, event, value in events:
+        if prefix == key:
+            if event != "start_map":
+                raise TypeError(f"Expected data format dict for {key}, but got {event}")
+            break
+    else:
+        raise KeyError(key)
+
+    for prefix, event, value in events:
+        if event == "end_map" and prefix == key:
+            return
+        # event is map_key, build the value that follows it
+        item_key = value
+        builder = ijson.ObjectBuilder()
+        depth = 0
+        for _, event, value in events:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+            if depth == 0:
+                break
+        yield item_key, builder.value
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _iter_object_items_stdlib(text, key):
+    pos = _skip_whitespace(text, 0)
+    if text[pos:pos + 1] != "{":
+        raise KeyError(key)
+
+    # Find key among top level keys, skipping values of other keys
+    pos += 1
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if text[pos:pos + 1] == "}":
+            raise KeyError(key)
+        current_key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos) + 1  # skip ":"
+        pos = _skip_whitespace(text, pos)
+        if current_key == key:
+            break
+        _, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if text[pos] == ",":
+            pos += 1
+
+    if text[pos:pos + 1] != "{":
+        value, _ = _decoder.raw_decode(text, pos)
+        raise TypeError(f"Expected data format dict for {key}, but got {type(value)}")
+
+    # Decode one item of the object at a time
+    pos += 1
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if text[pos] == "}":
+            return
+        if text[pos] == ",":
+            pos = _skip_whitespace(text, pos + 1)
+        item_key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos) + 1  # skip ":"
+        value, pos = _decoder.raw_decode(text, _skip_whitespace(text, pos))
+        yield item_key, value
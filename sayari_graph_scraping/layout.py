@@ -0,0 +1,217 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+import numpy as np
+
+# Components up to this size use dense force-directed layout (O(n^2) memory
+# per iteration), larger ones use sparse spectral layout.
+DENSE_LAYOUT_MAX_NODES = 1500
+COMPONENT_PADDING = 0.5
+
+
+def component_key(names, edges):
+    """
+    Hash identifying a component's node names and edges (index pairs with
+    i < j), used as layout cache key.
+    """
+    digest = hashlib.sha1("\0".join(names).encode("utf-8"))
+    digest.update(repr(sorted(edges)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def star_layout(n, hub):
+    """
+    Hub in the center, leaves on a circle. Most businesses are small stars.
+    """
+    pos = np.full((n, 2), 0.5)
+    leaves = [i for i in range(n) if i != hub]
+    angles = np.linspace(0, 2 * np.pi, len(leaves), endpoint=False)
+    pos[leaves, 0] = 0.5 + 0.5 * np.cos(angles)
+    pos[leaves, 1] = 0.5 + 0.5 * np.sin(angles)
+    return pos
+
+
+def force_directed_layout(n, src, dst, iterations=50, seed=0):
+    """
+    Vectorized Fruchterman-Reingold: all pairwise repulsions and all edge
+    attractions are computed as array operations per iteration.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    k = 1.0 / np.sqrt(n)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        # Repulsion k^2 / d along the unit vector, i.e. sum_j w_ij (p_i - p_j)
+        # with w_ij = k^2 / d_ij^2, as matrix products instead of an n x n x 2 array
+        sq_norm = (pos ** 2).sum(axis=1)
+        distance_sq = np.maximum(sq_norm[:, None] + sq_norm[None, :] - 2 * pos @ pos.T, 1e-4)
+        weight = k * k / distance_sq
+        displacement = pos * weight.sum(axis=1)[:, None] - weight @ pos
+        # Attraction d^2 / k along edges
+        edge_delta = pos[src] - pos[dst]
+        edge_force = edge_delta * (np.linalg.norm(edge_delta, axis=1) / k)[:, None]
+        np.subtract.at(displacement, src, edge_force)
+        np.add.at(displacement, dst, edge_force)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 1e-4)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return pos
+
+
+def spectral_layout(n, src, dst, iterations=200, seed=0):
+    """
+    Sparse spectral layout: the 2 leading non-trivial eigenvectors of the
+    normalized adjacency matrix, found by orthogonal iteration. Matrix
+    products use only the edge arrays (np.bincount), so memory is O(n + m).
+    """
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    inv_sqrt_degree = 1.0 / np.sqrt(np.maximum(degree, 1))
+
+    def multiply(x):
+        # Lazy walk (I + D^-1/2 A D^-1/2) / 2 keeps all eigenvalues >= 0
+        y = x * inv_sqrt_degree[:, None]
+        ay = np.stack(
+            [np.bincount(src, y[dst, j], n) + np.bincount(dst, y[src, j], n) for j in range(y.shape[1])],
+            axis=1,
+        )
+        return (x + ay * inv_sqrt_degree[:, None]) / 2
+
+    rng = np.random.default_rng(seed)
+    trivial = np.sqrt(degree)[:, None]  # leading eigenvector
+    trivial = trivial / np.linalg.norm(trivial)
+    x = rng.standard_normal((n, 2))
+    for _ in range(iterations):
+        x = multiply(x)
+        x -= trivial @ (trivial.T @ x)
+        x, _ = np.linalg.qr(x)
+    return x * inv_sqrt_degree[:, None]
+
+
+def layout_component(n, src, dst, seed=0):
+    """
+    Layout of one connected component, scaled to the unit square.
+    """
+    if n == 1:
+        return np.full((1, 2), 0.5)
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    if len(src) == n - 1 and degree.max() == n - 1:
+        return star_layout(n, int(degree.argmax()))
+    if n <= DENSE_LAYOUT_MAX_NODES:
+        pos = force_directed_layout(n, src, dst, seed=seed)
+    else:
+        pos = spectral_layout(n, src, dst, seed=seed)
+    pos = pos - pos.min(axis=0)
+    return pos / max(pos.max(), 1e-9)
+
+
+def _layout_batch(components):
+    return [layout_component(n, src, dst, seed) for n, src, dst, seed in components]
+
+
+def pack_components(layouts):
+    """
+    Shelf-pack component boxes onto one canvas, largest first (top left).
+    A component with n nodes gets a box of side sqrt(n).
+    Returns offsets and scales aligned with layouts.
+    """
+    sides = np.array([np.sqrt(len(pos)) for pos in layouts])
+    width = max(sides.max(), np.sqrt(((sides + COMPONENT_PADDING) ** 2).sum()) * 1.2)
+    offsets = np.zeros((len(layouts), 2))
+    x = y = shelf_height = 0.0
+    for i in np.argsort(-sides, kind="stable"):
+        if x > 0 and x + sides[i] > width:
+            x, y = 0.0, y + shelf_height + COMPONENT_PADDING
+            shelf_height = 0.0
+        offsets[i] = (x, -y - sides[i])  # shelves go downwards
+        x += sides[i] + COMPONENT_PADDING
+        shelf_height = max(shelf_height, sides[i])
+    return offsets, sides
+
+
+def load_layout_cache(cache_path):
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    return {}
+
+
+def save_layout_cache(cache_path, cache):
+    if not cache_path:
+        return
+    with open(cache_path + ".tmp", "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path + ".tmp", cache_path)
+
+
+def component_layout_arrays(G, workers=1, cache_path=None):
+    """
+    Scalable replacement for graphviz neato on the whole graph.
+    Every connected component is laid out on its own (in parallel across
+    processes when workers > 1), then component boxes are packed onto the
+    canvas. Component layouts are cached by component hash, so unchanged
+    components are not recomputed on the next run.
+    Returns flat arrays: node names, (n, 2) positions and the component
+    number of every node.
+    """
+    cache = load_layout_cache(cache_path)
+    components = []  # (names, key, n, src, dst)
+    for nodes in nx.connected_components(G):
+        names = sorted(nodes, key=str)
+        index = {name: i for i, name in enumerate(names)}
+        edges = [
+            (i, index[neighbour])
+            for i, name in enumerate(names)
+            for neighbour in G.adj[name]
+            if i < index[neighbour]
+        ]
+        key = component_key(names, edges)
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        components.append((names, key, len(names), edges[:, 0], edges[:, 1]))
+
+    missing = [c for c in components if c[1] not in cache]
+    tasks = [(n, src, dst, int(key[:8], 16)) for _, key, n, src, dst in missing]
+    if workers > 1 and len(tasks) > 1:
+        # Few batches of roughly equal cost (n^2) amortize process overhead
+        num_batches = workers * 4
+        batches = [[] for _ in range(num_batches)]
+        batch_costs = np.zeros(num_batches)
+        for task_num in sorted(range(len(tasks)), key=lambda i: -tasks[i][0]):
+            cheapest = int(batch_costs.argmin())
+            batches[cheapest].append(task_num)
+            batch_costs[cheapest] += tasks[task_num][0] ** 2
+        layouts = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batch_results = executor.map(_layout_batch, [[tasks[i] for i in batch] for batch in batches])
+            for batch, batch_result in zip(batches, batch_results):
+                for task_num, pos in zip(batch, batch_result):
+                    layouts[task_num] = pos
+    else:
+        layouts = _layout_batch(tasks)
+    for (_, key, _, _, _), pos in zip(missing, layouts):
+        cache[key] = pos
+    # Drop layouts of components that no longer exist
+    current = {key: cache[key] for _, key, _, _, _ in components}
+    if len(current) != len(cache) or missing:
+        save_layout_cache(cache_path, current)
+
+    component_layouts = [cache[key] for _, key, _, _, _ in components]
+    if not component_layouts:
+        return [], np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+    offsets, sides = pack_components(component_layouts)
+    names = [name for component in components for name in component[0]]
+    xy = np.concatenate(
+        [pos * side + offset for pos, offset, side in zip(component_layouts, offsets, sides)]
+    )
+    component_ids = np.repeat(np.arange(len(components)), [len(pos) for pos in component_layouts])
+    return names, xy, component_ids
+
+
+def component_layout(G, workers=1, cache_path=None):
+    """
+    component_layout_arrays as {node: np.array([x, y])}, like networkx layouts.
+    """
+    names, xy, _ = component_layout_arrays(G, workers, cache_path)
+    return dict(zip(names, xy))
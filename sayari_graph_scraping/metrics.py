@@ -0,0 +1,354 @@
+import contextlib
+import cProfile
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Run metrics (see METRICS_ENABLED): latency histograms of spider callbacks
+# and pipeline stages, queue depth histograms, counters and gauges, in one
+# process wide registry (metrics below). Code times a stage with
+#     with metrics.stage("pipeline.write_csv"): ...
+# which returns a shared no-op context while metrics are off, so the
+# instrumentation stays in place at the cost of one attribute check.
+# Snapshots are written as JSON and Prometheus text (MetricsExtension in
+# extensions.py, postprocess.py --metrics). One stage can be profiled with
+# cProfile (.prof, for snakeviz/flameprof) or a sampling profiler (collapsed
+# stacks, for flamegraph.pl/speedscope).
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf,
+)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf)
+NULL_STAGE = contextlib.nullcontext()
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, Prometheus style: counts[i] is the number of
+    values <= bounds[i] and > bounds[i - 1].
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q quantile (the max for the
+        last bucket), None when empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": {
+                "+Inf" if math.isinf(bound) else repr(bound): count
+                for bound, count in zip(self.bounds, self.counts)
+            },
+        }
+
+
+class StageTimer:
+    """
+    Times one run of a stage into its latency histogram. With accumulate,
+    time is summed over several enters (ex. every step of a generator) and
+    only recorded by record().
+    """
+
+    __slots__ = ("metrics", "name", "accumulate", "start", "elapsed")
+
+    def __init__(self, metrics, name, accumulate=False):
+        self.metrics = metrics
+        self.name = name
+        self.accumulate = accumulate
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        profiler = self.metrics.profiler
+        if profiler is not None and profiler.stage == self.name:
+            profiler.enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self.start
+        profiler = self.metrics.profiler
+        if profiler is not None and profiler.stage == self.name:
+            profiler.exit()
+        if not self.accumulate:
+            self.record()
+
+    def record(self):
+        self.metrics.observe(self.name, self.elapsed)
+
+
+class StageProfiler:
+    """
+    Profile every run of one stage. "cprofile" keeps one cProfile.Profile
+    per thread running the stage and writes their merged stats to
+    <path>.prof. "sampling" samples the stacks of threads inside the stage
+    every interval seconds and writes collapsed stacks ("a;b;c count" per
+    line) to <path>.folded.
+    """
+
+    def __init__(self, stage, kind="cprofile", path="output/profile", interval=0.005):
+        if kind not in ("cprofile", "sampling"):
+            raise ValueError(f"Unknown profiler: {kind}")
+        self.stage = stage
+        self.kind = kind
+        self.path = path
+        self.interval = interval
+        self.local = threading.local()  # stage nesting depth of this thread
+        self.profiles = {}  # thread id -> cProfile.Profile
+        self.active = set()  # thread ids inside the stage
+        self.stacks = Counter()
+        self.sampler = None
+        self.stopped = threading.Event()
+        if kind == "sampling":
+            self.sampler = threading.Thread(target=self.sample, name="stage-sampler", daemon=True)
+            self.sampler.start()
+
+    def enter(self):
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        if depth:
+            return  # nested run of the same stage, already profiled
+        thread_id = threading.get_ident()
+        if self.kind == "cprofile":
+            profile = self.profiles.get(thread_id)
+            if profile is None:
+                profile = self.profiles[thread_id] = cProfile.Profile()
+            profile.enable()
+        else:
+            self.active.add(thread_id)
+
+    def exit(self):
+        self.local.depth -= 1
+        if self.local.depth:
+            return
+        thread_id = threading.get_ident()
+        if self.kind == "cprofile":
+            self.profiles[thread_id].disable()
+        else:
+            self.active.discard(thread_id)
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.active):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self):
+        """
+        Write the profile, returns its path (None if the stage never ran).
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.kind == "cprofile":
+            profiles = list(self.profiles.values())
+            if not profiles:
+                return None
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(self.path + ".prof")
+            return self.path + ".prof"
+        self.stopped.set()
+        self.sampler.join()
+        if not self.stacks:
+            return None
+        with open(self.path + ".folded", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return self.path + ".folded"
+
+
+class Metrics:
+    """
+    Registry of stage latencies, queue depths, counters and gauges. Safe to
+    update from the reactor thread and worker threads. Every update is a
+    no-op while disabled.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.profiler = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.timings = {}  # stage -> Histogram of seconds
+            self.depths = {}  # queue -> Histogram of sampled depths
+            self.counters = {}
+            self.gauges = {}
+
+    def configure(self, enabled=True, profile_stage=None, profiler="cprofile", profile_path="output/profile"):
+        """
+        Enable (or disable) metrics, starting from an empty registry, and
+        profile profile_stage when given.
+        """
+        self.close_profiler()
+        self.reset()
+        if enabled and profile_stage:
+            self.profiler = StageProfiler(profile_stage, profiler, profile_path)
+        self.enabled = enabled
+
+    def close_profiler(self):
+        """
+        Stop profiling, returns the path of the written profile, if any.
+        """
+        profiler, self.profiler = self.profiler, None
+        return profiler.dump() if profiler is not None else None
+
+    def stage(self, name, accumulate=False):
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, name, accumulate)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.timings.get(name)
+            if histogram is None:
+                histogram = self.timings[name] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_depth(self, name, depth):
+        """
+        Sample the depth of a queue: its histogram and its current value.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.depths.get(name)
+            if histogram is None:
+                histogram = self.depths[name] = Histogram(DEPTH_BUCKETS)
+            histogram.observe(depth)
+            self.gauges[f"{name}.depth"] = depth
+
+    def inc(self, name, count=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "time": time.time(),
+                "uptime_seconds": time.time() - self.started,
+                "stages": {name: h.to_dict() for name, h in sorted(self.timings.items())},
+                "queues": {name: h.to_dict() for name, h in sorted(self.depths.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def prometheus_text(self, extra_gauges=None, prefix="sayari"):
+        """
+        Prometheus text exposition format. extra_gauges (ex. Scrapy stats)
+        are exported as <prefix>_stat{name="..."}, numbers only.
+        """
+        lines = []
+
+        def histogram_lines(family, label, histograms):
+            lines.append(f"# TYPE {prefix}_{family} histogram")
+            for name, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if math.isinf(bound) else repr(bound)
+                    lines.append(f'{prefix}_{family}_bucket{{{label}="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_{family}_sum{{{label}="{name}"}} {histogram.sum!r}')
+                lines.append(f'{prefix}_{family}_count{{{label}="{name}"}} {histogram.count}')
+
+        with self.lock:
+            histogram_lines("stage_seconds", "stage", self.timings)
+            histogram_lines("queue_depth", "queue", self.depths)
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+            lines.append(f"# TYPE {prefix}_gauge gauge")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'{prefix}_gauge{{name="{name}"}} {value}')
+        if extra_gauges:
+            lines.append(f"# TYPE {prefix}_stat gauge")
+            for name, value in sorted(extra_gauges.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = name.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{prefix}_stat{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, json_path=None, prometheus_path=None, extra=None):
+        """
+        Write a snapshot as JSON (with extra, ex. Scrapy stats, under
+        "stats") and/or Prometheus text. Files are replaced atomically.
+        """
+        if json_path:
+            snapshot = self.snapshot()
+            if extra is not None:
+                snapshot["stats"] = extra
+            write_atomic(json_path, json.dumps(snapshot, indent=2, default=str))
+        if prometheus_path:
+            write_atomic(prometheus_path, self.prometheus_text(extra))
+
+
+def write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+metrics = Metrics()  # process wide registry, off until configured
@@ -3,7 +3,20 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import random
+import time
 from scrapy import signals
+from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Response
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.response import response_status_message
+from twisted.internet.task import deferLater
+from sayari_graph_scraping.adaptive_concurrency import AimdController, parse_retry_after
+from sayari_graph_scraping.http_archive import HttpArchive
+from sayari_graph_scraping.metrics import metrics
+
+STOP = object()
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -56,6 +69,46 @@ class SayariGraphScrapingSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
+class MetricsSpiderMiddleware:
+    """
+    Times spider callbacks into the metrics registry (see metrics.py), as
+    stage spider.<callback name>, and download latencies as stage download.
+    Callbacks are generators, only the time spent inside them is counted,
+    not the time their output spends in the engine. Sits closest to the
+    spider (see SPIDER_MIDDLEWARES), so it sees the callback's own output.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured("METRICS_ENABLED is off")
+        return cls()
+
+    def process_spider_input(self, response, spider):
+        latency = response.meta.get("download_latency")
+        if latency is not None:
+            metrics.observe("download", latency)
+        return None
+
+    def process_spider_output(self, response, result, spider):
+        callback = response.request.callback if response.request is not None else None
+        return self.timed_output(f"spider.{getattr(callback, '__name__', 'parse')}", result)
+
+    def timed_output(self, stage, result):
+        if not metrics.enabled:
+            yield from result
+            return
+        timer = metrics.stage(stage, accumulate=True)
+        iterator = iter(result)
+        while True:
+            with timer:
+                output = next(iterator, STOP)
+            if output is STOP:
+                break
+            yield output
+        timer.record()
+
+
 class SayariGraphScrapingDownloaderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
     # scrapy acts as if the downloader middleware does not modify the
@@ -101,3 +154,165 @@ class SayariGraphScrapingDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class AdaptiveConcurrencyMiddleware(RetryMiddleware):
+    """
+    Adjusts each download slot's number of in-flight requests with an
+    AimdController (see adaptive_concurrency.py), from response latency,
+    429/5xx/timeouts and Retry-After. Takes the place of Scrapy's
+    RetryMiddleware (see DOWNLOADER_MIDDLEWARES in settings.py): retries
+    wait a jittered exponential backoff, or Retry-After when longer.
+    Controller state is kept in the crawl stats under adaptive/<slot>/.
+    With ADAPTIVE_CONCURRENCY_ENABLED off, it is a plain RetryMiddleware.
+    """
+
+    def __init__(self, crawler):
+        super().__init__(crawler.settings)
+        settings = crawler.settings
+        self.crawler = crawler
+        self.enabled = settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED", False)
+        self.controller_options = {
+            "concurrency": settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN", 8),
+            "min_concurrency": settings.getint("ADAPTIVE_MIN_CONCURRENCY", 1),
+            "max_concurrency": settings.getint("ADAPTIVE_MAX_CONCURRENCY", 32),
+            "target_latency": settings.getfloat("ADAPTIVE_TARGET_LATENCY", 2.0),
+        }
+        self.retry_base_delay = settings.getfloat("ADAPTIVE_RETRY_BASE_DELAY", 0.5)
+        self.retry_max_delay = settings.getfloat("ADAPTIVE_RETRY_MAX_DELAY", 30.0)
+        self.rng = random.Random()
+        self.controllers = {}  # slot key -> AimdController
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def controller(self, key):
+        if key not in self.controllers:
+            self.controllers[key] = AimdController(**self.controller_options)
+        return self.controllers[key]
+
+    def process_request(self, request, spider):
+        if not self.enabled:
+            return None
+        key = self.crawler.engine.downloader.get_slot_key(request)
+        delay = max(
+            self.controller(key).pause_remaining(),
+            request.meta.get("retry_not_before", 0) - time.monotonic(),
+        )
+        if delay > 0:
+            # Imported here, see item_offload.py
+            from twisted.internet import reactor
+
+            # Deferred firing None, the request continues after the delay
+            return deferLater(reactor, delay, lambda: None)
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self.enabled:
+            return super().process_response(request, response, spider)
+        retry_after = parse_retry_after(response.headers.get(b"Retry-After"))
+        throttled = response.status == 429 or response.status >= 500
+        self.observe(request, spider, request.meta.get("download_latency"), throttled, retry_after)
+        if request.meta.get("dont_retry", False) or response.status not in self.retry_http_codes:
+            return response
+        reason = response_status_message(response.status)
+        return self.retry(request, reason, spider, retry_after) or response
+
+    def process_exception(self, request, exception, spider):
+        if not self.enabled:
+            return super().process_exception(request, exception, spider)
+        if not isinstance(exception, self.exceptions_to_retry):
+            return None
+        self.observe(request, spider, None, True)  # timeouts and refused connections
+        if request.meta.get("dont_retry", False):
+            return None
+        return self.retry(request, exception, spider)
+
+    def observe(self, request, spider, latency, throttled, retry_after=None):
+        key = request.meta.get("download_slot") or self.crawler.engine.downloader.get_slot_key(request)
+        controller = self.controller(key)
+        change = controller.record(latency, throttled, retry_after)
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is not None:
+            slot.concurrency = controller.limit
+        if change:
+            spider.logger.debug(
+                f"Adaptive concurrency {change} for {key}: {controller.metrics()}"
+            )
+        for name, value in controller.metrics().items():
+            self.crawler.stats.set_value(f"adaptive/{key}/{name}", value)
+
+    def backoff(self, retry_times, retry_after=None):
+        """
+        Full jitter exponential backoff: uniform between 0 and
+        base * 2 ** (retry_times - 1), capped, at least retry_after.
+        """
+        ceiling = min(self.retry_max_delay, self.retry_base_delay * 2 ** (retry_times - 1))
+        return max(retry_after or 0.0, self.rng.uniform(0, ceiling))
+
+    def retry(self, request, reason, spider, retry_after=None):
+        retry_request = self._retry(request, reason, spider)
+        if retry_request is None:
+            return None
+        delay = self.backoff(retry_request.meta["retry_times"], retry_after)
+        retry_request.meta["retry_not_before"] = time.monotonic() + delay
+        return retry_request
+
+    def spider_closed(self, spider):
+        for key, controller in self.controllers.items():
+            spider.logger.info(f"Adaptive concurrency for {key}: {controller.metrics()}")
+
+
+class HttpArchiveMiddleware:
+    """
+    Records responses to an HttpArchive (HTTP_ARCHIVE_MODE = "record") or
+    serves them back without touching the network ("replay"). Requests
+    missing from the archive get a 404 in replay mode. Synthetic archives
+    come from synthetic_registry.py.
+    """
+
+    def __init__(self, crawler, mode, path):
+        self.crawler = crawler
+        self.mode = mode
+        self.archive = HttpArchive(path)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mode = crawler.settings.get("HTTP_ARCHIVE_MODE", "off")
+        if mode == "off":
+            raise NotConfigured
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown HTTP_ARCHIVE_MODE: {mode}")
+        return cls(crawler, mode, crawler.settings.get("HTTP_ARCHIVE_PATH"))
+
+    def process_request(self, request, spider):
+        if self.mode != "replay":
+            return None
+        entry = self.archive.get(request.method, request.url, request.body)
+        if entry is None:
+            self.crawler.stats.inc_value("archive/miss")
+            return Response(request.url, status=404, request=request, flags=["archive_miss"])
+        self.crawler.stats.inc_value("archive/hit")
+        status, headers, body = entry
+        response_class = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return response_class(
+            request.url, status=status, headers=headers, body=body, request=request, flags=["replayed"]
+        )
+
+    def process_response(self, request, response, spider):
+        if self.mode == "record":
+            headers = {
+                key.decode("latin-1"): [value.decode("latin-1") for value in values]
+                for key, values in response.headers.items()
+            }
+            self.archive.put(
+                request.method, request.url, request.body, response.status, headers, response.body
+            )
+            self.crawler.stats.inc_value("archive/recorded")
+        return response
+
+    def spider_closed(self, spider):
+        self.archive.close()
@@ -0,0 +1,108 @@
+# Hover tooltips of company and entity (agent/owner) nodes
+COMPANY_TOOLTIP = """Company Title: {}
+                        Company Type: {}
+                        SOS Control ID# {}
+                    """
+ENTITY_TOOLTIP = "{} : {}"
+
+
+def has_tooltip(title, tooltip):
+    """
+    Whether tooltip is one of the tooltips merged into title (joined by
+    newlines). Matches whole tooltips only, "REGISTERED_AGENT : X" is not in
+    "COMMERCIAL_REGISTERED_AGENT : X". Tooltips may span several lines.
+    """
+    return (
+        title == tooltip
+        or title.startswith(tooltip + "\n")
+        or title.endswith("\n" + tooltip)
+        or f"\n{tooltip}\n" in title
+    )
+
+
+def merge_tooltips(tooltips):
+    """
+    Merge tooltips in order, the way NodeRegistry.merge_attributes merges
+    them one at a time. Used by the batch engine and graph part compaction.
+    """
+    title = ""
+    for tooltip in tooltips:
+        if not tooltip:
+            continue
+        if not title:
+            title = tooltip
+        elif not has_tooltip(title, tooltip):
+            title = f"{title}\n{tooltip}"
+    return title
+
+
+def normalize_name(name):
+    """
+    Upper case and strip string, and replace contiguous spaces with one space.
+    Non string names (ex. None) are returned untouched.
+    """
+    if not isinstance(name, str):
+        return name
+    # str.split() splits on exactly the characters re's \s matches, and
+    # strips, about 3x faster than re.sub on the pipeline hot path
+    return " ".join(name.upper().split())
+
+
+class NodeRegistry:
+    """
+    Graph nodes keyed by normalized name.
+
+    Membership checks and inserts are O(1) dictionary operations,
+    so adding a node no longer requires scanning every node seen so far.
+    Iterating the registry yields (name, attributes) pairs, the same
+    format networkx expects in add_nodes_from.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+
+    def add(self, name, attributes=None):
+        """
+        Add node, or merge attributes into node if it already exists.
+        Returns True if node is new.
+        """
+        key = normalize_name(name)
+        attributes = attributes or {}
+        existing = self._nodes.get(key)
+        if existing is None:
+            self._nodes[key] = dict(attributes)
+            return True
+        self.merge_attributes(existing, attributes)
+        return False
+
+    @staticmethod
+    def merge_attributes(existing, attributes):
+        """
+        Fill in missing attributes. Tooltips ("title") from different
+        sources are kept, for example when a company is also the owner
+        of another company.
+        """
+        for key, value in attributes.items():
+            current = existing.get(key)
+            if current in (None, ""):
+                existing[key] = value
+            elif key == "title" and value and not has_tooltip(current, value):
+                existing[key] = f"{current}\n{value}"
+
+    def get(self, name, default=None):
+        return self._nodes.get(normalize_name(name), default)
+
+    def names(self):
+        return self._nodes.keys()
+
+    def clear(self):
+        self._nodes.clear()
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.items())
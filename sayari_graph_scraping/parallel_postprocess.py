@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from sayari_graph_scraping.data_lake import record_id
+from sayari_graph_scraping.data_quality import DataQualityCollector
+from sayari_graph_scraping.extraction import load_extraction_rules
+from sayari_graph_scraping.graph_store import GraphStore
+
+
+def list_lake_files(path):
+    """
+    Data lake input is either one JSONL file or a directory of JSONL shards.
+    """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.jsonl")))
+    return [path]
+
+
+def split_line_chunks(paths, num_chunks):
+    """
+    Split files into roughly num_chunks byte ranges (path, start, end).
+    Boundaries are moved forward to the next newline, so every line
+    belongs to exactly one chunk.
+    """
+    total_size = sum(os.path.getsize(path) for path in paths)
+    chunk_size = max(1, total_size // max(1, num_chunks))
+    chunks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            start = 0
+            while start < size:
+                f.seek(min(start + chunk_size, size))
+                f.readline()  # move to end of current line
+                end = min(f.tell(), size)
+                chunks.append((path, start, end))
+                start = end
+    return chunks
+
+
+def process_chunk(path, start, end, title_prefix, rules_path):
+    """
+    Run every record of one byte range through the pipeline's edge extraction.
+    Returns one (business id, GraphStore, data quality issues) per record, in
+    file order, so the parent can drop superseded records and merge in order.
+    """
+    # Imported here so worker processes only pay for it once per chunk
+    from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+    pipeline = SayariGraphScrapingPipeline(
+        title_prefix=title_prefix,
+        extraction_rules=load_extraction_rules(rules_path),
+        quality=worker_quality(),
+    )
+    results = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            pipeline.graph = GraphStore()
+            pipeline.write_to_knowledge_graph(item)
+            results.append((record_id(item), pipeline.graph, pipeline.quality.drain()))
+    return results
+
+
+def worker_quality():
+    """
+    Data quality collector of a worker process: logs nothing, its issues
+    are handed to the parent's collector.
+    """
+    return DataQualityCollector(log_interval=None, keep_issues=True)
+
+
+worker_pipeline = None  # one per crawl worker process, see init_item_worker
+
+
+def init_item_worker(title_prefix, rules_path):
+    """
+    Process pool initializer for offloaded crawl items (item_offload.py).
+    """
+    global worker_pipeline
+    from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+    worker_pipeline = SayariGraphScrapingPipeline(
+        title_prefix=title_prefix,
+        extraction_rules=load_extraction_rules(rules_path),
+        quality=worker_quality(),
+    )
+
+
+def extract_item_graph(item):
+    """
+    Edge extraction of one crawl item, returns its GraphStore and data
+    quality issues for the crawl process to merge.
+    """
+    worker_pipeline.graph = GraphStore()
+    worker_pipeline.write_to_knowledge_graph(item)
+    return worker_pipeline.graph, worker_pipeline.quality.drain()
+
+
+def build_graph_parallel(path, pipeline, workers, rules_path=None):
+    """
+    Fill pipeline.graph from the data lake using
+    a pool of worker processes. Per-record results are merged in file order,
+    keeping only the latest record of each business, so the output is the
+    same as processing the lake sequentially.
+    """
+    chunks = split_line_chunks(list_lake_files(path), workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_chunk, *chunk, pipeline.title_prefix, rules_path)
+            for chunk in chunks
+        ]
+        chunk_results = [future.result() for future in futures]
+
+    # Latest position of every business across all chunks
+    latest = {}
+    for chunk_num, results in enumerate(chunk_results):
+        for record_num, (business_id, _, _) in enumerate(results):
+            latest[business_id] = (chunk_num, record_num)
+
+    for chunk_num, results in enumerate(chunk_results):
+        for record_num, (business_id, graph, issues) in enumerate(results):
+            if latest[business_id] != (chunk_num, record_num):
+                continue  # superseded by a later version of the business
+            pipeline.graph.merge(graph)
+            for issue in issues:
+                pipeline.quality.record(*issue)
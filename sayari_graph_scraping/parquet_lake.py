@@ -0,0 +1,143 @@
+import glob
+import os
+import time
+import polars as pl
+
+# Columnar copy of the data lake. Fields outside this schema only live in the
+# JSONL feed, which stays the full-fidelity record.
+LAKE_PARQUET_SCHEMA = {
+    "SORT_INDEX": pl.Int64,
+    "TITLE": pl.List(pl.String),
+    "ID": pl.Int64,
+    "FILING_DATE": pl.String,
+    "RECORD_NUM": pl.String,
+    "STATUS": pl.String,
+    "STANDING": pl.String,
+    "ALERT": pl.Boolean,
+    "CAN_REINSTATE": pl.Boolean,
+    "CAN_FILE_AR": pl.Boolean,
+    "CAN_ALWAYS_FILE_AR": pl.Boolean,
+    "CAN_FILE_REINSTATEMENT": pl.Boolean,
+    "ID_key": pl.String,
+    "DRAWER_DETAIL_LIST": pl.List(
+        pl.Struct(
+            {
+                "LABEL": pl.String,
+                "VALUE": pl.String,
+                "TYPE": pl.String,
+                "LINKLABEL": pl.String,
+                "ALERT_YN": pl.Boolean,
+            }
+        )
+    ),
+}
+# Run id of the crawl a resumed crawl continues, see ParquetLakeWriter
+CRAWL_START_FILE = "_crawl_start"
+
+
+class ParquetLakeWriter:
+    """
+    Write business records as zstd-compressed Parquet, partitioned by crawl
+    date (<lake_dir>/crawl_date=YYYY-MM-DD/part-<run_id>-<n>.parquet).
+
+    Records are buffered and flushed as one row group (part file) every
+    row_group_size records, so data is durable during the crawl and memory
+    stays bounded.
+
+    A new crawl records its run id in <lake_dir>/_crawl_start. With resume,
+    the run continues that crawl: parts of the interrupted runs are kept
+    when it closes with overwrite.
+    """
+
+    def __init__(self, lake_dir, row_group_size=5000, run_id=None, resume=False):
+        self.lake_dir = lake_dir
+        self.row_group_size = row_group_size
+        # Sortable, unique per run even when runs start within the same second
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S") + f".{time.time_ns() % 10**9:09d}"
+        os.makedirs(lake_dir, exist_ok=True)
+        marker = os.path.join(lake_dir, CRAWL_START_FILE)
+        if resume and os.path.exists(marker):
+            with open(marker) as f:
+                self.crawl_start = f.read().strip()
+        else:
+            self.crawl_start = self.run_id
+            with open(marker + ".tmp", "w") as f:
+                f.write(self.run_id)
+            os.replace(marker + ".tmp", marker)
+        self.partition_dir = os.path.join(lake_dir, f"crawl_date={time.strftime('%Y-%m-%d')}")
+        os.makedirs(self.partition_dir, exist_ok=True)
+        self.buffer = []
+        self.part_num = 0
+        self.written_paths = []
+
+    def write(self, item):
+        self.buffer.append(dict(item))
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        df = pl.DataFrame(self.buffer, schema=LAKE_PARQUET_SCHEMA, strict=False)
+        path = os.path.join(self.partition_dir, f"part-{self.run_id}-{self.part_num:06d}.parquet")
+        # Temp file + rename, readers never see a half written part
+        df.write_parquet(path + ".tmp", compression="zstd", statistics=True)
+        os.replace(path + ".tmp", path)
+        self.written_paths.append(path)
+        self.buffer = []
+        self.part_num += 1
+
+    def close(self, overwrite=False):
+        """
+        Flush remaining records. With overwrite, parts from earlier crawls
+        are removed once this run's parts are safely written.
+        """
+        self.flush()
+        if overwrite:
+            keep = set(self.written_paths)
+            for path in list_parquet_parts(self.lake_dir):
+                if path not in keep and part_run_id(path) < self.crawl_start:
+                    os.remove(path)
+            for partition_dir in glob.glob(os.path.join(self.lake_dir, "*")):
+                if os.path.isdir(partition_dir) and not os.listdir(partition_dir):
+                    os.rmdir(partition_dir)
+
+
+def part_run_id(path):
+    """
+    Run id of a part-<run_id>-<n>.parquet file.
+    """
+    return os.path.basename(path)[len("part-") :].rsplit("-", 1)[0]
+
+
+def list_parquet_parts(lake_dir):
+    return sorted(glob.glob(os.path.join(lake_dir, "*", "*.parquet")))
+
+
+def is_parquet_lake(path):
+    return isinstance(path, str) and os.path.isdir(path) and bool(list_parquet_parts(path))
+
+
+def scan_parquet_lake(lake_dir):
+    """
+    Lazily scan the Parquet lake. Select only the columns you need, ex.
+    scan_parquet_lake(path).select("TITLE", "RECORD_NUM"), and only those
+    columns are read from disk. Parts are read oldest first.
+    """
+    return pl.scan_parquet(list_parquet_parts(lake_dir), hive_partitioning=True)
+
+
+def iter_parquet_records(lake_dir):
+    """
+    Yield the latest record of every business as a dict, in write order.
+    Same records iter_latest_records yields for the JSONL lake.
+    """
+    latest = (
+        scan_parquet_lake(lake_dir)
+        .select(list(LAKE_PARQUET_SCHEMA))
+        .with_columns(business_id=pl.coalesce(pl.col("ID").cast(pl.String), pl.col("ID_key")))
+        .unique("business_id", keep="last", maintain_order=True)
+        .drop("business_id")
+        .collect()
+    )
+    yield from latest.iter_rows(named=True)
@@ -7,204 +7,522 @@
 # useful for handling different item types with a single interface
 # from itemadapter import ItemAdapter
 import os
-import random
 import json
-import jmespath
-import networkx as nx
-import matplotlib.pyplot as plt
 import logging
-import re
-import polars as pl
 from pyvis.network import Network
+from scrapy.exceptions import NotConfigured
+from sayari_graph_scraping.node_registry import normalize_name
+from sayari_graph_scraping.graph_store import COMPANY, ENTITY, TEXT, GraphStore
+from sayari_graph_scraping.extraction import load_extraction_rules
+from sayari_graph_scraping.parquet_lake import ParquetLakeWriter
+from sayari_graph_scraping.layout import component_layout_arrays
+from sayari_graph_scraping.render import graph_arrays, render_png, render_tiles
+from sayari_graph_scraping.graph_tiles import export_graph_tiles
+from sayari_graph_scraping.graph_db import GraphDatabase
+from sayari_graph_scraping.entity_resolution import resolve_graph_entities
+from sayari_graph_scraping.item_offload import ItemOffloader
+from sayari_graph_scraping.metrics import metrics
+from sayari_graph_scraping.search_shards import resumes_crawl
+from sayari_graph_scraping.data_quality import DataQualityCollector, QueueLogging
+from sayari_graph_scraping.parallel_postprocess import extract_item_graph, init_item_worker
+from sayari_graph_scraping.graph_spill import (
+    GraphPartWriter,
+    compact_graph_parts,
+    list_part_runs,
+    load_compacted_graph,
+    write_node_table,
+)
+from sayari_graph_scraping.render_stage import (
+    enqueue_render,
+    publish_graph_artifact,
+    spawn_render_worker,
+)
+
+# Interesting drawer labels (normalized) and the relationship their edges are
+# written with. Rows with an empty label that follow OWNERS are more owners.
+RELATIONSHIP_LABELS = {
+    "COMMERCIAL_REGISTERED_AGENT": "COMMERCIAL_REGISTERED_AGENT",
+    "REGISTERED_AGENT": "REGISTERED_AGENT",
+    "OWNER_NAME": "OWNER_NAME",
+    "OWNERS": "OWNER_NAME",
+}
+# Raw drawer label -> interesting label name or "", filled in as labels are
+# seen so the hot path is one dict lookup per drawer row
+LABEL_TABLE = {}
+MAX_LABEL_TABLE_SIZE = 10000
+
+
+class ParquetLakePipeline:
+    """
+    Write crawled business records to the columnar (Parquet) data lake,
+    alongside the JSONL feed. Row groups are flushed during the crawl.
+    """
+
+    def __init__(self, lake_dir, row_group_size=5000, overwrite=True, resume=False):
+        self.lake_dir = lake_dir
+        self.row_group_size = row_group_size
+        self.overwrite = overwrite  # same as the JSONL feed
+        self.resume = resume
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("PARQUET_LAKE_ENABLED"):
+            raise NotConfigured("PARQUET_LAKE_ENABLED is off")
+        return cls(
+            lake_dir=settings.get("PARQUET_LAKE_DIR"),
+            row_group_size=settings.getint("PARQUET_ROW_GROUP_SIZE", 5000),
+            # Incremental crawls append deltas, full crawls replace the lake.
+            # A resumed full crawl keeps the parts of the run it continues.
+            overwrite=not settings.getbool("INCREMENTAL_CRAWL_ENABLED"),
+            resume=resumes_crawl(settings),
+        )
+
+    def open_spider(self, spider):
+        self.writer = ParquetLakeWriter(self.lake_dir, self.row_group_size, resume=self.resume)
+
+    def process_item(self, item, spider):
+        with metrics.stage("pipeline.parquet_lake"):
+            self.writer.write(item)
+        return item
+
+    def close_spider(self, spider):
+        self.writer.close(overwrite=self.overwrite)
+
+
+class GraphDatabasePipeline:
+    """
+    Upsert companies, entities and relationships into the graph database
+    (see graph_db.py), one transaction every batch_size relationships.
+    With analytics, hub and component side tables are updated as well
+    (see graph_analytics.py).
+
+    In a crawl, the graph pipeline hands over its graph (write_batch) every
+    time it spills a batch (streaming mode, on its offload worker when
+    offloading is on) and once more on close, so items are extracted once.
+    Without a graph pipeline, items are extracted here.
+    """
+
+    def __init__(
+        self,
+        database_url,
+        batch_size=5000,
+        title_prefix="X",
+        extraction_rules=None,
+        output_dir=None,
+        analytics=True,
+        quality=None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.database_url = database_url
+        self.batch_size = batch_size
+        self.analytics = analytics
+        # Same extraction as the graph pipeline, the extracted batch is
+        # written to the database instead of graph.csv. Data quality issues
+        # go to the given collector, the graph pipeline's one in a crawl.
+        self.extractor = SayariGraphScrapingPipeline(
+            output_dir=output_dir,
+            title_prefix=title_prefix,
+            extraction_rules=extraction_rules,
+            quality=quality,
+        )
+        self.database = None
+        self.num_written = 0
+        self.graph_pipeline = None  # SayariGraphScrapingPipeline feeding write_batch
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get("GRAPH_DATABASE_URL"):
+            raise NotConfigured("GRAPH_DATABASE_URL is not set")
+        return cls(
+            database_url=settings.get("GRAPH_DATABASE_URL"),
+            batch_size=settings.getint("GRAPH_DATABASE_BATCH_SIZE", 5000),
+            title_prefix=settings.get("GRAPH_TITLE_PREFIX", "X"),
+            extraction_rules=load_extraction_rules(settings.get("EXTRACTION_RULES_PATH")),
+            analytics=settings.getbool("GRAPH_DATABASE_ANALYTICS", True),
+            quality=DataQualityCollector(
+                sample_size=settings.getint("DATA_QUALITY_SAMPLE_SIZE", 20),
+                log_interval=settings.getfloat("DATA_QUALITY_LOG_INTERVAL", 60.0),
+            ),
+        )
+
+    def open_spider(self, spider):
+        self.database = GraphDatabase(self.database_url, analytics=self.analytics)
+        self.graph_pipeline = find_graph_pipeline(spider)
+        if self.graph_pipeline is not None:
+            self.graph_pipeline.graph_sinks.append(self)
+            self.extractor.quality = self.graph_pipeline.quality  # one collector per crawl
+
+    def process_item(self, item, spider):
+        if self.graph_pipeline is not None:
+            return item  # written by write_batch
+        with metrics.stage("pipeline.graph_database.extract"):
+            self.extractor.write_to_knowledge_graph(item)
+        if self.extractor.graph.num_edges >= self.batch_size:
+            self.flush()
+        return item
+
+    def write_batch(self, graph):
+        """
+        Write a batch (GraphStore). A failed batch is logged and dropped (its
+        transaction is rolled back), so one bad batch does not fail every
+        later item and keep them out of the feed.
+        """
+        try:
+            with metrics.stage("pipeline.graph_database.write"):
+                self.num_written += self.database.write_graph(graph)
+        except Exception:
+            self.logger.exception(
+                f"Graph database write failed, dropped a batch of {graph.num_edges} relationships"
+            )
+
+    def flush(self):
+        try:
+            self.write_batch(self.extractor.graph)
+        finally:
+            self.extractor.graph.clear()
+
+    def close_spider(self, spider):
+        # Pipelines close in reverse order, a graph pipeline feeding this one
+        # calls graph_done once its offloaded items are drained
+        if self.graph_pipeline is None:
+            self.graph_done()
+
+    def graph_done(self):
+        self.flush()
+        self.logger.info(
+            f"Wrote {self.num_written} relationships to the graph database: {self.database.counts()}"
+        )
+        if self.database.analytics is not None:
+            self.logger.info(f"Top hubs: {self.database.analytics.top_hubs(5)}")
+        self.database.close()
+
+
+def find_graph_pipeline(spider):
+    """
+    The crawl's SayariGraphScrapingPipeline, None outside of a crawl.
+    """
+    engine = getattr(getattr(spider, "crawler", None), "engine", None)
+    if engine is None:
+        return None
+    for pipeline in engine.scraper.itemproc.middlewares:
+        if isinstance(pipeline, SayariGraphScrapingPipeline):
+            return pipeline
+    return None
 
 
 class SayariGraphScrapingPipeline:
-    def __init__(self):
+    def __init__(
+        self,
+        streaming=False,
+        batch_size=10000,
+        output_dir=None,
+        title_prefix="X",
+        extraction_rules=None,
+        layout_workers=1,
+        layout_cache_path=None,
+        render_max_points=None,
+        render_tiles=1,
+        viewer_mode="both",
+        render_mode="inline",
+        docs_dir=None,
+        entity_resolution=False,
+        resolution_threshold=0.9,
+        offload_mode="off",
+        offload_max_pending=1000,
+        offload_workers=2,
+        rules_path=None,
+        quality=None,
+        quality_report_path=None,
+        async_logging=False,
+    ):
         self.logger = logging.getLogger(__name__)
         self.root_dir = os.path.dirname(os.path.dirname(__file__))
-        self.docs_dir = os.path.join(self.root_dir, "docs")
-        self.output_dir = os.path.join(self.root_dir, "output")
+        self.docs_dir = docs_dir or os.path.join(self.root_dir, "docs")
+        self.output_dir = output_dir or os.path.join(self.root_dir, "output")
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.docs_dir, exist_ok=True)
         self.graph_path = os.path.join(self.output_dir, "graph.csv")
-        self.knowledge_graph = []  # Store edges
-        self.nodes = []  # Store nodes
+        # Nodes (interned, integer IDs) and edges (array columns), see graph_store.py
+        self.graph = GraphStore()
+        self.title_prefix = title_prefix  # "" keeps every company
+        # Compiled once, see config/extraction_rules.yaml
+        self.rules_path = rules_path
+        self.rules = extraction_rules or load_extraction_rules(rules_path)
+
+        # Streaming mode spills edges and nodes to part files every batch_size
+        # edges, so memory stays flat no matter how long the crawl runs.
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.parts_dir = os.path.join(self.output_dir, "graph_parts")
+        self.nodes_path = os.path.join(self.output_dir, "graph_nodes.arrow")
+        self.part_writer = None
+
+        # Components are laid out independently, see layout.py
+        self.layout_workers = layout_workers
+        self.layout_cache_path = layout_cache_path
+        # PNG overview is downsampled past render_max_points nodes/edges,
+        # render_tiles > 1 also writes a full detail tiles x tiles grid
+        self.render_max_points = render_max_points
+        self.render_tiles = render_tiles
+        # "pyvis" (docs/index.html), "tiles" (docs/viewer/) or "both"
+        self.viewer_mode = viewer_mode
+        # Where rendering happens once the graph is written, see render_stage.py:
+        # "inline" (blocks close_spider), "background" (detached worker process),
+        # "queue" (left for a separately run worker) or "off"
+        self.render_mode = render_mode
+        self.render_queue_dir = os.path.join(self.output_dir, "render_queue")
+        # Merge near duplicate agent/owner names before publishing, see entity_resolution.py
+        self.entity_resolution = entity_resolution
+        self.resolution_threshold = resolution_threshold
+        # Where process_item's work happens, see item_offload.py: "off" (inline,
+        # on the reactor thread), "thread" (one worker thread) or "process"
+        # (extraction in offload_workers processes, merged on a worker thread).
+        # At most offload_max_pending items are in flight before Scrapy waits.
+        self.offload_mode = offload_mode
+        self.offload_max_pending = offload_max_pending
+        self.offload_workers = offload_workers
+        self.offloader = None
+        # Data quality issues are counted and sampled instead of logged one
+        # by one, see data_quality.py. The report is written on close when
+        # quality_report_path is set. async_logging moves the remaining
+        # log writes to a listener thread.
+        self.quality = quality or DataQualityCollector()
+        self.quality_report_path = quality_report_path
+        self.queue_logging = QueueLogging() if async_logging else None
+        # Pipelines (GraphDatabasePipeline) receiving every spilled batch, or
+        # the whole graph on close, through write_batch(graph), then graph_done()
+        self.graph_sinks = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            streaming=settings.getbool("GRAPH_STREAMING_ENABLED", False),
+            batch_size=settings.getint("GRAPH_BATCH_SIZE", 10000),
+            title_prefix=settings.get("GRAPH_TITLE_PREFIX", "X"),
+            rules_path=settings.get("EXTRACTION_RULES_PATH"),
+            layout_workers=settings.getint("GRAPH_LAYOUT_WORKERS", 1),
+            layout_cache_path=settings.get("GRAPH_LAYOUT_CACHE_PATH"),
+            render_max_points=settings.getint("GRAPH_RENDER_MAX_POINTS") or None,
+            render_tiles=settings.getint("GRAPH_RENDER_TILES", 1),
+            viewer_mode=settings.get("GRAPH_VIEWER_MODE", "both"),
+            render_mode=settings.get("GRAPH_RENDER_MODE", "inline"),
+            entity_resolution=settings.getbool("ENTITY_RESOLUTION_ENABLED", False),
+            resolution_threshold=settings.getfloat("ENTITY_RESOLUTION_THRESHOLD", 0.9),
+            offload_mode=settings.get("GRAPH_OFFLOAD_MODE", "off"),
+            offload_max_pending=settings.getint("GRAPH_OFFLOAD_MAX_PENDING", 1000),
+            offload_workers=settings.getint("GRAPH_OFFLOAD_WORKERS", 2),
+            quality=DataQualityCollector(
+                sample_size=settings.getint("DATA_QUALITY_SAMPLE_SIZE", 20),
+                log_interval=settings.getfloat("DATA_QUALITY_LOG_INTERVAL", 60.0),
+            ),
+            quality_report_path=settings.get("DATA_QUALITY_REPORT_PATH"),
+            async_logging=settings.getbool("DATA_QUALITY_ASYNC_LOGGING", False),
+        )
 
     def open_spider(self, spider):
-        return
+        if self.queue_logging is not None:
+            self.queue_logging.start()
+        if self.streaming:
+            for run_dir in list_part_runs(self.parts_dir):
+                self.logger.warning(
+                    f"Found uncompacted graph parts from an interrupted run: {run_dir}. "
+                    "Run postprocess.py --recover-parts to compact them."
+                )
+            self.part_writer = GraphPartWriter(self.parts_dir, self.batch_size)
+        if self.offload_mode == "thread":
+            self.offloader = ItemOffloader(self.add_item, max_pending=self.offload_max_pending)
+        elif self.offload_mode == "process":
+            self.offloader = ItemOffloader(
+                self.add_item_graph,
+                extract=extract_item_graph,
+                workers=self.offload_workers,
+                max_pending=self.offload_max_pending,
+                initializer=init_item_worker,
+                initargs=(self.title_prefix, self.rules_path),
+            )
+        elif self.offload_mode != "off":
+            raise ValueError(f"Unknown offload mode: {self.offload_mode}")
 
     def process_item(self, item, spider):
-        self.write_to_knowledge_graph(item)  # Add nodes and edges for network graph plot
+        if self.offloader is not None:
+            # Deferred, fires once the item is queued (backpressure past
+            # offload_max_pending items in flight)
+            return self.offloader.submit(item)
+        self.add_item(item)
         return item
 
+    def add_item(self, item):
+        with metrics.stage("pipeline.write_to_knowledge_graph"):
+            self.write_to_knowledge_graph(item)  # Add nodes and edges for network graph plot
+        if self.streaming and self.graph.num_edges >= self.batch_size:
+            self.flush_graph_batch()
+
+    def add_item_graph(self, result):
+        '''
+        Merge the graph of one item extracted in a worker process, and
+        count its data quality issues.
+        '''
+        graph, issues = result
+        with metrics.stage("pipeline.merge_item_graph"):
+            self.graph.merge(graph)
+        for issue in issues:
+            self.quality.record(*issue)
+        if self.streaming and self.graph.num_edges >= self.batch_size:
+            self.flush_graph_batch()
+
+    def flush_graph_batch(self):
+        '''
+        Spill buffered edges and nodes to disk and release them from memory.
+        Nodes repeated across batches are merged at compaction. The graph
+        sinks write the batch before it is released.
+        '''
+        with metrics.stage("pipeline.flush_graph_batch"):
+            self.part_writer.write_part(self.graph)
+        for sink in self.graph_sinks:
+            sink.write_batch(self.graph)
+        self.graph.clear()
+
     def write_to_knowledge_graph(self, item):
         '''
             Start writing to knowledge graph.
             Item is dictionary to process, yieled
             from spider.
         '''
-        is_relation_found = False
-        
-        # interesting relationships to capture with company
-        interested_labels = (
-            "COMMERCIAL_REGISTERED_AGENT",
-            "REGISTERED_AGENT",
-            "OWNER_NAME",
-            "OWNERS",
-        )
-        company_title = jmespath.search("TITLE[0]", item)
-        company_type = jmespath.search("TITLE[1]", item)
-        record_num = jmespath.search("RECORD_NUM", item)
+        item_rules = self.rules["item"]
+        # .search skips the ExtractionRule call wrapper, this runs per item
+        company_title = item_rules["company_title"].search(item)
+        company_type = item_rules["company_type"].search(item)
+        record_num = item_rules["record_num"].search(item)
         
         if company_title is None:
             self.log_warn_msg("Company title not found", item)
-        company_title = company_title.upper().strip()
-        company_title = re.sub(r"\s+", " ", company_title)
+        company_title = normalize_name(company_title)
 
-        # If company title does not start with x, don't incorporate into knowledge graph
-        if company_title and not company_title.startswith("X"):
+        # If company title does not start with title prefix (x), don't incorporate into knowledge graph
+        if company_title and not company_title.startswith(self.title_prefix):
             return
         
-        # Prepare nodes for Pyvis and networkx Rendering
-        self.nodes.append(
-            [
-                company_title,
-                {
-                    "label" : "",
-                    "title" : 
-                    (
-                        f"""Company Title: {company_title}
-                            Company Type: {company_type}
-                            SOS Control ID# {record_num}
-                        """
-                    )
-                }
-            ]
-        )
+        # Prepare nodes for Pyvis and networkx Rendering.
+        # Store deduplicates companies seen more than once, tooltip is rendered on export.
+        company_id = self.graph.add_node(company_title, (COMPANY, company_type, record_num))
 
         # Go through drawer to extract all drawer labels and values
-        if "DRAWER_DETAIL_LIST" in item:
-            details = item["DRAWER_DETAIL_LIST"]
-            i = 0
-            while i < len(details):
-                detail = details[i]
-                label_name = detail.get("LABEL", None)
-                self.check_string_warning(label_name, f"Label not string", item)
-
-                # bring label name to consistent format for extraction
-                label_name = SayariGraphScrapingPipeline.normalize_label_str(label_name)
-                if label_name in interested_labels:
-                    if label_name == "OWNERS":
-                        # Write the current owner
-                        edge_to_write = (
-                            self.reformat_and_check_data_for_knowledge_graph(
-                                detail.get("VALUE", None),
-                                company_title,
-                                label_name,
-                                item,
-                            )
-                        )
-                        self.knowledge_graph.append(edge_to_write)
-                        i += 1
-                        # Write all succeeding relationships to knowledge graph,
-                        # indicated by label_name == ""
-                        while i < len(details):
-                            detail = details[i]
-                            label_name = detail.get("LABEL", None)
-                            if label_name == "":
-                                edge_to_write = self.reformat_and_check_data_for_knowledge_graph(
-                                    detail.get("VALUE", None),
-                                    company_title,
-                                    "OWNERS",
-                                    item,
-                                )
-                                self.knowledge_graph.append(edge_to_write)
-                                i += 1
-                            else:
-                                # No more owners to extract, break
-                                break
-                    else:
-                        edge_to_write = (
-                            self.reformat_and_check_data_for_knowledge_graph(
-                                detail.get("VALUE", None), company_title, label_name, item
-                            )
-                        )
-                        self.knowledge_graph.append(edge_to_write)
-                        i += 1
-                    is_relation_found = True
-                else:
-                    i += 1
-            ## After going through all drawer details. If no graph relation was found
-            ## Log an error.
-            if is_relation_found is False:
-                self.log_warn_msg(f"Expected graph label names not found", item)
-        else:
+        details = item_rules["drawer_details"].search(item)
+        if details is None:
             self.log_warn_msg("DRAWER_DETAIL_LIST was not found", item)
+            return
+
+        # Single pass. Labels are dispatched through the label table, rows
+        # with an empty label right after OWNERS are more owners.
+        label_table = LABEL_TABLE
+        is_relation_found = False
+        in_owners = False
+        for detail in details:
+            label = detail.get("LABEL", None)
+            if in_owners and label == "":
+                self.reformat_and_check_data_for_knowledge_graph(
+                    detail.get("VALUE", None), company_id, "OWNERS", item
+                )
+                continue
+            label_name = label_table.get(label) if isinstance(label, str) else None
+            if label_name is None:
+                label_name = self.label_table_entry(label, item)
+            in_owners = label_name == "OWNERS"
+            if label_name:
+                self.reformat_and_check_data_for_knowledge_graph(
+                    detail.get("VALUE", None), company_id, label_name, item
+                )
+                is_relation_found = True
+        ## After going through all drawer details. If no graph relation was found
+        ## Log an error.
+        if is_relation_found is False:
+            self.log_warn_msg("Expected graph label names not found", item)
+
+    def label_table_entry(self, label, item):
+        """
+        Interesting label name of a drawer label not in the label table yet
+        ("" if the label is not interesting). String labels are added to
+        the table, so each distinct label is only normalized once.
+        """
+        if self.check_string_warning(label, "Label not string", item):
+            return ""
+        label_name = SayariGraphScrapingPipeline.normalize_label_str(label)
+        if label_name not in RELATIONSHIP_LABELS:
+            label_name = ""
+        if len(LABEL_TABLE) < MAX_LABEL_TABLE_SIZE:
+            LABEL_TABLE[label] = label_name
+        return label_name
 
     def reformat_and_check_data_for_knowledge_graph(
-        self, value, company_title, label_name, item
+        self, value, company_id, label_name, item
     ):  
         '''
         This function checks data and reformats edges for writing.
-        It also adds nodes from business relationships (ex. commercial agents, owners).
+        It adds the edge and nodes from business relationships (ex. commercial agents, owners).
         '''
-        if not self.check_string_warning(
-            value, f"Value for {label_name} not string", item
-        ):
-            value = value.split("\n")[0].upper().strip() # Store only string before \n
-                                                         # For strings without \n, just stores
-                                                         # entire string
-            value = re.sub(r"\s+", " " , value)
-
-        true_label = "OWNER_NAME" if label_name == "OWNERS" else label_name
-        edge_to_write = [
-            value,
-            company_title,
-            {"label": true_label,
-             "title": true_label},
-        ]
-
-        # 
-        all_current_elements = jmespath.search("[*][0]", self.nodes)
-        if value not in all_current_elements:
-            self.nodes.append(
-                (value, {"label" : "", "title": f"{true_label} : {value}"})
-            )
-        return edge_to_write
+        if isinstance(value, str):
+            value = value.partition("\n")[0] # Store only string before \n
+                                              # For strings without \n, just stores
+                                              # entire string
+        else:
+            self.log_warn_msg(f"Value for {label_name} not string", item, detail=str(value))
+
+        true_label = RELATIONSHIP_LABELS[label_name]
+
+        # O(1) lookup, tooltip sources are merged if node already exists.
+        # Store normalizes the name.
+        entity_id = self.graph.add_node(value, (ENTITY, true_label))
+        self.graph.add_edge_ids(entity_id, company_id, true_label)
 
     def draw_and_save_knowledge_graph(self):
         '''
         Build networkx and pyvis graph, then write to HTML/png
         '''
         # Build networkx graph 
-        G = nx.Graph()
-        G.add_nodes_from(self.nodes)
-        G.add_edges_from(self.knowledge_graph)  # Populate Graph
-
-        pos = nx.nx_agraph.pygraphviz_layout(G, prog="neato")  # add some distance
-        fig, ax = plt.subplots(figsize=(10, 6), dpi=200)
-        C = (G.subgraph(c) for c in nx.connected_components(G))
-        for g in C:
-            c = [random.random()] * nx.number_of_nodes(g)  # random color...
-            nx.draw(g, pos, ax=ax, node_size=20, node_color=c, vmin=0.0, vmax=1.0)
-
-        plt.axis("off")
-        plt.title(
-            "North Dakota Web App Business Relationships",
-            x=0,
-            y=1,
-            va="bottom",
-            ha="left",
-            fontsize=20,
-            fontweight=800,
-        )
-        plt.tight_layout()
-        # Save Networkx Graph
-        plt.savefig(os.path.join(self.output_dir, "knowledge_graph.png"))
+        with metrics.stage("render.to_networkx"):
+            G = self.graph.to_networkx()
 
+        # Per component layout, packed onto one canvas
+        with metrics.stage("render.layout"):
+            names, xy, component_ids = component_layout_arrays(
+                G, workers=self.layout_workers, cache_path=self.layout_cache_path
+            )
+        # Flat arrays, drawn with one scatter and one LineCollection
+        with metrics.stage("render.png"):
+            _, colors, segments = graph_arrays(G, names, xy, component_ids)
+            render_png(
+                os.path.join(self.output_dir, "knowledge_graph.png"),
+                xy, colors, segments, max_points=self.render_max_points,
+            )
+            if self.render_tiles > 1:
+                render_tiles(
+                    os.path.join(self.output_dir, "knowledge_graph_tiles"),
+                    xy, colors, segments, self.render_tiles,
+                )
+
+        if self.viewer_mode in ("tiles", "both"):
+            # Level-of-detail viewer, docs/viewer/index.html
+            with metrics.stage("render.viewer_tiles"):
+                num_tiles = export_graph_tiles(
+                    G, names, xy, component_ids, os.path.join(self.docs_dir, "viewer", "data")
+                )
+            self.logger.info(f"Wrote {num_tiles} graph tiles for docs/viewer")
+        if self.viewer_mode not in ("pyvis", "both"):
+            return
+        with metrics.stage("render.pyvis"):
+            self.write_pyvis_html(G)
+
+    def write_pyvis_html(self, G):
+        """
+        Interactive pyvis graph, docs/index.html
+        """
         # Build Pyvis Graph
         nt = Network('100vh', '100% ', notebook=False, directed=False,
-                     cdn_resources=, select_menu=True, filter_menu=True)
+                     cdn_resources='remote', select_menu=True, filter_menu=True)
         # Add nodes with styling
         for node in G.nodes:
             tooltip = G.nodes[node].get("title", node)
@@ -224,6 +542,64 @@ class SayariGraphScrapingPipeline:
         # Write to docs_dir is for github.io rendering
         nt.write_html(os.path.join(self.docs_dir, "index.html"))
 
+    def draw_saved_graph(self):
+        """
+        Load graph.csv and node table written by part compaction or
+        batch mode (graph_batch.py), then draw.
+        Rendering still needs the whole graph in memory.
+        """
+        edges, nodes = load_compacted_graph(self.graph_path, self.nodes_path)
+        self.graph.clear()
+        for name, attributes in nodes:
+            self.graph.add_node(name, (TEXT, attributes["title"]))
+        for entity, company, attributes in edges:
+            self.graph.add_edge(entity, company, attributes["label"])
+        self.draw_and_save_knowledge_graph()
+
+    def render_options(self):
+        """
+        Pipeline settings a render worker needs to draw the same way.
+        """
+        return {
+            "docs_dir": os.path.abspath(self.docs_dir),
+            "layout_workers": self.layout_workers,
+            "layout_cache_path": self.layout_cache_path and os.path.abspath(self.layout_cache_path),
+            "render_max_points": self.render_max_points,
+            "render_tiles": self.render_tiles,
+            "viewer_mode": self.viewer_mode,
+        }
+
+    def publish_graph(self, num_edges, in_memory=False):
+        """
+        Publish graph.csv and the node table as a graph artifact, then
+        render it according to render_mode. With in_memory, inline renders
+        reuse the graph already held by the pipeline.
+        """
+        if self.entity_resolution:
+            with metrics.stage("pipeline.entity_resolution"):
+                num_merged, num_edges = resolve_graph_entities(
+                    self.graph_path, self.nodes_path, self.resolution_threshold
+                )
+            self.logger.info(f"Entity resolution merged {num_merged} names")
+            # The graph held in memory is no longer what was published
+            in_memory = in_memory and not num_merged
+        print("Nubmer of Relationships Plotted:", num_edges)
+        artifact_path, artifact = publish_graph_artifact(
+            self.output_dir, self.graph_path, self.nodes_path, num_edges, self.render_options()
+        )
+        if self.render_mode == "inline":
+            if in_memory:
+                self.draw_and_save_knowledge_graph()
+            else:
+                self.draw_saved_graph()
+        elif self.render_mode in ("background", "queue"):
+            job_path = enqueue_render(self.render_queue_dir, artifact_path, artifact)
+            self.logger.info(f"Queued graph render {job_path}")
+            if self.render_mode == "background":
+                spawn_render_worker(
+                    self.render_queue_dir, os.path.join(self.output_dir, "render_worker.log")
+                )
+
     @staticmethod
     def normalize_label_str(s):
         """
@@ -237,43 +613,62 @@ class SayariGraphScrapingPipeline:
         Send warning when expected string is not string
         """
         if not isinstance(the_string, str):
-            self.log_warn_msg(f"{warn_msg} : {the_string}", item)
+            self.log_warn_msg(warn_msg, item, detail=str(the_string))
             return True
         else:
             return False
 
-    def log_warn_msg(self, warn_msg, item):
+    def log_warn_msg(self, warn_msg, item, detail=None):
         """
-        Warning messages for debugging
+        Data quality issues for debugging
         potential errors, but not severe enough
-        to halt web crawling process.
+        to halt web crawling process. warn_msg is the
+        issue category, counted by the data quality
+        collector, which logs a sample of them.
         """
         business_id = item.get("ID") or item.get("KEY_ID")
         control_id = item.get("RECORD_NUM")
-        final_msg = (
-            warn_msg
-            + " "
-            + f"for business id: {business_id} and SOS Control ID#: {control_id}"
-        )
-        self.logger.warning(final_msg)
+        self.quality.record(warn_msg, business_id, control_id, detail)
+
+    def report_data_quality(self):
+        """
+        Log issue counts and write the data quality report.
+        """
+        self.quality.log_summary()
+        if self.quality_report_path:
+            self.quality.write_report(self.quality_report_path)
+            self.logger.info(f"Wrote data quality report {self.quality_report_path}")
 
     def close_spider(self, spider):
         """
-        Write out stored data and plots
-        If data gets large we can also change our implementation to
-        process writes in batches.
+        Write out stored data, then publish it for rendering (publish_graph).
+        If data gets large, use streaming mode (GRAPH_STREAMING_ENABLED)
+        to process writes in batches.
         """
-        if self.knowledge_graph:
+        if self.offloader is not None:
+            with metrics.stage("pipeline.drain_offload"):
+                self.offloader.close()  # wait for every queued item
+        if self.streaming:
+            self.flush_graph_batch()
+            with metrics.stage("pipeline.compact_graph_parts"):
+                num_edges = compact_graph_parts(
+                    self.part_writer.run_dir, self.graph_path, self.nodes_path
+                )
+            if num_edges:
+                self.publish_graph(num_edges)
+        elif self.graph.num_edges:
             # Write out graph in csv format for reading and
             # bulk loading into structured databases (ex. Postgres)
-            from_node = jmespath.search("[*][0]", self.knowledge_graph)
-            to_node = jmespath.search("[*][1]", self.knowledge_graph)
-            relationship_type = jmespath.search("[*][2].label", self.knowledge_graph)
-            df = pl.DataFrame(
-                {"entity": from_node, "company": to_node, "relationship": relationship_type}
-            )
-            df.write_csv(self.graph_path)
+            with metrics.stage("pipeline.write_csv"):
+                self.graph.write_csv(self.graph_path)
+                write_node_table(self.graph.iter_nodes(), self.nodes_path)
 
-            # print("Number of Companies Plotted:", len(self.nodes))
-            print("Nubmer of Relationships Plotted:", len(self.knowledge_graph))
-            self.draw_and_save_knowledge_graph()
+            # print("Number of Companies Plotted:", self.graph.num_nodes)
+            self.publish_graph(self.graph.num_edges, in_memory=True)
+        for sink in self.graph_sinks:
+            if not self.streaming:
+                sink.write_batch(self.graph)  # the whole graph is one batch
+            sink.graph_done()
+        self.report_data_quality()
+        if self.queue_logging is not None:
+            self.queue_logging.stop()
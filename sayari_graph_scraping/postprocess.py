@@ -1,16 +1,179 @@
-from pipelines import SayariGraphScrapingPipeline
+import argparse
+import atexit
 import json
 import os
+import sys
 
-root_path = os.path.dirname(os.path.dirname(__file__))
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 output_dir = os.path.join(root_path, "output")
 
-pipeline = SayariGraphScrapingPipeline()
+# Allow running as a script from root directory, ex.
+# python sayari_graph_scraping/postprocess.py
+sys.path.insert(0, root_path)
+from sayari_graph_scraping.pipelines import GraphDatabasePipeline, SayariGraphScrapingPipeline
+from sayari_graph_scraping.graph_spill import compact_graph_parts, list_part_runs
+from sayari_graph_scraping.data_lake import DataLakeReader, iter_latest_records
+from sayari_graph_scraping.extraction import load_extraction_rules
+from sayari_graph_scraping.graph_batch import build_graph_batch
+from sayari_graph_scraping.parallel_postprocess import build_graph_parallel, list_lake_files
+from sayari_graph_scraping.parquet_lake import is_parquet_lake, iter_parquet_records
+from sayari_graph_scraping.metrics import metrics
+
+parser = argparse.ArgumentParser(description="Build graph dataset and visualizations from crawled data.")
+parser.add_argument("--input", default=None,
+                    help="Data lake JSONL file, a directory of JSONL shards, "
+                         "or the Parquet lake directory (output/company_records_parquet). "
+                         "Default: company_records.jsonl in the output directory.")
+parser.add_argument("--output-dir", default=output_dir,
+                    help="Where graph.csv and the other outputs are written (default: output/).")
+parser.add_argument("--workers", type=int, default=1,
+                    help="Number of worker processes for the rowwise engine and graph layout.")
+parser.add_argument("--engine", choices=["rowwise", "polars"], default="rowwise",
+                    help="rowwise replays records through the scrapy pipeline, polars builds "
+                         "the same graph with one vectorized (multi-core) query.")
+parser.add_argument("--streaming", action="store_true",
+                    help="Spill graph batches to disk instead of holding the whole graph in memory.")
+parser.add_argument("--batch-size", type=int, default=10000,
+                    help="Number of edges per spilled batch in streaming mode.")
+parser.add_argument("--rules", default=None,
+                    help="YAML extraction rules (default: sayari_graph_scraping/config/extraction_rules.yaml).")
+parser.add_argument("--lookup", default=None,
+                    help="Print one business (by business ID or SOS Control ID#) from the data lake, then exit.")
+parser.add_argument("--render-tiles", type=int, default=1,
+                    help="Also render a full detail N x N grid of PNG tiles (output/knowledge_graph_tiles).")
+parser.add_argument("--render-max-points", type=int, default=500000,
+                    help="Downsample the overview PNG past this many nodes/edges.")
+parser.add_argument("--viewer", choices=["pyvis", "tiles", "both"], default="both",
+                    help="Interactive HTML: docs/index.html (pyvis), lazy-loading docs/viewer (tiles) or both.")
+parser.add_argument("--render", choices=["inline", "background", "queue", "off"], default="inline",
+                    help="Render PNG/HTML now (inline), in a detached worker (background), leave it "
+                         "queued for python -m sayari_graph_scraping.render_stage (queue), or skip it (off).")
+parser.add_argument("--resolve-entities", type=float, default=None, metavar="THRESHOLD",
+                    help="Merge agent/owner names at least THRESHOLD similar (ex. 0.9) before publishing.")
+parser.add_argument("--database", default=None,
+                    help="Load the data lake into this graph database (SQLite file or "
+                         "postgresql:// DSN) instead of building graph.csv.")
+parser.add_argument("--database-batch-size", type=int, default=5000,
+                    help="Number of relationships upserted per transaction with --database.")
+parser.add_argument("--recover-parts", action="store_true",
+                    help="Compact graph parts left behind by an interrupted crawl, then exit.")
+parser.add_argument("--metrics", default=None, metavar="PATH",
+                    help="Write stage timings to PATH (JSON) and PATH with a .prom suffix (Prometheus text).")
+parser.add_argument("--profile-stage", default=None,
+                    help="Profile one stage (ex. pipeline.write_to_knowledge_graph, render.pyvis), needs --metrics.")
+parser.add_argument("--profiler", choices=["cprofile", "sampling"], default="cprofile",
+                    help="cProfile stats (PATH.prof) or sampled collapsed stacks for flame graphs (PATH.folded).")
+args = parser.parse_args()
+output_dir = args.output_dir
+if args.input is None:
+    args.input = os.path.join(output_dir, "company_records.jsonl")
+if args.workers > 1 and args.streaming:
+    parser.error("--streaming is not supported with --workers")
+if args.database and (args.workers > 1 or args.engine == "polars"):
+    parser.error("--database replays records rowwise, it does not support --workers or --engine polars")
+if args.rules and args.engine == "polars":
+    parser.error("--engine polars implements the default extraction rules, it does not support --rules")
+if args.profile_stage and not args.metrics:
+    parser.error("--profile-stage needs --metrics")
+
+if args.metrics:
+    profile_path = os.path.splitext(args.metrics)[0] + "_profile"
+    metrics.configure(True, args.profile_stage, args.profiler, profile_path)
+
+    def dump_metrics():
+        profile = metrics.close_profiler()
+        if profile:
+            print(f"Wrote {args.profile_stage} profile to {profile}")
+        metrics.dump(args.metrics, os.path.splitext(args.metrics)[0] + ".prom")
+
+    atexit.register(dump_metrics)  # every mode below ends with sys.exit
+
+pipeline = SayariGraphScrapingPipeline(
+    streaming=args.streaming,
+    batch_size=args.batch_size,
+    extraction_rules=load_extraction_rules(args.rules),
+    output_dir=output_dir,
+    layout_workers=args.workers,
+    layout_cache_path=os.path.join(output_dir, "layout_cache.pkl"),
+    render_max_points=args.render_max_points,
+    render_tiles=args.render_tiles,
+    viewer_mode=args.viewer,
+    render_mode=args.render,
+    entity_resolution=args.resolve_entities is not None,
+    resolution_threshold=args.resolve_entities or 0.9,
+    quality_report_path=os.path.join(output_dir, "data_quality.json"),
+)
+
+if args.recover_parts:
+    run_dirs = list_part_runs(pipeline.parts_dir)
+    if not run_dirs:
+        print("No graph parts to recover.")
+    else:
+        # Latest interrupted run wins
+        num_edges = compact_graph_parts(run_dirs[-1], pipeline.graph_path, pipeline.nodes_path)
+        print(f"Recovered {num_edges} relationships from {run_dirs[-1]}")
+    sys.exit(0)
+
+if is_parquet_lake(args.input):
+    if args.workers > 1 or args.lookup:
+        parser.error("--workers and --lookup need a JSONL data lake")
+    lake_paths = args.input
+else:
+    lake_paths = list_lake_files(args.input)
+
+if args.lookup:
+    # Indexed lookup, no scan of the data lake
+    for path in reversed(lake_paths):
+        reader = DataLakeReader(path)
+        record = reader.get(args.lookup) or reader.get_by_record_num(args.lookup)
+        if record is not None:
+            print(json.dumps(record, indent=2))
+            break
+    else:
+        print(f"Business {args.lookup} not found.")
+    sys.exit(0)
+
+if args.database:
+    # Records are replayed rowwise below, into the database instead of graph.csv
+    pipeline = GraphDatabasePipeline(
+        args.database,
+        batch_size=args.database_batch_size,
+        title_prefix=pipeline.title_prefix,
+        extraction_rules=pipeline.rules,
+        quality=pipeline.quality,
+    )
+
+elif args.engine == "polars":
+    with metrics.stage("postprocess.build_graph_batch"):
+        num_edges = build_graph_batch(
+            lake_paths, pipeline.graph_path, pipeline.nodes_path, title_prefix=pipeline.title_prefix
+        )
+    if num_edges:
+        pipeline.publish_graph(num_edges)
+    sys.exit(0)
+
+elif args.workers > 1:
+    # Records are processed by a process pool, graph is written and drawn once merged
+    with metrics.stage("postprocess.build_graph_parallel"):
+        build_graph_parallel(args.input, pipeline, args.workers, rules_path=args.rules)
+    pipeline.close_spider(None)
+    sys.exit(0)
+
 pipeline.open_spider(None)
 
-with open(os.path.join(output_dir, "company_records.jsonl")) as f:
-    for line in f:
-        item = json.loads(line)
-        pipeline.process_item(item, None)
+# Incremental crawls append newer versions of a business, only process the latest.
+# For a single file the lake index already knows where the latest versions are.
+if is_parquet_lake(lake_paths):
+    records = iter_parquet_records(lake_paths)
+elif len(lake_paths) == 1:
+    records = DataLakeReader(lake_paths[0]).iter_latest()
+else:
+    records = iter_latest_records(lake_paths)
+for item in records:
+    pipeline.process_item(item, None)
 
-pipeline.close_spider(None)
+with metrics.stage("pipeline.close_spider"):
+    pipeline.close_spider(None)
+if args.database:
+    # Issues were collected by the graph pipeline's collector, which writes no report here
+    pipeline.extractor.quality.write_report(os.path.join(output_dir, "data_quality.json"))
@@ -0,0 +1,93 @@
+import os
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+
+TITLE = "North Dakota Web App Business Relationships"
+
+
+def graph_arrays(G, names, xy, component_ids, seed=0):
+    """
+    Flat arrays for rendering: node positions, one random colour per
+    connected component, and (m, 2, 2) edge segments.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    edge_index = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    component_colors = np.random.default_rng(seed).random(int(component_ids.max(initial=-1)) + 1)
+    return xy, component_colors[component_ids], xy[edge_index]
+
+
+def downsample(array, max_size, rng):
+    """
+    Uniform sample of at most max_size rows, in original order.
+    """
+    if max_size is None or len(array) <= max_size:
+        return array
+    return array[np.sort(rng.choice(len(array), max_size, replace=False))]
+
+
+def draw_arrays(ax, xy, colors, segments, node_size=20):
+    """
+    One LineCollection for all edges and one scatter for all nodes,
+    instead of one nx.draw call per component.
+    """
+    ax.add_collection(LineCollection(segments, colors="black", linewidths=1.0, zorder=1))
+    ax.scatter(
+        xy[:, 0], xy[:, 1], s=node_size, c=colors, cmap="viridis",
+        vmin=0.0, vmax=1.0, linewidths=0, zorder=2,
+    )
+    ax.set_aspect("equal")
+    ax.autoscale_view()
+    ax.axis("off")
+
+
+def new_figure(title, figsize=(10, 6), dpi=200):
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    ax.set_title(title, x=0, y=1, va="bottom", ha="left", fontsize=20, fontweight=800)
+    return fig, ax
+
+
+def render_png(path, xy, colors, segments, title=TITLE, max_points=None, seed=0):
+    """
+    Render the whole graph into one PNG. With max_points, nodes and edges
+    are each downsampled to at most max_points (overview of very large
+    graphs), and node markers shrink with the number of nodes.
+    """
+    rng = np.random.default_rng(seed)
+    sample = downsample(np.arange(len(xy)), max_points, rng)
+    node_size = 20 if len(sample) <= 5000 else max(1, 20 * 5000 / len(sample))
+    fig, ax = new_figure(title)
+    draw_arrays(ax, xy[sample], colors[sample], downsample(segments, max_points, rng), node_size)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def render_tiles(tiles_dir, xy, colors, segments, tiles, title=TITLE):
+    """
+    Split the canvas into a tiles x tiles grid and render every tile at
+    full detail into <tiles_dir>/tile_<row>_<col>.png (row 0 is the top).
+    Each tile only draws nodes inside it and edges touching it.
+    """
+    os.makedirs(tiles_dir, exist_ok=True)
+    if not len(xy):
+        return []
+    low, high = xy.min(axis=0), xy.max(axis=0)
+    size = np.maximum((high - low) / tiles, 1e-9)
+    paths = []
+    for row in range(tiles):
+        for col in range(tiles):
+            tile_low = low + size * (col, tiles - 1 - row)
+            tile_high = tile_low + size
+            in_tile = np.all((xy >= tile_low) & (xy <= tile_high), axis=1)
+            touches = np.any(np.all((segments >= tile_low) & (segments <= tile_high), axis=2), axis=1)
+            fig, ax = new_figure(f"{title} ({row}, {col})")
+            draw_arrays(ax, xy[in_tile], colors[in_tile], segments[touches])
+            ax.set_xlim(tile_low[0], tile_high[0])
+            ax.set_ylim(tile_low[1], tile_high[1])
+            fig.tight_layout()
+            path = os.path.join(tiles_dir, f"tile_{row}_{col}.png")
+            fig.savefig(path)
+            plt.close(fig)
+            paths.append(path)
+    return paths
@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+# Render stage: the crawl (or postprocess.py) publishes graph.csv and the node
+# table as a graph artifact and queues a render job. A render worker draws the
+# PNG and HTML views from the newest job, so a slow or broken render never
+# blocks crawl shutdown, and renders can be re-run without re-crawling:
+#   python -m sayari_graph_scraping.render_stage
+#   python -m sayari_graph_scraping.render_stage --artifact output/graph_artifact.json
+ARTIFACT_NAME = "graph_artifact.json"
+JOB_STATES = ("pending", "running", "done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json(path, obj):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish_graph_artifact(output_dir, graph_path, nodes_path, num_edges, render_options):
+    """
+    Record that graph.csv and the node table are complete and durable.
+    render_options are the pipeline settings the render worker needs
+    to draw the same way the pipeline would.
+    """
+    artifact = {
+        "run_id": time.strftime("%Y%m%dT%H%M%S") + f".{time.time_ns() % 10**9:09d}",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "output_dir": os.path.abspath(output_dir),
+        "graph_path": os.path.abspath(graph_path),
+        "nodes_path": os.path.abspath(nodes_path),
+        "graph_sha1": file_sha1(graph_path),
+        "num_edges": num_edges,
+        "render_options": render_options,
+    }
+    artifact_path = os.path.join(output_dir, ARTIFACT_NAME)
+    write_json(artifact_path, artifact)
+    return artifact_path, artifact
+
+
+def enqueue_render(queue_dir, artifact_path, artifact):
+    for state in JOB_STATES:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+    job_path = os.path.join(queue_dir, "pending", f"{artifact['run_id']}.json")
+    write_json(job_path, {"artifact_path": os.path.abspath(artifact_path), "run_id": artifact["run_id"]})
+    return job_path
+
+
+def spawn_render_worker(queue_dir, log_path):
+    """
+    Start a detached worker process that renders the newest queued job.
+    The crawl does not wait for it.
+    """
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(log_path, "a") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "sayari_graph_scraping.render_stage", "--queue", queue_dir],
+            cwd=root_dir,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+
+def render_artifact(artifact_path):
+    """
+    Draw PNG and HTML views of a published graph artifact.
+    """
+    # Imported here, pipelines.py imports this module
+    from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+    artifact = read_json(artifact_path)
+    pipeline = SayariGraphScrapingPipeline(
+        output_dir=artifact["output_dir"], **artifact["render_options"]
+    )
+    pipeline.graph_path = artifact["graph_path"]
+    pipeline.nodes_path = artifact["nodes_path"]
+    if file_sha1(pipeline.graph_path) != artifact["graph_sha1"]:
+        logger.warning(f"{pipeline.graph_path} changed since {artifact_path} was published")
+    pipeline.draw_saved_graph()
+
+
+def claim_newest_job(queue_dir):
+    """
+    Move the newest pending job to running and return its path. Older
+    pending jobs are superseded, the newest artifact already contains
+    their data. Returns None if there is nothing to render or another
+    worker claimed the job first.
+    """
+    pending_dir = os.path.join(queue_dir, "pending")
+    if not os.path.isdir(pending_dir):
+        return None
+    jobs = sorted(name for name in os.listdir(pending_dir) if name.endswith(".json"))
+    if not jobs:
+        return None
+    running_path = os.path.join(queue_dir, "running", jobs[-1])
+    try:
+        # Atomic, only one worker wins
+        os.replace(os.path.join(pending_dir, jobs[-1]), running_path)
+    except FileNotFoundError:
+        return None
+    for name in jobs[:-1]:
+        try:
+            os.remove(os.path.join(pending_dir, name))
+        except FileNotFoundError:
+            pass
+    return running_path
+
+
+def run_render_worker(queue_dir):
+    """
+    Render the newest queued job. Returns False if the render failed,
+    the job and its traceback are kept in <queue_dir>/failed.
+    """
+    job_path = claim_newest_job(queue_dir)
+    if job_path is None:
+        return True
+    job = read_json(job_path)
+    started = time.time()
+    try:
+        render_artifact(job["artifact_path"])
+        state, job["status"] = "done", "ok"
+    except Exception:
+        logger.exception(f"Render of {job['artifact_path']} failed")
+        state, job["status"] = "failed", traceback.format_exc()
+    job["render_seconds"] = round(time.time() - started, 3)
+    write_json(os.path.join(queue_dir, state, os.path.basename(job_path)), job)
+    os.remove(job_path)
+    return state == "done"
+
+
+if __name__ == "__main__":
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output_dir = os.path.join(root_dir, "output")
+    parser = argparse.ArgumentParser(description="Render graph views from a published graph artifact.")
+    parser.add_argument("--queue", default=os.path.join(output_dir, "render_queue"),
+                        help="Render queue directory.")
+    parser.add_argument("--artifact", default=None,
+                        help="Render this artifact directly instead of a queued job.")
+    parser.add_argument("--watch", type=float, default=None,
+                        help="Keep polling the queue every N seconds.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.artifact:
+        render_artifact(args.artifact)
+        sys.exit(0)
+    ok = run_render_worker(args.queue)
+    while args.watch:
+        time.sleep(args.watch)
+        ok = run_render_worker(args.queue)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,131 @@
+import logging
+import os
+from sayari_graph_scraping.crawl_state import CrawlStateStore
+
+
+def resumes_crawl(settings):
+    """
+    Whether the next crawl resumes an interrupted one: SEARCH_SHARD_RESUME is
+    on and the crawl state store has unfinished shards. Resumed crawls append
+    to the data lake, the businesses of finished shards are already there.
+    """
+    path = settings.get("CRAWL_STATE_PATH")
+    if not settings.getbool("SEARCH_SHARD_RESUME") or not path or not os.path.exists(path):
+        return False
+    store = CrawlStateStore(path)
+    try:
+        return bool(store.unfinished_shards())
+    finally:
+        store.close()
+
+
+class SearchShardPlanner:
+    """
+    Plans businesssearch shards (search prefixes) for full-registry crawls.
+
+    Each prefix is one independent search request, so Scrapy runs shards
+    concurrently within the configured throttling budget. A shard that comes
+    back with too many rows is split into longer prefixes. A shard is
+    complete once its search response was parsed and the items of all of its
+    drawer requests were exported; completion is recorded in the crawl state
+    store (if given) so an interrupted crawl only reruns unfinished shards.
+    Shards with a failed drawer request are never recorded as complete.
+    """
+
+    def __init__(
+        self,
+        prefixes,
+        split_alphabet="",
+        max_rows=None,
+        max_prefix_len=2,
+        store=None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.prefixes = list(dict.fromkeys(prefixes))  # dedupe, keep order
+        self.split_alphabet = list(dict.fromkeys(split_alphabet))
+        self.max_rows = max_rows
+        self.max_prefix_len = max_prefix_len
+        self.store = store
+        self.pending_drawers = {}  # prefix -> drawer requests in flight
+        self.parsed = {}  # prefix -> number of rows, once search response is parsed
+        self.failed = set()  # prefixes with a failed drawer, left pending
+        self.resumed = False  # initial_shards resumed an interrupted crawl
+
+    @classmethod
+    def from_settings(cls, settings, store=None):
+        return cls(
+            prefixes=settings.get("SEARCH_SHARD_PREFIXES", "x"),
+            split_alphabet=settings.get("SEARCH_SHARD_SPLIT_ALPHABET", ""),
+            max_rows=settings.getint("SEARCH_SHARD_MAX_ROWS", 0) or None,
+            max_prefix_len=settings.getint("SEARCH_SHARD_MAX_PREFIX_LEN", 2),
+            store=store,
+        )
+
+    def initial_shards(self):
+        """
+        Shards to request when the crawl starts. Resumes unfinished shards of
+        an interrupted crawl, otherwise starts a fresh crawl over all prefixes.
+        """
+        if self.store is None:
+            return self.prefixes
+        unfinished = self.store.unfinished_shards()
+        if unfinished:
+            self.logger.warning(
+                f"Resuming interrupted crawl, {len(unfinished)} shards left: {unfinished}"
+            )
+            self.resumed = True
+            return unfinished
+        self.store.reset_shards()
+        self.store.mark_shards_pending(self.prefixes)
+        return self.prefixes
+
+    def should_split(self, prefix, num_rows):
+        return (
+            self.max_rows is not None
+            and num_rows >= self.max_rows
+            and len(prefix) < self.max_prefix_len
+            and bool(self.split_alphabet)
+        )
+
+    def split(self, prefix):
+        """
+        Split shard into one longer prefix per character of the split alphabet.
+        """
+        children = [prefix + char for char in self.split_alphabet]
+        if self.store is not None:
+            self.store.mark_shards_pending(children)
+        return children
+
+    def drawer_scheduled(self, prefix):
+        self.pending_drawers[prefix] = self.pending_drawers.get(prefix, 0) + 1
+
+    def drawer_finished(self, prefix):
+        if prefix not in self.pending_drawers:
+            return  # shard already completed
+        self.pending_drawers[prefix] -= 1
+        self._maybe_complete(prefix)
+
+    def drawer_failed(self, prefix):
+        """
+        The shard finishes for this run, but stays pending in the store, so
+        a resumed crawl searches it again and fetches the failed drawer.
+        """
+        if prefix in self.pending_drawers:
+            self.failed.add(prefix)
+        self.drawer_finished(prefix)
+
+    def shard_parsed(self, prefix, num_rows):
+        self.parsed[prefix] = num_rows
+        self._maybe_complete(prefix)
+
+    def _maybe_complete(self, prefix):
+        if prefix not in self.parsed or self.pending_drawers.get(prefix, 0) > 0:
+            return
+        self.pending_drawers.pop(prefix, None)
+        num_rows = self.parsed.pop(prefix)
+        if prefix in self.failed:
+            self.failed.discard(prefix)
+            self.logger.warning(f"Shard {prefix!r} had failed drawer requests, left pending for a resumed crawl")
+            return
+        if self.store is not None:
+            self.store.mark_shard_done(prefix, num_rows)
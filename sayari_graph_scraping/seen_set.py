@@ -0,0 +1,74 @@
+import hashlib
+import os
+import numpy as np
+
+# Compact set of drawer (business) IDs: a sorted uint64 array, 8 bytes per ID,
+# saved as .npy so an interrupted crawl resumes without refetching drawers.
+# New IDs go to a small Python set first and are merged into the array every
+# MERGE_EVERY additions, so memory stays at 8 bytes per ID plus the buffer.
+MERGE_EVERY = 65536
+
+
+def drawer_key(business_id):
+    """
+    uint64 key of a business ID. Numeric IDs are used as is, anything else
+    is hashed into the upper half of the range so the two never collide.
+    """
+    text = str(business_id)
+    if text.isdigit() and int(text) < 1 << 63:
+        return int(text)
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") | 1 << 63
+
+
+class DrawerSeenSet:
+    """
+    Set of drawer keys (see drawer_key). With a path, the set is loaded from
+    and saved to it, saves replace the file atomically.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = np.empty(0, dtype=np.uint64)
+        self.pending = set()
+        if path and os.path.exists(path):
+            self.ids = np.load(path)
+
+    def __len__(self):
+        return len(self.ids) + len(self.pending)
+
+    def __contains__(self, key):
+        if key in self.pending:
+            return True
+        i = self.ids.searchsorted(np.uint64(key))
+        return i < len(self.ids) and self.ids[i] == key
+
+    def add(self, key):
+        if key in self:
+            return
+        self.pending.add(key)
+        if len(self.pending) >= MERGE_EVERY:
+            self.save()
+
+    def merge(self):
+        if self.pending:
+            pending = np.fromiter(self.pending, dtype=np.uint64, count=len(self.pending))
+            self.ids = np.union1d(self.ids, pending)
+            self.pending.clear()
+
+    def save(self):
+        self.merge()
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            np.save(f, self.ids)
+        os.replace(self.path + ".tmp", self.path)
+
+    def clear(self):
+        self.ids = np.empty(0, dtype=np.uint64)
+        self.pending.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -44,31 +44,211 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#    "sayari_graph_scraping.middlewares.SayariGraphScrapingSpiderMiddleware": 543,
-# }
+SPIDER_MIDDLEWARES = {
+    # Closest to the spider, times callbacks (see METRICS_ENABLED)
+    "sayari_graph_scraping.middlewares.MetricsSpiderMiddleware": 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    "sayari_graph_scraping.middlewares.SayariGraphScrapingDownloaderMiddleware": 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+    # Retries are handled by AdaptiveConcurrencyMiddleware, with backoff
+    "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
+    "sayari_graph_scraping.middlewares.AdaptiveConcurrencyMiddleware": 550,
+    # First on the way out, last on the way back: records final responses
+    "sayari_graph_scraping.middlewares.HttpArchiveMiddleware": 50,
+}
+
+# Offline crawls: "record" saves every response to HTTP_ARCHIVE_PATH (zlib
+# compressed, in SQLite), "replay" serves them back without network access.
+# python -m sayari_graph_scraping.synthetic_registry writes synthetic archives
+# of any size, see experiments/crawl_benchmark.py.
+HTTP_ARCHIVE_MODE = "off"
+HTTP_ARCHIVE_PATH = "output/http_archive.sqlite"
+
+# Adaptive concurrency (see adaptive_concurrency.py): in-flight requests per
+# host start at CONCURRENT_REQUESTS_PER_DOMAIN, grow by one every round of
+# healthy responses and halve on 429/5xx/timeouts or when the p95 latency
+# exceeds ADAPTIVE_TARGET_LATENCY seconds, between ADAPTIVE_MIN_CONCURRENCY and
+# ADAPTIVE_MAX_CONCURRENCY. Retry-After pauses the host. Retries (up to
+# RETRY_TIMES) wait a random delay up to ADAPTIVE_RETRY_BASE_DELAY * 2^attempt
+# seconds, capped at ADAPTIVE_RETRY_MAX_DELAY. Replaces AutoThrottle below.
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_MIN_CONCURRENCY = 1
+ADAPTIVE_MAX_CONCURRENCY = 32
+ADAPTIVE_TARGET_LATENCY = 2.0
+ADAPTIVE_RETRY_BASE_DELAY = 0.5
+ADAPTIVE_RETRY_MAX_DELAY = 30.0
+RETRY_TIMES = 5
+CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-# }
+EXTENSIONS = {
+    "sayari_graph_scraping.extensions.MetricsExtension": 500,
+}
+
+# Run metrics (see metrics.py): latency histograms of spider callbacks,
+# downloads and pipeline stages, queue depth histograms of the scheduler,
+# downloader, scraper and item offloading, written every METRICS_INTERVAL
+# seconds to METRICS_JSON_PATH (with the Scrapy stats) and
+# METRICS_PROMETHEUS_PATH (Prometheus text, node_exporter textfile format),
+# and served on 127.0.0.1:METRICS_PROMETHEUS_PORT/metrics when set. Set
+# METRICS_PROFILE_STAGE (ex. "pipeline.write_to_knowledge_graph") to profile
+# that stage with METRICS_PROFILER "cprofile" (METRICS_PROFILE_PATH.prof) or
+# "sampling" (collapsed stacks, METRICS_PROFILE_PATH.folded). Off, the
+# instrumentation is a no-op.
+METRICS_ENABLED = False
+METRICS_INTERVAL = 30.0
+METRICS_JSON_PATH = "output/metrics.json"
+METRICS_PROMETHEUS_PATH = "output/metrics.prom"
+METRICS_PROMETHEUS_PORT = None
+METRICS_PROFILE_STAGE = None
+METRICS_PROFILER = "cprofile"
+METRICS_PROFILE_PATH = "output/profile"
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    "sayari_graph_scraping.pipelines.ParquetLakePipeline": 200,
     "sayari_graph_scraping.pipelines.SayariGraphScrapingPipeline": 300,
+    "sayari_graph_scraping.pipelines.GraphDatabasePipeline": 400,
 }
 
+# Columnar copy of the data lake, zstd-compressed Parquet partitioned by crawl
+# date, one row group (part file) flushed every PARQUET_ROW_GROUP_SIZE records.
+PARQUET_LAKE_ENABLED = True
+PARQUET_LAKE_DIR = "output/company_records_parquet"
+PARQUET_ROW_GROUP_SIZE = 5000
+
+# Spill graph edges/nodes to Arrow IPC part files under output/graph_parts
+# every GRAPH_BATCH_SIZE edges, and compact them into output/graph.csv on close.
+# Keeps pipeline memory flat for full-registry crawls.
+GRAPH_STREAMING_ENABLED = False
+GRAPH_BATCH_SIZE = 10000
+
+# Graph extraction off the reactor thread, so downloads keep their pace as the
+# graph grows (see item_offload.py). "thread" runs it on one worker thread,
+# "process" extracts in GRAPH_OFFLOAD_WORKERS processes and merges on the
+# worker thread, "off" runs it inline. Items are merged in arrival order, the
+# graph is the same in every mode. Past GRAPH_OFFLOAD_MAX_PENDING queued items,
+# Scrapy waits for the worker to catch up before scheduling more downloads.
+# In streaming mode the graph database (GRAPH_DATABASE_URL) writes each spilled
+# batch on the same worker. "process" only pays off with spare cores: every item's graph is pickled back to the
+# crawl process, which costs more than it saves on one or two cores.
+GRAPH_OFFLOAD_MODE = "thread"
+GRAPH_OFFLOAD_MAX_PENDING = 1000
+GRAPH_OFFLOAD_WORKERS = 2
+
+# Data quality issues of crawled items (missing titles, non string values,
+# drawers without relationships) are counted by category instead of logged
+# one by one (see data_quality.py). The first issue of each category is logged,
+# then at most one line per category every DATA_QUALITY_LOG_INTERVAL seconds.
+# Counts and DATA_QUALITY_SAMPLE_SIZE random example businesses per category
+# are written to DATA_QUALITY_REPORT_PATH (JSON) and the same path with a
+# .parquet suffix on close. DATA_QUALITY_ASYNC_LOGGING writes those log lines
+# from a listener thread instead of the thread processing items.
+DATA_QUALITY_SAMPLE_SIZE = 20
+DATA_QUALITY_LOG_INTERVAL = 60.0
+DATA_QUALITY_REPORT_PATH = "output/data_quality.json"
+DATA_QUALITY_ASYNC_LOGGING = True
+
+# Incremental crawl: remember fetched drawers in an on-disk store and skip
+# businesses whose search row is unchanged and were fetched less than
+# INCREMENTAL_MAX_AGE_DAYS ago. Older ones are revalidated (conditionally, when
+# the API returned ETag/Last-Modified). Only changed businesses are appended
+# to output/company_records.jsonl.
+INCREMENTAL_CRAWL_ENABLED = False
+INCREMENTAL_MAX_AGE_DAYS = 7
+
+# On-disk crawl state used by incremental crawls and search shard resume
+CRAWL_STATE_PATH = "output/crawl_state.sqlite"
+
+# Drawers whose item the current crawl exported, a sorted array of 8 byte IDs
+# (see seen_set.py). Kept when an interrupted crawl resumes (SEARCH_SHARD_RESUME)
+# and appends to the data lake, so exported drawers are not fetched again.
+# Cleared when a crawl starts that overwrites the data lake.
+# Rows for a business whose drawer is still in flight share that one request.
+DRAWER_SEEN_SET_PATH = "output/drawer_seen.npy"
+
+# Search sharding: one businesssearch request per prefix in SEARCH_SHARD_PREFIXES
+# (ex. "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789" for the full registry).
+# Shards returning at least SEARCH_SHARD_MAX_ROWS rows are split into longer
+# prefixes using SEARCH_SHARD_SPLIT_ALPHABET, up to SEARCH_SHARD_MAX_PREFIX_LEN
+# characters. Rows are deduplicated across shards by business ID. A shard is
+# complete once the items of all its drawers are exported, shards with failed
+# drawers stay pending. With SEARCH_SHARD_RESUME, an interrupted crawl resumes
+# unfinished shards only and appends to the JSONL feed and the Parquet lake.
+SEARCH_SHARD_PREFIXES = "x"
+SEARCH_SHARD_MAX_ROWS = 5000
+SEARCH_SHARD_SPLIT_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 &'-.,"
+SEARCH_SHARD_MAX_PREFIX_LEN = 2
+SEARCH_SHARD_RESUME = True
+
+# Decode businesssearch rows one at a time straight from the response bytes
+# (ijson when installed, stdlib otherwise) instead of json.loads on the whole
+# response, so drawer requests start flowing immediately. Without ijson the
+# whole body is still decoded to one str first.
+SEARCH_STREAMING_JSON_ENABLED = True
+
+# YAML file of jmespath extraction rules shared by the spider and pipeline.
+# None uses sayari_graph_scraping/config/extraction_rules.yaml
+EXTRACTION_RULES_PATH = None
+
+# Only companies whose normalized title starts with this prefix are added to
+# the graph. Set to "" for full-registry crawls.
+GRAPH_TITLE_PREFIX = "X"
+
+# Fuzzy entity resolution of agent and owner names (see entity_resolution.py).
+# Before graph.csv is published, names whose resolution keys (punctuation and
+# legal suffix spellings folded) are at least ENTITY_RESOLUTION_THRESHOLD
+# Levenshtein similar are merged into their most frequent spelling.
+ENTITY_RESOLUTION_ENABLED = False
+ENTITY_RESOLUTION_THRESHOLD = 0.9
+
+# Graph layout. Connected components are laid out independently across
+# GRAPH_LAYOUT_WORKERS processes and cached by component hash, so re-renders
+# only lay out components that changed.
+GRAPH_LAYOUT_WORKERS = 4
+GRAPH_LAYOUT_CACHE_PATH = "output/layout_cache.pkl"
+
+# PNG rendering. Past GRAPH_RENDER_MAX_POINTS nodes/edges the overview PNG is
+# downsampled, GRAPH_RENDER_TILES > 1 also writes a full detail grid of
+# GRAPH_RENDER_TILES x GRAPH_RENDER_TILES PNGs to output/knowledge_graph_tiles/.
+GRAPH_RENDER_MAX_POINTS = 500000
+GRAPH_RENDER_TILES = 1
+
+# Interactive HTML. "pyvis" writes the single-file docs/index.html (fine for a
+# few thousand nodes), "tiles" writes compressed JSON tiles plus a search
+# index for the lazy-loading viewer in docs/viewer/, "both" writes both.
+GRAPH_VIEWER_MODE = "both"
+
+# Rendering is decoupled from the crawl. Once graph.csv and the node table are
+# durable, close_spider publishes output/graph_artifact.json and queues a render
+# job in output/render_queue/. "background" starts a detached render worker and
+# lets the crawl exit, "queue" leaves the job for
+# python -m sayari_graph_scraping.render_stage, "inline" renders in close_spider,
+# "off" only publishes the artifact.
+GRAPH_RENDER_MODE = "background"
+
+# Graph database (companies, entities, relationships tables, see
+# sayari_graph_scraping/sql/create_graph_tables.sql). A SQLite file path, or a
+# postgresql:// DSN (needs psycopg), ex. "output/graph.sqlite". "" disables it.
+# During a crawl, every batch the graph pipeline spills (GRAPH_BATCH_SIZE, in
+# streaming mode) or the whole graph on close is upserted in one transaction;
+# postprocess.py --database upserts every GRAPH_DATABASE_BATCH_SIZE
+# relationships. Reruns are idempotent.
+GRAPH_DATABASE_URL = ""
+GRAPH_DATABASE_BATCH_SIZE = 5000
+# Keep degree, per relationship degree and connected component side tables
+# up to date with every batch (see graph_analytics.py), so hub queries are
+# index lookups: python -m sayari_graph_scraping.graph_db --hubs 10
+GRAPH_DATABASE_ANALYTICS = True
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = False  # superseded by ADAPTIVE_CONCURRENCY_ENABLED
 # The initial download delay
 AUTOTHROTTLE_START_DELAY = 0.3
 # The maximum download delay to be set in case of high latencies
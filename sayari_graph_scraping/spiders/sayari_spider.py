@@ -1,8 +1,18 @@
 import scrapy
 import os
+from scrapy import signals
 import json
-import jmespath
 import pprint
+from sayari_graph_scraping.crawl_state import (
+    CrawlStateStore,
+    VOLATILE_ROW_FIELDS,
+    content_hash,
+)
+from sayari_graph_scraping.search_shards import SearchShardPlanner, resumes_crawl
+from sayari_graph_scraping.seen_set import DrawerSeenSet, drawer_key
+from sayari_graph_scraping.json_stream import iter_object_items
+from sayari_graph_scraping.extraction import load_extraction_rules
+from sayari_graph_scraping.metrics import metrics
 
 
 class BusinessSpider(scrapy.Spider):
@@ -18,14 +28,82 @@ class BusinessSpider(scrapy.Spider):
             },
         },
     }
+    state_store = None  # On-disk crawl state, see CRAWL_STATE_PATH
+    incremental = False
+    append_outputs = False  # incremental or resumed crawls append to the data lake
+    shard_planner = None
+    seen_drawers = None  # fetched drawers, see DRAWER_SEEN_SET_PATH
+    streaming_json = True  # see SEARCH_STREAMING_JSON_ENABLED
+    rules = load_extraction_rules()  # see EXTRACTION_RULES_PATH
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        # Every shard split is one more level of request depth, drawer
+        # requests are one below their shard and a drawer fetched again
+        # after a 304 (incremental crawls) one more
+        min_depth_limit = settings.getint("SEARCH_SHARD_MAX_PREFIX_LEN", 2) + 1
+        if 0 < settings.getint("DEPTH_LIMIT") < min_depth_limit:
+            settings.set("DEPTH_LIMIT", min_depth_limit, priority="spider")
+        if settings.getbool("INCREMENTAL_CRAWL_ENABLED") or resumes_crawl(settings):
+            # Incremental crawls append only changed businesses to the data lake,
+            # resumed crawls the businesses of the shards left unfinished.
+            # Later lines for the same business supersede earlier ones.
+            feeds = {
+                uri: {**options, "overwrite": False}
+                for uri, options in settings.getdict("FEEDS").items()
+            }
+            settings.set("FEEDS", feeds, priority="spider")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        settings = crawler.settings
+        spider.incremental = settings.getbool("INCREMENTAL_CRAWL_ENABLED")
+        spider.append_outputs = spider.incremental or resumes_crawl(settings)
+        spider.streaming_json = settings.getbool("SEARCH_STREAMING_JSON_ENABLED", True)
+        if settings.get("EXTRACTION_RULES_PATH"):
+            spider.rules = load_extraction_rules(settings.get("EXTRACTION_RULES_PATH"))
+        resume_shards = settings.getbool("SEARCH_SHARD_RESUME")
+        if spider.incremental or resume_shards:
+            spider.state_store = CrawlStateStore(settings.get("CRAWL_STATE_PATH"))
+        if spider.incremental:
+            spider.max_age = settings.getfloat("INCREMENTAL_MAX_AGE_DAYS") * 24 * 60 * 60
+        spider.shard_planner = SearchShardPlanner.from_settings(
+            settings, store=spider.state_store if resume_shards else None
+        )
+        spider.seen_drawers = DrawerSeenSet(settings.get("DRAWER_SEEN_SET_PATH"))
+        # drawer key -> shards waiting on the drawer request (and its item) in flight
+        spider.in_flight_drawers = {}
+        # Drawers count as finished once their item is exported
+        crawler.signals.connect(spider.item_exported, signal=signals.item_scraped)
+        crawler.signals.connect(spider.item_exported, signal=signals.item_dropped)
+        crawler.signals.connect(spider.item_failed, signal=signals.item_error)
+        return spider
+
+    def closed(self, reason):
+        if self.state_store is not None:
+            self.state_store.close()
+        self.seen_drawers.save()
 
     def start_requests(self):
         """
-        Begin Spider Request
+        Begin Spider Request, one search request per search shard (prefix)
+        """
+        prefixes = self.shard_planner.initial_shards() if self.shard_planner else ["x"]
+        if not (self.shard_planner and self.shard_planner.resumed and self.append_outputs):
+            # Fresh crawl (or outputs overwritten), fetch every drawer again
+            self.seen_drawers.clear()
+        for prefix in prefixes:
+            yield self.build_search_request(prefix)
+
+    def build_search_request(self, prefix):
+        """
+        Search for businesses whose name starts with prefix
         """
         url = "https://firststop.sos.nd.gov/api/Records/businesssearch"
         payload = {
-            "SEARCH_VALUE": "x",
+            "SEARCH_VALUE": prefix,
             "STARTS_WITH_YN": "true",
             "ACTIVE_ONLY_YN": True,
         }
@@ -36,12 +114,14 @@ class BusinessSpider(scrapy.Spider):
             # about the data type I'm receiving
             "Accept": "application/json",
         }
-        yield scrapy.Request(
+        return scrapy.Request(
             url=url,
             method="POST",
             body=json.dumps(payload),
             headers=headers,
             callback=self.parse,
+            meta={"shard": prefix},
+            dont_filter=True,  # same POST url for every shard
         )
 
     def parse(self, response):
@@ -49,64 +129,195 @@ class BusinessSpider(scrapy.Spider):
         Parse table data from initial web app request. Response
         should be Python dictionary converted from JSON.
         """
+        shard = response.meta.get("shard")
+        planner = self.shard_planner if shard is not None else None
+        num_rows = 0
+
+        # k contains business id and v contains more business definition
+        for k, v in self.iter_search_rows(response, self.rules["search"]["rows"]):
+            num_rows += 1
+            v["ID_key"] = k
+            business_id = (
+                v.get("ID", None) or k
+            )  # use either ID attribute or key as ID.
+            if business_id is None:
+                warn_msg = f"ID does not exist for business id {business_id}"
+                self.logger.warning(warn_msg)
+            key = drawer_key(business_id)
+            if key in self.in_flight_drawers:
+                # Requested by another shard, this shard completes with that request
+                self.in_flight_drawers[key].append(shard)
+                if planner is not None:
+                    planner.drawer_scheduled(shard)
+                self.crawler.stats.inc_value("drawers/coalesced")
+                continue
+            # Incremental crawls decide from the crawl state store instead
+            if not self.incremental and key in self.seen_drawers:
+                self.crawler.stats.inc_value("drawers/already_fetched")
+                continue
+            request = self.build_drawer_request(business_id, v, shard)
+            if request is not None:
+                self.in_flight_drawers[key] = [shard]
+                if planner is not None:
+                    planner.drawer_scheduled(shard)
+                yield request
+
+        if planner is not None:
+            if planner.should_split(shard, num_rows):
+                # Response may be truncated, also search longer prefixes.
+                # Rows of this shard were still processed, duplicates are dropped above.
+                for child in planner.split(shard):
+                    yield self.build_search_request(child)
+            planner.shard_parsed(shard, num_rows)
+
+    def iter_search_rows(self, response, rows_rule):
+        """
+        Yield (business key, business row) pairs from search response.
+        In streaming mode rows are decoded one at a time straight from the
+        response bytes, so drawer requests start flowing before the whole
+        response is decoded. Streaming needs rows under a top level key.
+        """
+        business_search_path = rows_rule.expression
+        if self.streaming_json and business_search_path.isidentifier():
+            try:
+                yield from iter_object_items(response.body, business_search_path)
+            except KeyError:
+                self.raise_search_error(f"{business_search_path} was not found in JSON.")
+            except TypeError as err:
+                self.raise_search_error(str(err))
+            return
+
         # Get all businesses
-        all_businesses_json = json.loads(response.text)
+        with metrics.stage("spider.search_json"):
+            all_businesses_json = json.loads(response.text)
 
         # Get dictionary under 'rows'.
         # For the dictionary, only process dict values
-        business_search_path = "rows"
-        all_businesses_jsonl = jmespath.search(
-            business_search_path, all_businesses_json
-        )
+        all_businesses_jsonl = rows_rule(all_businesses_json)
 
         # Path should exist
         if all_businesses_jsonl is None:
-            err_msg = f"{business_search_path} was not found in JSON."
-            self.logger.error(err_msg)
-            raise Exception(err_msg)
+            self.raise_search_error(f"{business_search_path} was not found in JSON.")
 
         # Should be dictionary
         if not isinstance(all_businesses_jsonl, dict):
-            err_msg = f"Expected data format dict for {business_search_path}, but got {type(all_businesses_jsonl)}"
-            self.logger.error(err_msg)
-            raise Exception(err_msg)
+            self.raise_search_error(
+                f"Expected data format dict for {business_search_path}, but got {type(all_businesses_jsonl)}"
+            )
+        yield from all_businesses_jsonl.items()
+
+    def raise_search_error(self, err_msg):
+        self.logger.error(err_msg)
+        raise Exception(err_msg)
 
+    def build_drawer_request(self, business_id, business_meta, shard=None, conditional=True):
+        """
+        Build drawer request for a business. In incremental mode, returns None
+        for businesses whose search row is unchanged and were fetched recently,
+        and adds HTTP validators (ETag/Last-Modified) when the API gave us any
+        (unless conditional is False).
+        """
         drawer_baseurl = "https://firststop.sos.nd.gov/api/FilingDetail/business"
         drawer_headers = {
             "authorization": "undefined",
             "Accept": "application/json",
         }
+        drawer_urlsuffix = (
+            f"{business_id}/false"  # true or false in link return same result.
+            # Tested in POSTMAN
+        )
+        meta = {"business_id": business_id, "shard": shard}
 
-        # k contains business id and v contains more business definition
-        for k, v in all_businesses_jsonl.items():
-            v["ID_key"] = k
-            business_id = (
-                v.get("ID", None) or k
-            )  # use either ID attribute or key as ID.
-            if business_id is None:
-                warn_msg = f"ID does not exist for business id {business_id}"
-                self.logger.warning(warn_msg)
-            drawer_urlsuffix = (
-                f"{business_id}/false"  # true or false in link return same result.
-                # Tested in POSTMAN
-            )
-            yield scrapy.Request(
-                url=f"{drawer_baseurl}/{drawer_urlsuffix}",
-                headers=drawer_headers,
-                callback=self.parse_drawer_information,
-                cb_kwargs={"business_meta": v},  # pass data to yield later
-            )
+        if self.incremental:
+            row_hash = content_hash(business_meta, exclude=VOLATILE_ROW_FIELDS)
+            state = self.state_store.get(business_id)
+            if CrawlStateStore.is_fresh(state, row_hash, self.max_age):
+                self.crawler.stats.inc_value("incremental/skipped_unchanged")
+                return None
+            meta["row_hash"] = row_hash
+            if state is not None and conditional:
+                if state["etag"]:
+                    drawer_headers["If-None-Match"] = state["etag"]
+                if state["last_modified"]:
+                    drawer_headers["If-Modified-Since"] = state["last_modified"]
+                # 304 Not Modified is an expected answer to conditional requests
+                meta["handle_httpstatus_list"] = [304]
+
+        return scrapy.Request(
+            url=f"{drawer_baseurl}/{drawer_urlsuffix}",
+            headers=drawer_headers,
+            callback=self.parse_drawer_information,
+            errback=self.drawer_failed,
+            cb_kwargs={"business_meta": business_meta},  # pass data to yield later
+            meta=meta,
+            priority=1,  # drain drawers before starting more search shards
+            dont_filter=True,  # deduplicated by seen_drawers, see parse
+        )
+
+    def drawer_finished(self, response, fetched=True):
+        """
+        Count drawer towards the completion of every search shard waiting on
+        it, once its item was exported (or it had no item to export).
+        Exported drawers are not requested again until the next fresh crawl.
+        Shards waiting on a drawer that was not fetched stay pending.
+        """
+        if "business_id" not in response.meta:
+            return  # not a drawer response
+        key = drawer_key(response.meta["business_id"])
+        shards = self.in_flight_drawers.pop(key, [response.meta.get("shard")])
+        if fetched:
+            self.seen_drawers.add(key)
+        for shard in shards:
+            if self.shard_planner is not None and shard is not None:
+                if fetched:
+                    self.shard_planner.drawer_finished(shard)
+                else:
+                    self.shard_planner.drawer_failed(shard)
+
+    def drawer_failed(self, failure):
+        self.logger.warning(f"Drawer request failed: {failure.request.url} ({failure.value!r})")
+        self.drawer_finished(failure.request, fetched=False)
+
+    def item_exported(self, item, response, **kwargs):
+        """
+        item_scraped and item_dropped handler: the item is out of the
+        pipelines (and in the feed), its drawer is finished.
+        """
+        self.drawer_finished(response)
+
+    def item_failed(self, item, response, failure, **kwargs):
+        self.drawer_finished(response, fetched=False)
 
     def parse_drawer_information(self, response, business_meta):
         """
         Get information from drawer and return all relevant business data
         """
         business_information = business_meta
-        drawer_info_json = json.loads(response.text)
-        if "DRAWER_DETAIL_LIST" in drawer_info_json:
+        if response.status == 304:
+            state = self.state_store.get(response.meta["business_id"])
+            if state is not None and state["row_hash"] != response.meta["row_hash"]:
+                # Search row changed, the drawer did not. Only its hash is
+                # stored, fetch it again to write the new row to the data lake.
+                self.crawler.stats.inc_value("incremental/not_modified_row_changed")
+                yield self.build_drawer_request(
+                    response.meta["business_id"], business_meta, response.meta.get("shard"), conditional=False
+                )
+                return
+            self.record_unchanged_drawer(response)
+            self.drawer_finished(response)  # nothing to export
+            return
+        with metrics.stage("spider.drawer_json"):
+            drawer_info_json = json.loads(response.text)
+        if self.incremental and not self.record_drawer_state(
+            response, drawer_info_json
+        ):
+            self.drawer_finished(response)  # unchanged, nothing to export
+            return
+        drawer_details = self.rules["drawer"]["drawer_details"](drawer_info_json)
+        if drawer_details is not None:
             yield {
                 **business_information,
-                "DRAWER_DETAIL_LIST": drawer_info_json["DRAWER_DETAIL_LIST"],
+                "DRAWER_DETAIL_LIST": drawer_details,
             }
         else:
             business_id = response.url.rsplit("/", 2)[1]  # second last subpath
@@ -116,3 +327,39 @@ class BusinessSpider(scrapy.Spider):
             )
             self.logger.warning(warn_msg)
             yield business_information
+
+    def record_unchanged_drawer(self, response):
+        """
+        Server confirmed drawer did not change since last fetch.
+        """
+        self.state_store.touch(response.meta["business_id"], response.meta["row_hash"])
+        self.crawler.stats.inc_value("incremental/not_modified")
+
+    def record_drawer_state(self, response, drawer_info_json):
+        """
+        Store drawer hash and HTTP validators. Returns True if drawer or
+        search row changed since last fetch and should be written to the
+        data lake.
+        """
+        business_id = response.meta["business_id"]
+        row_hash = response.meta["row_hash"]
+        drawer_hash = content_hash(drawer_info_json)
+        state = self.state_store.get(business_id)
+        if state is not None and state["drawer_hash"] == drawer_hash:
+            self.state_store.touch(business_id, row_hash)
+            if state["row_hash"] != row_hash:
+                self.crawler.stats.inc_value("incremental/changed_row")
+                return True
+            self.crawler.stats.inc_value("incremental/unchanged_drawer")
+            return False
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        self.state_store.upsert(
+            business_id,
+            row_hash,
+            drawer_hash,
+            etag=etag.decode() if etag else None,
+            last_modified=last_modified.decode() if last_modified else None,
+        )
+        self.crawler.stats.inc_value("incremental/changed")
+        return True
@@ -0,0 +1,23 @@
+CREATE TABLE IF NOT EXISTS node_degrees (
+    node_id BIGINT PRIMARY KEY,
+    name TEXT NOT NULL,
+    degree INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS node_degrees_degree ON node_degrees (degree);
+CREATE TABLE IF NOT EXISTS relationship_degrees (
+    node_id BIGINT NOT NULL,
+    relationship VARCHAR(50) NOT NULL,
+    degree INTEGER NOT NULL,
+    PRIMARY KEY (node_id, relationship)
+);
+CREATE INDEX IF NOT EXISTS relationship_degrees_degree ON relationship_degrees (relationship, degree);
+CREATE TABLE IF NOT EXISTS node_components (
+    node_id BIGINT PRIMARY KEY,
+    component_id BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS node_components_component ON node_components (component_id);
+CREATE TABLE IF NOT EXISTS components (
+    component_id BIGINT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS components_size ON components (size);
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS companies (
+    company_id BIGINT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    company_type TEXT,
+    record_num TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS companies_record_num ON companies (record_num);
+CREATE TABLE IF NOT EXISTS entities (
+    entity_id BIGINT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS relationships (
+    entity_id BIGINT NOT NULL REFERENCES entities (entity_id),
+    company_id BIGINT NOT NULL REFERENCES companies (company_id),
+    relationship VARCHAR(50) NOT NULL,
+    PRIMARY KEY (entity_id, relationship, company_id)
+);
+CREATE INDEX IF NOT EXISTS relationships_company ON relationships (company_id);
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import random
+from sayari_graph_scraping import settings
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.http_archive import HttpArchive
+
+# Synthetic registry for offline crawls and benchmarks: scales the crawled
+# sample (output/company_records.jsonl) to any number of businesses and writes
+# the businesssearch and FilingDetail responses the spider would get into an
+# HttpArchive (replay with HTTP_ARCHIVE_MODE = "replay"). Business n is a copy
+# of sample record n % len(sample) with a new ID and title, half of its agents
+# are drawn from a pool of synthetic agents (so sample hubs stay hubs) and
+# owners are synthetic. The root search is truncated at max_rows rows, like the
+# API, so the spider splits it into longer prefixes.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = os.path.join(ROOT_DIR, "output", "company_records.jsonl")
+FIRST_ID = 10_000_000
+AGENT_LABELS = {"Registered Agent", "Commercial Registered Agent"}
+JSON_HEADERS = {"Content-Type": ["application/json; charset=utf-8"]}
+
+
+def synthetic_row(sample, n):
+    """
+    Search row of business n.
+    """
+    base = sample[n % len(sample)]
+    business_id = FIRST_ID + n
+    row = {k: v for k, v in base.items() if k not in ("ID_key", "DRAWER_DETAIL_LIST")}
+    title, company_type = base["TITLE"][:2]
+    row.update(
+        SORT_INDEX=n,
+        TITLE=[f"{title} {n}", company_type],
+        ID=business_id,
+        RECORD_NUM=f"{business_id:010d}",
+    )
+    return row
+
+
+def synthetic_drawer(sample, n, num_businesses, seed=0):
+    """
+    FilingDetail response of business n.
+    """
+    rng = random.Random(seed * 1_000_003 + n)
+    details = []
+    for detail in sample[n % len(sample)].get("DRAWER_DETAIL_LIST") or []:
+        value = detail.get("VALUE")
+        if detail.get("LABEL") in AGENT_LABELS and isinstance(value, str) and rng.random() < 0.5:
+            # Agent pool of 2% of businesses, ~50 companies per synthetic agent
+            agent = rng.randrange(max(1, num_businesses // 50))
+            address = value.partition("\n")[2]
+            value = f"SYNTHETIC AGENT {agent}\n{address}"
+        elif detail.get("LABEL") == "Owner Name":
+            value = f"SYNTHETIC OWNER {rng.randrange(num_businesses)}"
+        details.append({**detail, "VALUE": value})
+    return {"DRAWER_DETAIL_LIST": details}
+
+
+def search_body(sample, business_numbers):
+    rows = {}
+    for n in business_numbers:
+        row = synthetic_row(sample, n)
+        rows[str(row["ID"])] = row
+    return json.dumps({"rows": rows}).encode()
+
+
+def write_archive(
+    archive_path,
+    num_businesses,
+    sample_path=SAMPLE_PATH,
+    max_rows=settings.SEARCH_SHARD_MAX_ROWS,
+    split_alphabet=settings.SEARCH_SHARD_SPLIT_ALPHABET,
+    seed=0,
+):
+    """
+    Write the responses of a crawl of num_businesses synthetic businesses
+    (search prefix "x", SEARCH_SHARD_MAX_PREFIX_LEN 2). Returns the number of
+    responses written.
+    """
+    # Imported here, the spider builds the exact requests to archive
+    from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+    spider = BusinessSpider()
+    sample = list(iter_latest_records(sample_path))
+    archive = HttpArchive(archive_path)
+    archive.put("GET", "https://firststop.sos.nd.gov/robots.txt", b"", 404, {}, b"")
+    num_written = 1
+
+    def put(request, status, body):
+        archive.put(request.method, request.url, request.body, status, JSON_HEADERS, body)
+
+    put(spider.build_search_request("x"), 200, search_body(sample, range(min(num_businesses, max_rows))))
+    num_written += 1
+    if num_businesses >= max_rows:
+        # Businesses of every child prefix, by second title character
+        by_char = {}
+        for i, record in enumerate(sample):
+            by_char.setdefault(record["TITLE"][0][1:2].upper(), []).append(i)
+        for char in dict.fromkeys(split_alphabet):
+            numbers = sorted(
+                n for i in by_char.get(char, []) for n in range(i, num_businesses, len(sample))
+            )
+            put(spider.build_search_request("x" + char), 200, search_body(sample, numbers))
+            num_written += 1
+
+    for n in range(num_businesses):
+        row = synthetic_row(sample, n)
+        request = spider.build_drawer_request(row["ID"], row)
+        body = json.dumps(synthetic_drawer(sample, n, num_businesses, seed)).encode()
+        put(request, 200, body)
+        num_written += 1
+    archive.close()
+    return num_written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic registry HTTP archive for offline crawls.")
+    parser.add_argument("--businesses", type=int, default=100000)
+    parser.add_argument("--archive", default=os.path.join(ROOT_DIR, "output", "http_archive.sqlite"))
+    parser.add_argument("--sample", default=SAMPLE_PATH)
+    parser.add_argument("--max-rows", type=int, default=settings.SEARCH_SHARD_MAX_ROWS,
+                        help="Rows returned by the root search, SEARCH_SHARD_MAX_ROWS.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    num_written = write_archive(args.archive, args.businesses, args.sample, args.max_rows, seed=args.seed)
+    print(f"Wrote {num_written} responses to {args.archive}")
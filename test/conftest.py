@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Make sayari_graph_scraping importable when running pytest from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_item(business_id, title, agent, owners=()):
+    """
+    Scraped company record with a registered agent and optional owners,
+    the first owner on the "Owners" row and the rest on continuation rows.
+    """
+    details = [{"LABEL": "Registered Agent", "VALUE": agent}]
+    if owners:
+        details.append({"LABEL": "Owners", "VALUE": owners[0]})
+        details.extend({"LABEL": "", "VALUE": owner} for owner in owners[1:])
+    return {
+        "ID": business_id,
+        "RECORD_NUM": f"{business_id:010d}",
+        "TITLE": [title, "Corporation - Business - Domestic"],
+        "DRAWER_DETAIL_LIST": details,
+    }
@@ -0,0 +1,140 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from scrapy.http import Request, TextResponse
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping.adaptive_concurrency import AimdController, parse_retry_after
+from sayari_graph_scraping.middlewares import AdaptiveConcurrencyMiddleware
+from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+DRAWER_URL = "https://firststop.sos.nd.gov/api/FilingDetail/business/7/false"
+
+
+class MockRegistry(ThreadingHTTPServer):
+    """
+    Answers 429 to requests beyond capacity concurrent ones.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, capacity):
+        super().__init__(("127.0.0.1", 0), MockRegistryHandler)
+        self.capacity = capacity
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+
+class MockRegistryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.in_flight += 1
+            overloaded = self.server.in_flight > self.server.capacity
+        time.sleep(0.005)
+        self.send_response(429 if overloaded else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch(url):
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(url) as response:
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return time.monotonic() - start, status
+
+
+def make_middleware():
+    settings = {
+        "ADAPTIVE_CONCURRENCY_ENABLED": True,
+        "RETRY_TIMES": 2,
+        # Default list includes the HTTP/1.1 handler's TunnelError, keep the TLS stack out
+        "RETRY_EXCEPTIONS": ["twisted.internet.error.TimeoutError", "builtins.OSError"],
+    }
+    crawler = get_crawler(BusinessSpider, settings)
+    slots = {"firststop.sos.nd.gov": SimpleNamespace(concurrency=8)}
+    crawler.engine = SimpleNamespace(
+        downloader=SimpleNamespace(slots=slots, get_slot_key=lambda request: "firststop.sos.nd.gov")
+    )
+    spider = BusinessSpider.from_crawler(crawler)
+    return AdaptiveConcurrencyMiddleware.from_crawler(crawler), spider, slots
+
+
+class TestAdaptiveConcurrency:
+    def test_aimd(self):
+        controller = AimdController(concurrency=4, target_latency=1.0)
+        for _ in range(4):
+            controller.record(0.1, now=0)
+        assert controller.limit == 5
+        # A burst of 429s from requests already in flight halves once
+        for _ in range(5):
+            controller.record(0.1, throttled=True, retry_after=3, now=10)
+        assert controller.limit == 2
+        assert controller.pause_remaining(now=11) == 2
+        controller.record(5.0, now=20)
+        assert controller.limit == 1  # p95 latency over target
+        assert controller.metrics()["decreases"] == 2
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after(b"12") == 12
+        assert parse_retry_after(b"Wed, 21 Oct 2015 07:28:00 GMT") == 0
+        assert parse_retry_after(b"soon") is None
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("100000") == 300
+
+    def test_middleware_retries_with_backoff(self):
+        middleware, spider, slots = make_middleware()
+        request = Request(DRAWER_URL, meta={"download_slot": "firststop.sos.nd.gov"})
+        response = TextResponse(DRAWER_URL, status=429, headers={"Retry-After": "4"}, request=request)
+        before = time.monotonic()
+        retry = middleware.process_response(request, response, spider)
+        assert retry.meta["retry_times"] == 1
+        assert retry.meta["retry_not_before"] >= before + 4
+        assert slots["firststop.sos.nd.gov"].concurrency == 4
+        assert spider.crawler.stats.get_value("adaptive/firststop.sos.nd.gov/throttled") == 1
+        # Paused by Retry-After
+        assert middleware.process_request(Request(DRAWER_URL), spider) is not None
+
+        retry = middleware.process_response(retry, response.replace(request=retry), spider)
+        final = retry.replace(meta={**retry.meta, "retry_times": 2})
+        assert middleware.process_response(final, response, spider) is response
+
+        ok = TextResponse(DRAWER_URL, status=200, request=request)
+        assert middleware.process_response(request, ok, spider) is ok
+        assert all(middleware.backoff(3) <= 2.0 for _ in range(100))
+
+    def test_converges_against_mock_server(self):
+        server = MockRegistry(capacity=6)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        controller = AimdController(concurrency=1, max_concurrency=32)
+        limits, statuses = [], []
+        try:
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                in_flight = set()
+                while len(statuses) < 600:
+                    while len(in_flight) < controller.limit:
+                        in_flight.add(executor.submit(fetch, url))
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        latency, status = future.result()
+                        controller.record(latency, throttled=status == 429)
+                        statuses.append(status)
+                        limits.append(controller.limit)
+        finally:
+            server.shutdown()
+            server.server_close()
+        # Grew past the start, stayed around capacity, mostly served
+        assert max(limits) >= 6
+        assert 2 <= sum(limits[300:]) / 300 <= 16
+        assert statuses[300:].count(200) > 180
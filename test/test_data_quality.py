@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+import polars as pl
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.data_quality import DataQualityCollector, QueueLogging
+from sayari_graph_scraping.parallel_postprocess import build_graph_parallel
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+
+class TestDataQuality:
+    def test_counts_samples_and_rate_limit(self, tmp_path, caplog):
+        quality = DataQualityCollector(sample_size=5, log_interval=3600)
+        with caplog.at_level(logging.WARNING):
+            for business_id in range(1000):
+                quality.record("Company title not found", business_id, f"{business_id:010d}")
+            quality.record("Label not string", 7, None, detail="x" * 1000)
+        # First issue of each category only
+        assert [record.getMessage() for record in caplog.records] == [
+            "Company title not found for business id: 0 and SOS Control ID#: 0000000000",
+            "Label not string : " + "x" * 200 + " for business id: 7 and SOS Control ID#: None",
+        ]
+
+        quality.write_report(str(tmp_path / "quality.json"))
+        report = json.loads((tmp_path / "quality.json").read_text())
+        assert report["total_issues"] == 1001
+        titles = report["categories"]["Company title not found"]
+        assert titles["count"] == 1000
+        assert len(titles["examples"]) == 5
+        # Sampled from the whole run, not just the first issues
+        assert max(example["business_id"] for example in titles["examples"]) > 5
+        examples = pl.read_parquet(tmp_path / "quality.parquet")
+        assert examples.height == 6
+        assert examples.filter(pl.col("category") == "Label not string")["count"].to_list() == [1]
+
+    def test_queue_logging(self, caplog):
+        queue_logging = QueueLogging()
+        queue_logging.start()
+        quality = DataQualityCollector(log_interval=0)
+        with caplog.at_level(logging.WARNING):
+            for business_id in range(3):
+                quality.record("DRAWER_DETAIL_LIST was not found", business_id)
+            queue_logging.stop()  # writes every queued record
+        messages = [record.getMessage() for record in caplog.records]
+        assert len(messages) == 3
+        assert messages[2].endswith("(3 items with this issue so far)")
+        assert logging.getLogger("sayari_graph_scraping.data_quality").propagate
+
+    def test_worker_issues_are_merged(self, tmp_path):
+        def counts(pipeline):
+            return {name: entry["count"] for name, entry in pipeline.quality.summary()["categories"].items()}
+
+        # Sample lake (clean) with problem records mixed in
+        lake = tmp_path / "company_records.jsonl"
+        with open(lake, "w") as f:
+            for n, item in enumerate(iter_latest_records(LAKE)):
+                if n % 20 == 1:
+                    item["DRAWER_DETAIL_LIST"] = [{"LABEL": None, "VALUE": "x"}]
+                elif n % 20 == 2:
+                    item["DRAWER_DETAIL_LIST"] = [{"LABEL": "Owners", "VALUE": None}]
+                elif n % 20 == 3:
+                    del item["DRAWER_DETAIL_LIST"]
+                f.write(json.dumps(item) + "\n")
+
+        inline = SayariGraphScrapingPipeline(output_dir=str(tmp_path / "inline"))
+        for item in iter_latest_records(str(lake)):
+            inline.process_item(item, None)
+        assert len(counts(inline)) == 4
+
+        offloaded = SayariGraphScrapingPipeline(
+            output_dir=str(tmp_path / "process"), offload_mode="process", offload_workers=2, render_mode="off"
+        )
+        offloaded.open_spider(None)
+        for item in iter_latest_records(str(lake)):
+            offloaded.process_item(item, None)
+        offloaded.offloader.close()
+        assert counts(offloaded) == counts(inline)
+
+        parallel = SayariGraphScrapingPipeline(output_dir=str(tmp_path / "parallel"))
+        build_graph_parallel(str(lake), parallel, workers=2)
+        assert counts(parallel) == counts(inline)
@@ -0,0 +1,58 @@
+import logging
+import os
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.pipelines import LABEL_TABLE, SayariGraphScrapingPipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+
+def parse(tmp_path, details):
+    pipeline = SayariGraphScrapingPipeline(output_dir=str(tmp_path))
+    pipeline.write_to_knowledge_graph(
+        {"ID": 1, "TITLE": ["X Co", "Corp"], "RECORD_NUM": "1", "DRAWER_DETAIL_LIST": details}
+    )
+    return [(entity, attributes["label"]) for entity, _, attributes in pipeline.graph.iter_edges()]
+
+
+class TestDrawerParser:
+    def test_matches_checked_in_graph(self, tmp_path):
+        pipeline = SayariGraphScrapingPipeline(output_dir=str(tmp_path))
+        for item in iter_latest_records(LAKE):
+            pipeline.process_item(item, None)
+        pipeline.graph.write_csv(str(tmp_path / "graph.csv"))
+        with open(os.path.join(ROOT, "output", "graph.csv")) as expected:
+            assert (tmp_path / "graph.csv").read_text() == expected.read()
+
+    def test_owners_continuation_rows(self, tmp_path):
+        edges = parse(tmp_path, [
+            {"LABEL": "Owners", "VALUE": "Ann Lee\n1 Main St"},
+            {"LABEL": "", "VALUE": "  bob   smith "},
+            {"LABEL": "", "VALUE": "Carl"},
+            {"LABEL": "Owner Address", "VALUE": "somewhere"},
+            {"LABEL": "", "VALUE": "not an owner"},
+            {"LABEL": "registered  agent", "VALUE": "Ann Lee"},
+            {"LABEL": "", "VALUE": "not an owner either"},
+        ])
+        assert edges == [
+            ("ANN LEE", "OWNER_NAME"),
+            ("BOB SMITH", "OWNER_NAME"),
+            ("CARL", "OWNER_NAME"),
+            ("ANN LEE", "REGISTERED_AGENT"),
+        ]
+        assert LABEL_TABLE["registered  agent"] == "REGISTERED_AGENT"
+        assert LABEL_TABLE["Owner Address"] == ""
+
+    def test_warnings(self, tmp_path, caplog):
+        with caplog.at_level(logging.WARNING):
+            edges = parse(tmp_path, [
+                {"LABEL": "Owners", "VALUE": None},
+                {"LABEL": None, "VALUE": "ends owners"},
+                {"LABEL": "", "VALUE": "not an owner"},
+            ])
+            assert edges == [(None, "OWNER_NAME")]
+            parse(tmp_path, [{"LABEL": "Status", "VALUE": "Active"}])
+        messages = [record.getMessage() for record in caplog.records]
+        assert messages[0].startswith("Value for OWNERS not string : None")
+        assert messages[1].startswith("Label not string : None")
+        assert messages[2].startswith("Expected graph label names not found")
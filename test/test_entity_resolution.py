@@ -0,0 +1,106 @@
+import random
+import numpy as np
+import polars as pl
+from sayari_graph_scraping.entity_resolution import (
+    levenshtein_similarity,
+    resolve_entities,
+    resolve_graph_entities,
+)
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+from conftest import make_item
+
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        prev, row[0] = row[:], i
+        for j, char_b in enumerate(b, 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (char_a != char_b))
+    return row[-1]
+
+
+class TestEntityResolution:
+    def test_kernel_matches_levenshtein(self):
+        rng = random.Random(3)
+        a = ["".join(rng.choice("AB C") for _ in range(rng.randrange(0, 10))) for _ in range(300)]
+        b = ["".join(rng.choice("AB C") for _ in range(rng.randrange(0, 10))) for _ in range(300)]
+        codes_a = np.array(a, dtype="<U10").view(np.uint32).reshape(300, 10)
+        codes_b = np.array(b, dtype="<U10").view(np.uint32).reshape(300, 10)
+        similarity = levenshtein_similarity(
+            codes_a, codes_b, np.array([len(s) for s in a]), np.array([len(s) for s in b])
+        )
+        expected = [1 - levenshtein(x, y) / max(len(x), len(y), 1) for x, y in zip(a, b)]
+        assert np.allclose(similarity, expected)
+
+    def test_resolve_entities(self):
+        resolved = resolve_entities(
+            [
+                "REGISTERED AGENTS, INC.",
+                "REGISTERED AGENTS INCORPORATED",
+                "REGISTERED AGENTS INC",
+                "THE PRENTICE-HALL CORPORATION SYSTEM, INC.",
+                "PRENTICE HALL CORP SYSTEM INC",
+                "ELITE GOLF 2, LLC",
+                "ELITE GOLF 3, LLC",
+                "JANE DOE",
+            ],
+            counts=[1, 1, 5, 3, 1, 1, 1, 1],
+        )
+        canonical = dict(zip(resolved["name"], resolved["canonical"]))
+        assert canonical["REGISTERED AGENTS, INC."] == "REGISTERED AGENTS INC"
+        assert canonical["REGISTERED AGENTS INCORPORATED"] == "REGISTERED AGENTS INC"
+        assert canonical["PRENTICE HALL CORP SYSTEM INC"] == "THE PRENTICE-HALL CORPORATION SYSTEM, INC."
+        # Numbers must match
+        assert canonical["ELITE GOLF 2, LLC"] == "ELITE GOLF 2, LLC"
+        assert resolved["canonical_id"].n_unique() == 5
+
+    def test_long_names_compared_in_full(self):
+        prefix = "NORTH DAKOTA AGRICULTURAL COOPERATIVE ASSOCIATION OF "
+        names = [prefix + "GRAND FORKS COUNTY", prefix + "BURLEIGH COUNTY", prefix + "GRAND FORKS COUNTY INC"]
+        canonical = dict(zip(*resolve_entities(names, threshold=0.9).select("name", "canonical")))
+        assert canonical[prefix + "BURLEIGH COUNTY"] == prefix + "BURLEIGH COUNTY"
+        assert canonical[prefix + "GRAND FORKS COUNTY INC"] == prefix + "GRAND FORKS COUNTY"
+
+    def test_keeps_existing_duplicate_edges(self, tmp_path):
+        graph_path = str(tmp_path / "graph.csv")
+        nodes_path = str(tmp_path / "nodes.arrow")
+        pl.DataFrame(
+            {
+                "entity": ["REGISTERED AGENTS INC", "REGISTERED AGENTS INC", "REGISTERED AGENTS, INC."],
+                "company": ["XYLO INC"] * 3,
+                "relationship": ["REGISTERED_AGENT"] * 3,
+            }
+        ).write_csv(graph_path)
+        pl.DataFrame(
+            {
+                "name": ["XYLO INC", "REGISTERED AGENTS INC", "REGISTERED AGENTS, INC."],
+                "label": [""] * 3,
+                "title": ["Company Title: XYLO INC", "REGISTERED_AGENT : REGISTERED AGENTS INC", ""],
+            }
+        ).write_ipc(nodes_path)
+        assert resolve_graph_entities(graph_path, nodes_path) == (1, 2)
+        assert pl.read_csv(graph_path)["entity"].to_list() == ["REGISTERED AGENTS INC"] * 2
+        assert pl.read_ipc(nodes_path, memory_map=False).height == 2
+
+    def test_threshold(self):
+        names = ["DARIN POWELL", "DARIN K POWELL"]
+        assert resolve_entities(names, threshold=0.9)["canonical_id"].n_unique() == 2
+        assert resolve_entities(names, threshold=0.85)["canonical_id"].n_unique() == 1
+
+    def test_pipeline_publishes_resolved_graph(self, tmp_path):
+        pipeline = SayariGraphScrapingPipeline(
+            output_dir=str(tmp_path), docs_dir=str(tmp_path / "docs"),
+            render_mode="off", entity_resolution=True,
+        )
+        pipeline.open_spider(None)
+        pipeline.process_item(make_item(1, "Xylo Inc", "Registered Agents, Inc."), None)
+        pipeline.process_item(make_item(2, "Xeno LLC", "Registered Agents Inc"), None)
+        pipeline.process_item(make_item(3, "Xavier Co", "Registered Agents Inc"), None)
+        pipeline.close_spider(None)
+
+        edges = pl.read_csv(pipeline.graph_path)
+        assert edges["entity"].unique().to_list() == ["REGISTERED AGENTS INC"]
+        nodes = pl.read_ipc(pipeline.nodes_path, memory_map=False)
+        assert nodes.height == 4
+        title = nodes.filter(pl.col("name") == "REGISTERED AGENTS INC")["title"].item()
+        assert "REGISTERED AGENTS, INC." in title
@@ -0,0 +1,35 @@
+import jmespath
+import pytest
+from sayari_graph_scraping.extraction import (
+    ExtractionRule,
+    load_extraction_rules,
+    lower_simple_path,
+)
+
+ITEM = {
+    "TITLE": ["XANADU, LLC", "Limited Liability Company"],
+    "RECORD_NUM": "0000084583",
+    "META": {"TAGS": [{"NAME": "a"}], "NONE": None},
+}
+
+
+class TestExtraction:
+    @pytest.mark.parametrize(
+        "expression",
+        ["TITLE[0]", "TITLE[1]", "TITLE[5]", "TITLE[-1]", "RECORD_NUM", "MISSING",
+         "RECORD_NUM[0]", "TITLE.NAME", "META.TAGS[0].NAME", "META.NONE.KEY"],
+    )
+    def test_lowered_path_matches_jmespath(self, expression):
+        assert lower_simple_path(expression) is not None
+        assert ExtractionRule("rule", expression)(ITEM) == jmespath.search(expression, ITEM)
+
+    def test_complex_expression_uses_jmespath(self):
+        assert lower_simple_path("TITLE[*]") is None
+        rule = ExtractionRule("titles", "length(TITLE)")
+        assert not rule.is_simple_path
+        assert rule(ITEM) == 2
+
+    def test_default_rules(self):
+        rules = load_extraction_rules()
+        assert rules["item"]["company_title"](ITEM) == "XANADU, LLC"
+        assert rules["drawer"]["drawer_details"]({"DRAWER_DETAIL_LIST": []}) == []
@@ -0,0 +1,97 @@
+import random
+import networkx as nx
+from sayari_graph_scraping.graph_db import GraphDatabase
+from sayari_graph_scraping.graph_store import COMPANY, ENTITY, GraphStore
+
+RELATIONSHIPS = ("REGISTERED_AGENT", "COMMERCIAL_REGISTERED_AGENT", "OWNER_NAME")
+
+
+def random_batch(rng, num_companies=40, num_agents=30):
+    graph = GraphStore()
+    for _ in range(rng.randrange(1, 15)):
+        company = f"X CO {rng.randrange(num_companies)}"
+        graph.add_node(company, (COMPANY, "LLC", company))
+        for _ in range(rng.randrange(0, 3)):
+            agent = f"AGENT {rng.randrange(num_agents)}"
+            relationship = rng.choice(RELATIONSHIPS)
+            graph.add_node(agent, (ENTITY, relationship))
+            graph.add_edge(agent, company, relationship)
+    return graph
+
+
+def snapshot(database):
+    cursor = database.conn.cursor()
+    tables = {}
+    for table in ("node_degrees", "relationship_degrees"):
+        cursor.execute(f"SELECT * FROM {table} ORDER BY 1, 2")
+        tables[table] = cursor.fetchall()
+    # Component IDs may differ, compare the partition and sizes
+    cursor.execute("SELECT component_id, node_id FROM node_components")
+    partition = {}
+    for component_id, node_id in cursor.fetchall():
+        partition.setdefault(component_id, set()).add(node_id)
+    cursor.execute("SELECT component_id, size FROM components")
+    sizes = dict(cursor.fetchall())
+    assert sizes == {component_id: len(nodes) for component_id, nodes in partition.items()}
+    tables["components"] = sorted(sorted(nodes) for nodes in partition.values())
+    return tables
+
+
+class TestGraphAnalytics:
+    def test_incremental_matches_rebuild(self, tmp_path):
+        rng = random.Random(7)
+        database = GraphDatabase(str(tmp_path / "graph.sqlite"))
+        for run in range(3):
+            # Each run is a new session, companies written again are replaced
+            database.replaced_companies.clear()
+            for _ in range(10):
+                database.write_graph(random_batch(rng))
+        incremental = snapshot(database)
+        database.analytics.rebuild()
+        assert snapshot(database) == incremental
+
+        cursor = database.conn.cursor()
+        cursor.execute("SELECT entity_id, company_id FROM relationships")
+        G = nx.Graph(cursor.fetchall())
+        assert incremental["components"] == sorted(sorted(c) for c in nx.connected_components(G))
+
+    def test_top_hubs_and_components(self, tmp_path):
+        graph = GraphStore()
+        for i in range(5):
+            graph.add_node(f"X CO {i}", (COMPANY, "LLC", str(i)))
+            graph.add_node("HUB AGENT", (ENTITY, "REGISTERED_AGENT"))
+            graph.add_edge("HUB AGENT", f"X CO {i}", "REGISTERED_AGENT")
+        graph.add_node("OWNER", (ENTITY, "OWNER_NAME"))
+        graph.add_edge("OWNER", "X CO 0", "OWNER_NAME")
+        graph.add_node("X LONE CO", (COMPANY, "LLC", "9"))
+        graph.add_node("LONE AGENT", (ENTITY, "REGISTERED_AGENT"))
+        graph.add_edge("LONE AGENT", "X LONE CO", "REGISTERED_AGENT")
+        database = GraphDatabase(str(tmp_path / "graph.sqlite"))
+        database.write_graph(graph)
+
+        analytics = database.analytics
+        assert analytics.top_hubs(2) == [("HUB AGENT", 5), ("X CO 0", 2)]
+        assert analytics.top_hubs(1, "OWNER_NAME") == [("OWNER", 1)]
+        assert analytics.degree("x co 0") == {"OWNER_NAME": 1, "REGISTERED_AGENT": 1}
+        assert [size for _, size in analytics.largest_components()] == [7, 2]
+        assert analytics.component("Hub Agent")[1] == 7
+
+    def test_replaced_agent_splits_component(self, tmp_path):
+        database = GraphDatabase(str(tmp_path / "graph.sqlite"))
+        graph = GraphStore()
+        for company in ("X ONE", "X TWO"):
+            graph.add_node(company, (COMPANY, "LLC", company))
+            graph.add_node("AGENT", (ENTITY, "REGISTERED_AGENT"))
+            graph.add_edge("AGENT", company, "REGISTERED_AGENT")
+        database.write_graph(graph)
+        assert database.analytics.component("X ONE")[1] == 3
+
+        database.replaced_companies.clear()  # next crawl
+        graph = GraphStore()
+        graph.add_node("X TWO", (COMPANY, "LLC", "X TWO"))
+        graph.add_node("NEW AGENT", (ENTITY, "REGISTERED_AGENT"))
+        graph.add_edge("NEW AGENT", "X TWO", "REGISTERED_AGENT")
+        database.write_graph(graph)
+        assert database.analytics.component("X ONE")[1] == 2
+        assert database.analytics.component("X TWO")[1] == 2
+        assert database.analytics.degree("AGENT") == {"REGISTERED_AGENT": 1}
@@ -0,0 +1,100 @@
+import json
+import os
+import polars as pl
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.graph_batch import build_graph_batch
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+EDGE_CASES = [
+    {"ID": 1, "TITLE": ["x  owners\tinc", "Corp"], "RECORD_NUM": "1", "DRAWER_DETAIL_LIST": [
+        {"LABEL": "Owners", "VALUE": "Ann Lee\n1 Main St"},
+        {"LABEL": "", "VALUE": "  bob   smith "},
+        {"LABEL": "", "VALUE": "Carl"},
+        {"LABEL": "Owner Address", "VALUE": "somewhere"},
+        {"LABEL": "", "VALUE": "not an owner"},
+        {"LABEL": "registered  agent", "VALUE": "Ann Lee"},
+        {"LABEL": None, "VALUE": "no label"},
+    ]},
+    {"ID": 2, "TITLE": ["Yak LLC", "Corp"], "RECORD_NUM": "2", "DRAWER_DETAIL_LIST": [
+        {"LABEL": "Registered Agent", "VALUE": "filtered out"},
+    ]},
+    {"ID": 3, "TITLE": ["Xeno", None], "RECORD_NUM": None, "DRAWER_DETAIL_LIST": []},
+    {"ID": 4, "TITLE": ["Xylo", "Corp"], "RECORD_NUM": "4"},
+    {"ID": 2, "TITLE": ["X Owners Inc", "Corp"], "RECORD_NUM": "2", "DRAWER_DETAIL_LIST": [
+        {"LABEL": "Commercial Registered Agent", "VALUE": "Registered Agents Inc\nPO Box"},
+        {"LABEL": "Owners", "VALUE": "X Owners Inc"},
+    ]},
+]
+
+
+def rowwise(lake, output_dir):
+    pipeline = SayariGraphScrapingPipeline(output_dir=str(output_dir))
+    for item in iter_latest_records(lake):
+        pipeline.process_item(item, None)
+    edges = [
+        (entity, company, attributes["label"])
+        for entity, company, attributes in pipeline.graph.iter_edges()
+    ]
+    nodes = [
+        (name, attributes["label"], attributes["title"])
+        for name, attributes in pipeline.graph.iter_nodes()
+    ]
+    return edges, nodes
+
+
+def batch(lake, output_dir):
+    graph_path = str(output_dir / "graph.csv")
+    nodes_path = str(output_dir / "graph_nodes.arrow")
+    build_graph_batch(lake, graph_path, nodes_path)
+    return (
+        pl.read_csv(graph_path).rows(),
+        pl.read_ipc(nodes_path, memory_map=False).rows(),
+    )
+
+
+class TestGraphBatch:
+    def test_matches_checked_in_graph(self, tmp_path):
+        build_graph_batch(LAKE, str(tmp_path / "graph.csv"), str(tmp_path / "nodes.arrow"))
+        with open(os.path.join(ROOT, "output", "graph.csv")) as expected:
+            assert (tmp_path / "graph.csv").read_text() == expected.read()
+
+    def test_matches_rowwise_pipeline(self, tmp_path):
+        assert batch(LAKE, tmp_path) == rowwise(LAKE, tmp_path)
+
+    def test_matches_rowwise_pipeline_edge_cases(self, tmp_path):
+        lake = tmp_path / "lake.jsonl"
+        lake.write_text("".join(json.dumps(item) + "\n" for item in EDGE_CASES))
+        edges, nodes = batch(str(lake), tmp_path)
+        assert (edges, nodes) == rowwise(str(lake), tmp_path)
+        assert ("BOB SMITH", "X OWNERS INC", "OWNER_NAME") in edges
+        assert ("NOT AN OWNER", "X OWNERS INC", "OWNER_NAME") not in edges
+        # Record 2 was superseded by a later version of the same business
+        assert ("FILTERED OUT", "YAK LLC", "REGISTERED_AGENT") not in edges
+        assert ("X OWNERS INC", "X OWNERS INC", "OWNER_NAME") in edges
+
+    def test_matches_rowwise_pipeline_overlapping_tooltips(self, tmp_path):
+        # One agent name with both relationships, in both orders
+        items = [
+            {"ID": 1, "TITLE": ["X One", "Corp"], "RECORD_NUM": "1", "DRAWER_DETAIL_LIST": [
+                {"LABEL": "Commercial Registered Agent", "VALUE": "Foo"},
+                {"LABEL": "Registered Agent", "VALUE": "Foo"},
+            ]},
+            {"ID": 2, "TITLE": ["X Two", "Corp"], "RECORD_NUM": "2", "DRAWER_DETAIL_LIST": [
+                {"LABEL": "Registered Agent", "VALUE": "Bar"},
+                {"LABEL": "Commercial Registered Agent", "VALUE": "Bar"},
+                {"LABEL": "Owners", "VALUE": "X One"},
+            ]},
+            {"ID": 3, "TITLE": ["X Three", "Corp"], "RECORD_NUM": "3", "DRAWER_DETAIL_LIST": [
+                {"LABEL": "Registered Agent", "VALUE": "Foo"},
+            ]},
+        ]
+        lake = tmp_path / "lake.jsonl"
+        lake.write_text("".join(json.dumps(item) + "\n" for item in items))
+        edges, nodes = batch(str(lake), tmp_path)
+        assert (edges, nodes) == rowwise(str(lake), tmp_path)
+        titles = {name: title for name, _, title in nodes}
+        assert titles["FOO"] == "COMMERCIAL_REGISTERED_AGENT : FOO\nREGISTERED_AGENT : FOO"
+        assert titles["BAR"] == "REGISTERED_AGENT : BAR\nCOMMERCIAL_REGISTERED_AGENT : BAR"
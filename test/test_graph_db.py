@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+from types import SimpleNamespace
+import pytest
+from sayari_graph_scraping.graph_db import GraphDatabase
+from sayari_graph_scraping.pipelines import GraphDatabasePipeline, SayariGraphScrapingPipeline
+from conftest import make_item
+
+
+def load(tmp_path, items, batch_size=5000):
+    pipeline = GraphDatabasePipeline(
+        str(tmp_path / "graph.sqlite"), batch_size=batch_size, output_dir=str(tmp_path / "output")
+    )
+    pipeline.open_spider(None)
+    for item in items:
+        pipeline.process_item(item, None)
+    pipeline.close_spider(None)
+    return GraphDatabase(str(tmp_path / "graph.sqlite"))
+
+
+ITEMS = [
+    make_item(1, "Xylo Inc", "Jane  Doe\n123 Main St", owners=["Bob", "Alice"]),
+    make_item(2, "Xeno LLC", "jane doe"),
+    make_item(3, "Xavier Co", "Acme Agents"),
+    make_item(4, "Yak Corp", "Jane Doe"),  # filtered by title prefix
+]
+
+
+class TestGraphDatabase:
+    def test_who_else_does_agent_represent(self, tmp_path):
+        database = load(tmp_path, ITEMS, batch_size=2)
+        assert database.related_companies("Jane Doe") == [
+            ("XENO LLC", "REGISTERED_AGENT"),
+            ("XYLO INC", "REGISTERED_AGENT"),
+        ]
+        assert database.related_companies("jane doe", "OWNER_NAME") == []
+        assert database.related_entities("Xylo Inc") == [
+            ("ALICE", "OWNER_NAME"),
+            ("BOB", "OWNER_NAME"),
+            ("JANE DOE", "REGISTERED_AGENT"),
+        ]
+        assert database.counts() == {"companies": 3, "entities": 4, "relationships": 5}
+
+    def test_rerun_is_idempotent(self, tmp_path):
+        load(tmp_path, ITEMS).close()
+        database = load(tmp_path, ITEMS, batch_size=1)
+        assert database.counts() == {"companies": 3, "entities": 4, "relationships": 5}
+
+    def test_rerun_replaces_changed_relationships(self, tmp_path):
+        load(tmp_path, ITEMS).close()
+        database = load(tmp_path, [make_item(2, "Xeno LLC", "Acme Agents")])
+        assert database.related_companies("Jane Doe") == [("XYLO INC", "REGISTERED_AGENT")]
+        assert database.related_entities("Xeno LLC") == [("ACME AGENTS", "REGISTERED_AGENT")]
+
+    def test_lookup_uses_index(self, tmp_path):
+        load(tmp_path, ITEMS).close()
+        conn = sqlite3.connect(tmp_path / "graph.sqlite")
+        plan = " ".join(
+            row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT company_id FROM relationships WHERE entity_id = 1"
+            )
+        )
+        assert "USING" in plan and "INDEX" in plan
+
+    def test_missing_names_are_skipped(self, tmp_path, caplog):
+        items = [make_item(5, "Xeon Inc", None, owners=[None, "Bob"]), *ITEMS]
+        database = load(tmp_path, items, batch_size=1)
+        assert "Graph database write failed" not in caplog.text
+        assert database.related_entities("Xeon Inc") == [("BOB", "OWNER_NAME")]
+        assert database.counts() == {"companies": 4, "entities": 4, "relationships": 6}
+
+    @pytest.mark.parametrize("mode, streaming", [("off", False), ("thread", True)])
+    def test_fed_by_graph_pipeline(self, tmp_path, monkeypatch, mode, streaming):
+        graph_pipeline = SayariGraphScrapingPipeline(
+            output_dir=str(tmp_path / "output"), docs_dir=str(tmp_path / "docs"),
+            render_mode="off", offload_mode=mode, streaming=streaming, batch_size=2,
+        )
+        pipeline = GraphDatabasePipeline(str(tmp_path / "graph.sqlite"))
+        itemproc = SimpleNamespace(middlewares=(graph_pipeline, pipeline))
+        spider = SimpleNamespace(crawler=SimpleNamespace(engine=SimpleNamespace(scraper=SimpleNamespace(itemproc=itemproc))))
+        write_threads = set()
+        write_graph = GraphDatabase.write_graph
+
+        def record_thread(database, graph):
+            write_threads.add(threading.current_thread().name)
+            return write_graph(database, graph)
+
+        monkeypatch.setattr(GraphDatabase, "write_graph", record_thread)
+        graph_pipeline.open_spider(spider)
+        pipeline.open_spider(spider)
+        for item in [make_item(5, "Xeon Inc", None), *ITEMS]:
+            graph_pipeline.process_item(item, spider)
+            pipeline.process_item(item, spider)
+        # Scrapy closes pipelines in reverse order
+        pipeline.close_spider(spider)
+        graph_pipeline.close_spider(spider)
+        assert pipeline.extractor.graph.num_edges == 0
+        assert pipeline.extractor.quality is graph_pipeline.quality
+        # Spilled batches are written by the offload worker, the whole graph on close otherwise
+        assert ("item-offload" in write_threads) == streaming
+        database = GraphDatabase(str(tmp_path / "graph.sqlite"))
+        assert database.counts() == {"companies": 4, "entities": 4, "relationships": 5}
+        # The missing agent is counted once, by the graph pipeline's collector
+        assert graph_pipeline.quality.summary()["total_issues"] == 1
@@ -0,0 +1,44 @@
+import os
+import polars as pl
+from sayari_graph_scraping.graph_spill import compact_graph_parts, list_part_runs, load_compacted_graph
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+from conftest import make_item
+
+
+class TestGraphSpill:
+    def test_streaming_flushes_and_compacts(self, tmp_path):
+        pipeline = SayariGraphScrapingPipeline(
+            streaming=True, batch_size=1, output_dir=str(tmp_path)
+        )
+        pipeline.open_spider(None)
+        pipeline.process_item(make_item(1, "Xylo Inc", "Jane Doe"), None)
+        pipeline.process_item(make_item(2, "Xeno LLC", "Jane Doe"), None)
+
+        # Nothing held in memory once the batch size is reached
+        assert pipeline.graph.num_edges == 0
+        assert pipeline.graph.num_nodes == 0
+        assert list_part_runs(pipeline.parts_dir) == [pipeline.part_writer.run_dir]
+
+        num_edges = compact_graph_parts(
+            pipeline.part_writer.run_dir, pipeline.graph_path, pipeline.nodes_path
+        )
+        assert num_edges == 2
+        assert not os.path.exists(pipeline.part_writer.run_dir)
+        graph = pl.read_csv(pipeline.graph_path)
+        assert graph.rows() == [
+            ("JANE DOE", "XYLO INC", "REGISTERED_AGENT"),
+            ("JANE DOE", "XENO LLC", "REGISTERED_AGENT"),
+        ]
+        nodes = pl.read_ipc(pipeline.nodes_path, memory_map=False)
+        assert sorted(nodes["name"]) == ["JANE DOE", "XENO LLC", "XYLO INC"]
+
+    def test_numeric_names_load_as_strings(self, tmp_path):
+        pipeline = SayariGraphScrapingPipeline(
+            streaming=True, batch_size=1, output_dir=str(tmp_path)
+        )
+        pipeline.open_spider(None)
+        pipeline.process_item(make_item(1, "Xylo Inc", "00123"), None)
+        compact_graph_parts(pipeline.part_writer.run_dir, pipeline.graph_path, pipeline.nodes_path)
+        assert not os.path.exists(pipeline.graph_path + ".tmp")
+        edges, nodes = load_compacted_graph(pipeline.graph_path, pipeline.nodes_path)
+        assert edges[0][:2] == ["00123", "XYLO INC"]
@@ -0,0 +1,55 @@
+import numpy as np
+from sayari_graph_scraping.graph_store import COMPANY, ENTITY, TEXT, GraphStore
+from sayari_graph_scraping.node_registry import COMPANY_TOOLTIP, ENTITY_TOOLTIP, NodeRegistry
+
+
+def make_graph():
+    graph = GraphStore()
+    graph.add_node("X CORP", (COMPANY, "LLC", "0000000001"))
+    graph.add_node("JANE DOE", (ENTITY, "REGISTERED_AGENT"))
+    graph.add_edge("JANE DOE", "X CORP", "REGISTERED_AGENT")
+    graph.add_node("XENO INC", (COMPANY, "Corp", "0000000002"))
+    graph.add_node("X CORP", (ENTITY, "OWNER_NAME"))  # company owns another company
+    graph.add_edge("X CORP", "XENO INC", "OWNER_NAME")
+    graph.add_node("JANE DOE", (ENTITY, "REGISTERED_AGENT"))
+    graph.add_edge("JANE DOE", "XENO INC", "REGISTERED_AGENT")
+    return graph
+
+
+class TestGraphStore:
+    def test_interned_columns(self):
+        graph = make_graph()
+        assert graph.node_names == ["X CORP", "JANE DOE", "XENO INC"]
+        src, dst, rel = graph.edge_arrays()
+        assert src.tolist() == [1, 0, 1]
+        assert dst.tolist() == [0, 2, 2]
+        assert rel.dtype == np.uint8
+        assert graph.relationships == ["REGISTERED_AGENT", "OWNER_NAME"]
+
+    def test_tooltips_match_node_registry(self):
+        registry = NodeRegistry()
+        registry.add("X CORP", {"label": "", "title": COMPANY_TOOLTIP.format("X CORP", "LLC", "0000000001")})
+        registry.add("JANE DOE", {"label": "", "title": ENTITY_TOOLTIP.format("REGISTERED_AGENT", "JANE DOE")})
+        registry.add("XENO INC", {"label": "", "title": COMPANY_TOOLTIP.format("XENO INC", "Corp", "0000000002")})
+        registry.add("X CORP", {"label": "", "title": ENTITY_TOOLTIP.format("OWNER_NAME", "X CORP")})
+        assert list(make_graph().iter_nodes()) == list(registry)
+
+    def test_exports(self):
+        graph = make_graph()
+        assert graph.edges_frame().rows() == [
+            ("JANE DOE", "X CORP", "REGISTERED_AGENT"),
+            ("X CORP", "XENO INC", "OWNER_NAME"),
+            ("JANE DOE", "XENO INC", "REGISTERED_AGENT"),
+        ]
+        G = graph.to_networkx()
+        assert G.number_of_edges() == 3
+        assert G.edges["X CORP", "XENO INC"]["label"] == "OWNER_NAME"
+        assert "OWNER_NAME : X CORP" in G.nodes["X CORP"]["title"]
+
+    def test_merge(self):
+        graph = GraphStore()
+        graph.add_node("JANE DOE", (TEXT, "already rendered"))
+        graph.merge(make_graph())
+        assert graph.num_edges == 3
+        assert graph.node_names == ["JANE DOE", "X CORP", "XENO INC"]
+        assert graph.node_title(0) == "already rendered\nREGISTERED_AGENT : JANE DOE"
@@ -0,0 +1,72 @@
+import gzip
+import json
+import networkx as nx
+from sayari_graph_scraping.graph_tiles import assign_tiles, export_graph_tiles, search_prefix
+from sayari_graph_scraping.layout import component_layout_arrays
+
+
+def read_json_gz(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_graph():
+    G = nx.Graph()
+    for i in range(5):
+        G.add_edge("BIG AGENT", f"X{i}", title="REGISTERED_AGENT")
+    G.add_edge("X0", "OWNER", title="OWNER_NAME")
+    G.add_edge("SMALL AGENT", "XY", title="REGISTERED_AGENT")
+    for name in G.nodes:
+        G.nodes[name]["title"] = f"tooltip {name}"
+    return G
+
+
+class TestGraphTiles:
+    def test_small_components_stay_whole(self):
+        G = make_graph()
+        names, _, component_ids = component_layout_arrays(G)
+        home = assign_tiles(G, names, component_ids, max_nodes=10)
+        assert len(set(home.values())) == 1
+
+    def test_large_component_split_by_hub(self):
+        G = make_graph()
+        names, _, component_ids = component_layout_arrays(G)
+        home = assign_tiles(G, names, component_ids, max_nodes=3)
+        # Every tile is within the limit
+        sizes = {}
+        for tile in home.values():
+            sizes[tile] = sizes.get(tile, 0) + 1
+        assert max(sizes.values()) <= 3
+        # Hub tile is filled with the hub's own neighbours
+        hub_tile = home["BIG AGENT"]
+        assert sum(home[name] == hub_tile for name in G.adj["BIG AGENT"]) == 2
+
+    def test_export(self, tmp_path):
+        G = make_graph()
+        data_dir = tmp_path / "data"
+        num_tiles = export_graph_tiles(G, *component_layout_arrays(G), str(data_dir), max_nodes=3)
+        manifest = json.loads((data_dir / "manifest.json").read_text())
+        assert manifest["num_tiles"] == num_tiles
+        assert manifest["hubs"][0]["name"] == "BIG AGENT"
+
+        tiles = [read_json_gz(data_dir / "tiles" / f"{n}.json.gz") for n in range(num_tiles)]
+        assert sorted(node[0] for tile in tiles for node in tile["nodes"]) == sorted(G.nodes)
+        # Every edge is in the tile of both ends, with a pointer to the other tile
+        for u, v in G.edges:
+            for tile in tiles:
+                names = {node[0] for node in tile["nodes"]}
+                if u in names or v in names:
+                    assert [u, v] in [edge[:2] for edge in tile["edges"]] or [v, u] in [
+                        edge[:2] for edge in tile["edges"]
+                    ]
+                    for name in (u, v):
+                        assert name in names or name in tile["external"]
+
+        search = read_json_gz(data_dir / "search" / f"{search_prefix('OWNER')}.json.gz")
+        assert search == {"OWNER": next(
+            n for n, tile in enumerate(tiles) if "OWNER" in {node[0] for node in tile["nodes"]}
+        )}
+
+    def test_search_prefix(self):
+        assert search_prefix("X-Ray, Inc.") == "xr"
+        assert search_prefix("X") == "x_"
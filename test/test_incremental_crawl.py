@@ -0,0 +1,105 @@
+import json
+from scrapy import signals
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+SEARCH_URL = "https://firststop.sos.nd.gov/api/Records/businesssearch"
+ROW = {"TITLE": ["XYLO INC", "Corporation"], "ID": 7, "RECORD_NUM": "0000000007"}
+DRAWER = {"DRAWER_DETAIL_LIST": [{"LABEL": "Registered Agent", "VALUE": "JANE DOE"}]}
+
+
+def make_spider(tmp_path, max_age_days=7):
+    crawler = get_crawler(
+        BusinessSpider,
+        {
+            "INCREMENTAL_CRAWL_ENABLED": True,
+            "CRAWL_STATE_PATH": str(tmp_path / "state.sqlite"),
+            "INCREMENTAL_MAX_AGE_DAYS": max_age_days,
+        },
+    )
+    return BusinessSpider.from_crawler(crawler)
+
+
+def search(spider, row=ROW):
+    body = json.dumps({"rows": {str(row["ID"]): dict(row)}}).encode()
+    request = spider.build_search_request("x")
+    response = TextResponse(SEARCH_URL, body=body, encoding="utf-8", request=request)
+    return list(spider.parse(response))
+
+
+def drawer(spider, request, body=DRAWER, status=200, headers=None):
+    response = TextResponse(
+        request.url,
+        body=json.dumps(body).encode(),
+        encoding="utf-8",
+        status=status,
+        headers=headers,
+        request=request,
+    )
+    items = list(spider.parse_drawer_information(response, **request.cb_kwargs))
+    for item in items:  # exported, as the engine would
+        if isinstance(item, dict):
+            spider.crawler.signals.send_catch_log(signals.item_scraped, item=item, response=response, spider=spider)
+    return items
+
+
+class TestIncrementalCrawl:
+    def test_feed_appends_in_incremental_mode(self, tmp_path):
+        spider = make_spider(tmp_path)
+        feeds = spider.crawler.settings.getdict("FEEDS")
+        assert all(options["overwrite"] is False for options in feeds.values())
+
+    def test_unchanged_business_is_skipped(self, tmp_path):
+        spider = make_spider(tmp_path)
+        (request,) = search(spider)
+        assert len(drawer(spider, request, headers={"ETag": '"v1"'})) == 1
+
+        # Same search row, fetched recently: no drawer request at all
+        assert search(spider) == []
+        # Changed search row is refetched
+        assert len(search(spider, {**ROW, "STATUS": "Dissolved"})) == 1
+        spider.closed("finished")
+
+    def test_stale_business_is_revalidated(self, tmp_path):
+        spider = make_spider(tmp_path)
+        (request,) = search(spider)
+        drawer(spider, request, headers={"ETag": '"v1"'})
+
+        spider.max_age = 0
+        (request,) = search(spider)
+        assert request.headers["If-None-Match"] == b'"v1"'
+        assert drawer(spider, request, status=304) == []
+        # Same drawer content is not written to the data lake again
+        assert drawer(spider, request) == []
+        changed = {"DRAWER_DETAIL_LIST": [{"LABEL": "Registered Agent", "VALUE": "JOHN DOE"}]}
+        assert len(drawer(spider, request, body=changed)) == 1
+        spider.closed("finished")
+
+    def test_changed_row_with_unchanged_drawer_is_written(self, tmp_path):
+        spider = make_spider(tmp_path)
+        (request,) = search(spider)
+        drawer(spider, request, headers={"ETag": '"v1"'})
+
+        dissolved = {**ROW, "STATUS": "Dissolved"}
+        (request,) = search(spider, dissolved)
+        # Same drawer, the new search row still reaches the data lake
+        (item,) = drawer(spider, request)
+        assert item["STATUS"] == "Dissolved" and item["DRAWER_DETAIL_LIST"] == DRAWER["DRAWER_DETAIL_LIST"]
+        assert search(spider, dissolved) == []
+
+        # 304 for a changed row: drawer is fetched again without validators
+        (request,) = search(spider, {**ROW, "STATUS": "Active"})
+        (refetch,) = drawer(spider, request, status=304)
+        assert "If-None-Match" not in refetch.headers
+        (item,) = drawer(spider, refetch)
+        assert item["STATUS"] == "Active"
+        assert spider.in_flight_drawers == {}
+        spider.closed("finished")
+
+    def test_data_lake_keeps_latest_version(self, tmp_path):
+        lake = tmp_path / "company_records.jsonl"
+        lines = [{"ID": 1, "v": 1}, {"ID": 2, "v": 1}, {"ID": 1, "v": 2}]
+        lake.write_text("".join(json.dumps(line) + "\n" for line in lines))
+        assert list(iter_latest_records(str(lake))) == [{"ID": 2, "v": 1}, {"ID": 1, "v": 2}]
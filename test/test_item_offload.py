@@ -0,0 +1,55 @@
+import os
+import threading
+import pytest
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.item_offload import ItemOffloader
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+
+class TestItemOffload:
+    def test_backpressure_and_order(self):
+        consumed = []
+        release = threading.Event()
+
+        def consume(item):
+            release.wait()
+            consumed.append(item)
+
+        offloader = ItemOffloader(consume, max_pending=2, call_from_thread=lambda f: f())
+        deferreds = [offloader.submit(i) for i in range(5)]
+        assert [d.called for d in deferreds] == [True, True, False, False, False]
+        release.set()
+        offloader.close()
+        assert all(d.called for d in deferreds)
+        assert consumed == list(range(5))
+
+    def test_consume_errors_are_logged(self, caplog):
+        consumed = []
+
+        def consume(item):
+            if item == 1:
+                raise ValueError("bad item")
+            consumed.append(item)
+
+        offloader = ItemOffloader(consume, call_from_thread=lambda f: f())
+        for i in range(3):
+            offloader.submit(i)
+        offloader.close()
+        assert consumed == [0, 2]
+        assert "Offloaded item processing failed" in caplog.text
+
+    @pytest.mark.parametrize("mode", ["thread", "process"])
+    def test_matches_checked_in_graph(self, tmp_path, mode):
+        pipeline = SayariGraphScrapingPipeline(
+            output_dir=str(tmp_path), offload_mode=mode, offload_max_pending=16, offload_workers=2
+        )
+        pipeline.open_spider(None)
+        for item in iter_latest_records(LAKE):
+            pipeline.process_item(item, None)
+        pipeline.offloader.close()
+        pipeline.graph.write_csv(str(tmp_path / "graph.csv"))
+        with open(os.path.join(ROOT, "output", "graph.csv")) as expected:
+            assert (tmp_path / "graph.csv").read_text() == expected.read()
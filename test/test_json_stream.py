@@ -0,0 +1,29 @@
+import importlib.util
+import json
+import os
+import pytest
+from sayari_graph_scraping.json_stream import iter_object_items
+
+BACKENDS = ["stdlib"] + (["ijson"] if importlib.util.find_spec("ijson") else [])
+
+SEARCH_SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "experiments",
+    "return_file_format_business_search.json",
+)
+
+
+class TestJsonStream:
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_matches_json_loads(self, backend):
+        with open(SEARCH_SAMPLE, "rb") as f:
+            body = f.read()
+        expected = list(json.loads(body)["rows"].items())
+        assert list(iter_object_items(body, "rows", backend=backend)) == expected
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_errors(self, backend):
+        with pytest.raises(KeyError):
+            list(iter_object_items(b'{"template": {"rows": {}}}', "rows", backend=backend))
+        with pytest.raises(TypeError):
+            list(iter_object_items(b'{"rows": [1, 2]}', "rows", backend=backend))
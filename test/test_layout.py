@@ -0,0 +1,82 @@
+import os
+import networkx as nx
+import numpy as np
+from sayari_graph_scraping import layout
+from sayari_graph_scraping.layout import component_layout, layout_component, spectral_layout
+
+
+def make_graph():
+    G = nx.Graph()
+    # Star: one agent with three companies
+    G.add_edges_from([("AGENT", "XA"), ("AGENT", "XB"), ("AGENT", "XC")])
+    # Cycle, not a star
+    G.add_edges_from([("P", "Q"), ("Q", "R"), ("R", "S"), ("S", "P")])
+    G.add_node("LONELY")
+    return G
+
+
+def box(pos, names):
+    xy = np.array([pos[name] for name in names])
+    return xy.min(axis=0), xy.max(axis=0)
+
+
+class TestLayout:
+    def test_components_do_not_overlap(self):
+        G = make_graph()
+        pos = component_layout(G)
+        assert set(pos) == set(G.nodes)
+        boxes = [box(pos, c) for c in nx.connected_components(G)]
+        for i, (low_a, high_a) in enumerate(boxes):
+            for low_b, high_b in boxes[i + 1:]:
+                overlap = np.all(low_a <= high_b) and np.all(low_b <= high_a)
+                assert not overlap
+
+    def test_star_hub_is_centered(self):
+        G = make_graph()
+        pos = component_layout(G)
+        leaves = np.array([pos[name] for name in ("XA", "XB", "XC")])
+        distances = np.linalg.norm(leaves - pos["AGENT"], axis=1)
+        assert np.allclose(distances, distances[0])
+
+    def test_deterministic_and_parallel_match(self):
+        G = make_graph()
+        serial = component_layout(G)
+        parallel = component_layout(G, workers=2)
+        for name in G.nodes:
+            assert np.allclose(serial[name], parallel[name])
+
+    def test_cache_skips_unchanged_components(self, tmp_path, monkeypatch):
+        cache_path = str(tmp_path / "layout_cache.pkl")
+        G = make_graph()
+        first = component_layout(G, cache_path=cache_path)
+        assert os.path.exists(cache_path)
+
+        laid_out = []
+
+        def counting_layout(n, src, dst, seed=0):
+            laid_out.append(n)
+            return np.zeros((n, 2))
+
+        monkeypatch.setattr(layout, "layout_component", counting_layout)
+        G.add_edge("NEW", "XNEW")
+        second = component_layout(G, cache_path=cache_path)
+        # Only the new component is laid out
+        assert laid_out == [2]
+        assert np.allclose(
+            second["Q"] - second["P"], first["Q"] - first["P"]
+        )
+
+    def test_large_component_spectral(self):
+        G = nx.grid_2d_graph(40, 40)
+        index = {node: i for i, node in enumerate(G.nodes)}
+        edges = np.array([(index[u], index[v]) for u, v in G.edges])
+        pos = spectral_layout(len(index), edges[:, 0], edges[:, 1])
+        assert pos.shape == (1600, 2)
+        assert np.isfinite(pos).all()
+        # Neighbours end up closer than the average pair
+        edge_length = np.linalg.norm(pos[edges[:, 0]] - pos[edges[:, 1]], axis=1).mean()
+        assert edge_length < np.linalg.norm(pos - pos.mean(axis=0), axis=1).mean()
+
+    def test_single_node(self):
+        pos = layout_component(1, np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+        assert pos.shape == (1, 2)
@@ -0,0 +1,107 @@
+import json
+import time
+import pytest
+from scrapy.http import Request, TextResponse
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping.extensions import MetricsExtension
+from sayari_graph_scraping.metrics import NULL_STAGE, Histogram, Metrics, metrics
+from sayari_graph_scraping.middlewares import MetricsSpiderMiddleware
+from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+
+@pytest.fixture
+def registry():
+    yield metrics
+    metrics.configure(False)  # process wide, leave it off for other tests
+
+
+class TestMetrics:
+    def test_disabled_is_noop(self):
+        registry = Metrics()
+        assert registry.stage("pipeline.write_csv") is NULL_STAGE
+        registry.observe("pipeline.write_csv", 1.0)
+        registry.observe_depth("scheduler", 10)
+        registry.inc("items")
+        assert registry.snapshot()["stages"] == {} and registry.snapshot()["counters"] == {}
+
+    def test_histograms_and_exports(self, tmp_path):
+        registry = Metrics(enabled=True)
+        for _ in range(3):
+            with registry.stage("pipeline.write_csv"):
+                pass
+        registry.observe("download", 0.3)
+        for depth in (0, 3, 700):
+            registry.observe_depth("scheduler", depth)
+        registry.inc("items", 2)
+        registry.dump(str(tmp_path / "m.json"), str(tmp_path / "m.prom"), extra={"item_scraped_count": 2})
+
+        snapshot = json.loads((tmp_path / "m.json").read_text())
+        assert snapshot["stages"]["pipeline.write_csv"]["count"] == 3
+        assert snapshot["stages"]["download"]["p50"] == 0.3  # capped at the max
+        assert snapshot["queues"]["scheduler"]["buckets"]["1000"] == 1
+        assert snapshot["gauges"]["scheduler.depth"] == 700
+        assert snapshot["stats"] == {"item_scraped_count": 2}
+        prom = (tmp_path / "m.prom").read_text()
+        assert 'sayari_queue_depth_bucket{queue="scheduler",le="5"} 2' in prom
+        assert 'sayari_queue_depth_count{queue="scheduler"} 3' in prom
+        assert 'sayari_events_total{name="items"} 2' in prom
+        assert 'sayari_stat{name="item_scraped_count"} 2' in prom
+
+        histogram = Histogram((1, 2, float("inf")))
+        for value in (0.5, 1.5, 1.5, 9):
+            histogram.observe(value)
+        assert histogram.counts == [1, 2, 1]
+        assert histogram.quantile(0.5) == 2 and histogram.quantile(1.0) == 9
+
+    @pytest.mark.parametrize("profiler, suffix", [("cprofile", ".prof"), ("sampling", ".folded")])
+    def test_profile_stage(self, tmp_path, profiler, suffix):
+        registry = Metrics()
+        registry.configure(True, "slow", profiler, str(tmp_path / "profile"))
+
+        def slow_stage_work():
+            time.sleep(0.05)
+
+        for _ in range(2):
+            with registry.stage("slow"):
+                slow_stage_work()
+            with registry.stage("other"):
+                pass
+        assert registry.close_profiler() == str(tmp_path / "profile") + suffix
+        if profiler == "sampling":
+            # Collapsed stacks, root first, only samples taken inside the stage
+            stacks = (tmp_path / "profile.folded").read_text().splitlines()
+            assert any(";slow_stage_work (test_metrics.py" in line for line in stacks)
+        assert (tmp_path / ("profile" + suffix)).stat().st_size > 0
+
+    def test_spider_callbacks_and_extension_dump(self, tmp_path, registry):
+        crawler = get_crawler(
+            BusinessSpider,
+            {
+                "METRICS_ENABLED": True,
+                "METRICS_JSON_PATH": str(tmp_path / "metrics.json"),
+                "METRICS_PROMETHEUS_PATH": str(tmp_path / "metrics.prom"),
+                "CRAWL_STATE_PATH": str(tmp_path / "state.sqlite"),
+            },
+        )
+        extension = MetricsExtension.from_crawler(crawler)
+        middleware = MetricsSpiderMiddleware.from_crawler(crawler)
+        spider = BusinessSpider.from_crawler(crawler)
+
+        def parse(response):
+            time.sleep(0.01)
+            yield {"ID": 1}
+            time.sleep(0.01)
+
+        request = Request("https://firststop.sos.nd.gov/api/FilingDetail/business/1/false", callback=parse)
+        response = TextResponse(request.url, body=b"{}", request=request)
+        response.meta["download_latency"] = 0.2
+        middleware.process_spider_input(response, spider)
+        assert list(middleware.process_spider_output(response, parse(response), spider)) == [{"ID": 1}]
+
+        extension.spider_closed(spider, "finished")
+        assert not metrics.enabled
+        snapshot = json.loads((tmp_path / "metrics.json").read_text())
+        assert snapshot["stages"]["spider.parse"]["count"] == 1
+        assert snapshot["stages"]["spider.parse"]["sum"] >= 0.02
+        assert snapshot["stages"]["download"]["count"] == 1
+        assert "spider.parse" in (tmp_path / "metrics.prom").read_text()
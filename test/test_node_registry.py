@@ -0,0 +1,38 @@
+from sayari_graph_scraping.node_registry import NodeRegistry, normalize_name
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+from conftest import make_item
+
+
+class TestNodeRegistry:
+    def test_normalize_name(self):
+        assert normalize_name("  xanadu,   llc ") == "XANADU, LLC"
+        assert normalize_name(None) is None
+
+    def test_add_is_keyed_by_normalized_name(self):
+        registry = NodeRegistry()
+        assert registry.add("Xanadu  llc", {"label": "", "title": "a"})
+        assert not registry.add("XANADU LLC", {"label": "", "title": "a"})
+        assert len(registry) == 1
+        assert "xanadu llc" in registry
+
+    def test_merge_keeps_all_tooltips(self):
+        registry = NodeRegistry()
+        registry.add("X CORP", {"label": "", "title": "Company Title: X CORP"})
+        registry.add("X CORP", {"label": "", "title": "OWNER_NAME : X CORP"})
+        title = registry.get("X CORP")["title"]
+        assert "Company Title: X CORP" in title
+        assert "OWNER_NAME : X CORP" in title
+
+    def test_merge_matches_whole_tooltips(self):
+        registry = NodeRegistry()
+        registry.add("FOO", {"label": "", "title": "COMMERCIAL_REGISTERED_AGENT : FOO"})
+        registry.add("FOO", {"label": "", "title": "REGISTERED_AGENT : FOO"})
+        registry.add("FOO", {"label": "", "title": "COMMERCIAL_REGISTERED_AGENT : FOO"})
+        assert registry.get("FOO")["title"] == "COMMERCIAL_REGISTERED_AGENT : FOO\nREGISTERED_AGENT : FOO"
+
+    def test_pipeline_deduplicates_company_nodes(self):
+        pipeline = SayariGraphScrapingPipeline()
+        pipeline.process_item(make_item(1, "Xylo Inc", "Jane Doe\n1 Main St"), None)
+        pipeline.process_item(make_item(1, "XYLO  INC", "Jane Doe\n1 Main St"), None)
+        assert sorted(pipeline.graph.node_names) == ["JANE DOE", "XYLO INC"]
+        assert pipeline.graph.num_edges == 2
@@ -0,0 +1,49 @@
+import json
+import os
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.parallel_postprocess import build_graph_parallel, split_line_chunks
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+
+def make_lake(tmp_path):
+    """
+    Real lake followed by newer versions of its first 20 businesses,
+    so superseded records and their replacements land in different chunks.
+    """
+    with open(LAKE) as f:
+        lines = f.readlines()
+    updated = []
+    for line in lines[:20]:
+        item = json.loads(line)
+        item["DRAWER_DETAIL_LIST"] = [{"LABEL": "Registered Agent", "VALUE": f"New Agent {item['ID']}"}]
+        updated.append(json.dumps(item) + "\n")
+    lake = tmp_path / "lake.jsonl"
+    lake.write_text("".join(lines + updated))
+    return str(lake)
+
+
+class TestParallelPostprocess:
+    def test_chunks_cover_every_line_once(self, tmp_path):
+        lake = make_lake(tmp_path)
+        lines = []
+        for path, start, end in split_line_chunks([lake], 7):
+            with open(path, "rb") as f:
+                f.seek(start)
+                lines.extend(f.read(end - start).splitlines(keepends=True))
+        with open(lake, "rb") as f:
+            assert lines == f.readlines()
+
+    def test_matches_sequential_pipeline(self, tmp_path):
+        lake = make_lake(tmp_path)
+        sequential = SayariGraphScrapingPipeline(output_dir=str(tmp_path))
+        for item in iter_latest_records(lake):
+            sequential.process_item(item, None)
+
+        parallel = SayariGraphScrapingPipeline(output_dir=str(tmp_path))
+        build_graph_parallel(lake, parallel, workers=2)
+
+        assert list(parallel.graph.iter_edges()) == list(sequential.graph.iter_edges())
+        assert list(parallel.graph.iter_nodes()) == list(sequential.graph.iter_nodes())
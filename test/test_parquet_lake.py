@@ -0,0 +1,72 @@
+import json
+import os
+import pytest
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping.data_lake import iter_latest_records
+from sayari_graph_scraping.graph_batch import build_graph_batch
+from sayari_graph_scraping.parquet_lake import (
+    iter_parquet_records,
+    list_parquet_parts,
+    scan_parquet_lake,
+)
+from sayari_graph_scraping.pipelines import ParquetLakePipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAKE = os.path.join(ROOT, "output", "company_records.jsonl")
+
+
+def write_parquet_lake(lake_dir, records, overwrite=True, resume=False):
+    pipeline = ParquetLakePipeline(str(lake_dir), row_group_size=50, overwrite=overwrite, resume=resume)
+    pipeline.open_spider(None)
+    for record in records:
+        pipeline.process_item(record, None)
+    pipeline.close_spider(None)
+
+
+def lake_records():
+    with open(LAKE) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestParquetLake:
+    def test_disabled_by_setting(self):
+        crawler = get_crawler(settings_dict={"PARQUET_LAKE_ENABLED": False})
+        with pytest.raises(NotConfigured):
+            ParquetLakePipeline.from_crawler(crawler)
+
+    def test_row_groups_and_projection(self, tmp_path):
+        write_parquet_lake(tmp_path, lake_records())
+        assert len(list_parquet_parts(str(tmp_path))) == 5  # 216 records, 50 per row group
+        titles = scan_parquet_lake(str(tmp_path)).select("TITLE", "RECORD_NUM").collect()
+        assert titles.columns == ["TITLE", "RECORD_NUM"]
+        assert titles.height == 216
+
+    def test_same_records_and_graph_as_jsonl(self, tmp_path):
+        records = lake_records()
+        write_parquet_lake(tmp_path / "lake", records)
+        parquet_records = list(iter_parquet_records(str(tmp_path / "lake")))
+        assert [r["ID"] for r in parquet_records] == [r["ID"] for r in iter_latest_records(LAKE)]
+        assert parquet_records[0]["DRAWER_DETAIL_LIST"][0]["LABEL"] == "Filing Type"
+
+        build_graph_batch(str(tmp_path / "lake"), str(tmp_path / "graph.csv"), str(tmp_path / "nodes.arrow"))
+        with open(os.path.join(ROOT, "output", "graph.csv")) as expected:
+            assert (tmp_path / "graph.csv").read_text() == expected.read()
+
+    def test_overwrite_and_append(self, tmp_path):
+        records = lake_records()
+        write_parquet_lake(tmp_path, records[:10])
+        write_parquet_lake(tmp_path, records[10:20], overwrite=False)
+        assert len(list(iter_parquet_records(str(tmp_path)))) == 20
+        write_parquet_lake(tmp_path, records[:3])
+        assert len(list(iter_parquet_records(str(tmp_path)))) == 3
+
+    def test_resumed_crawl_keeps_interrupted_parts(self, tmp_path):
+        records = lake_records()
+        write_parquet_lake(tmp_path, records[:10])  # earlier crawl
+        write_parquet_lake(tmp_path, records[10:20])  # interrupted crawl
+        write_parquet_lake(tmp_path, records[20:30], resume=True)
+        assert [r["ID"] for r in iter_parquet_records(str(tmp_path))] == [r["ID"] for r in records[10:30]]
+        # Without a crawl to continue, resume starts a new crawl
+        write_parquet_lake(tmp_path / "new", records[:3], resume=True)
+        assert len(list(iter_parquet_records(str(tmp_path / "new")))) == 3
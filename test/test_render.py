@@ -0,0 +1,35 @@
+import networkx as nx
+import numpy as np
+from sayari_graph_scraping.layout import component_layout_arrays
+from sayari_graph_scraping.render import graph_arrays, render_png, render_tiles
+
+
+def make_arrays():
+    G = nx.Graph()
+    G.add_edges_from([("AGENT", "XA"), ("AGENT", "XB"), ("P", "Q")])
+    G.add_node("LONELY")
+    return G, graph_arrays(G, *component_layout_arrays(G))
+
+
+class TestRender:
+    def test_graph_arrays(self):
+        G, (xy, colors, segments) = make_arrays()
+        assert xy.shape == (6, 2)
+        assert segments.shape == (3, 2, 2)
+        # One colour per component
+        assert len(np.unique(colors)) == 3
+
+    def test_render_png(self, tmp_path):
+        _, arrays = make_arrays()
+        render_png(str(tmp_path / "graph.png"), *arrays)
+        render_png(str(tmp_path / "sampled.png"), *arrays, max_points=2)
+        assert (tmp_path / "graph.png").stat().st_size > 0
+        assert (tmp_path / "sampled.png").stat().st_size > 0
+
+    def test_render_tiles(self, tmp_path):
+        _, arrays = make_arrays()
+        paths = render_tiles(str(tmp_path / "tiles"), *arrays, tiles=2)
+        assert sorted(p.name for p in (tmp_path / "tiles").iterdir()) == [
+            "tile_0_0.png", "tile_0_1.png", "tile_1_0.png", "tile_1_1.png",
+        ]
+        assert len(paths) == 4
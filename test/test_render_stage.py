@@ -0,0 +1,52 @@
+import json
+import os
+from sayari_graph_scraping.pipelines import SayariGraphScrapingPipeline
+from sayari_graph_scraping.render_stage import claim_newest_job, run_render_worker
+from conftest import make_item
+
+
+def crawl(tmp_path, render_mode):
+    pipeline = SayariGraphScrapingPipeline(
+        output_dir=str(tmp_path / "output"),
+        docs_dir=str(tmp_path / "docs"),
+        render_mode=render_mode,
+    )
+    pipeline.open_spider(None)
+    pipeline.process_item(make_item(1, "Xylo Inc", "Jane Doe"), None)
+    pipeline.process_item(make_item(2, "Xeno LLC", "Jane Doe"), None)
+    pipeline.close_spider(None)
+    return pipeline
+
+
+class TestRenderStage:
+    def test_queue_mode_publishes_without_rendering(self, tmp_path):
+        pipeline = crawl(tmp_path, "queue")
+        artifact = json.loads((tmp_path / "output" / "graph_artifact.json").read_text())
+        assert artifact["num_edges"] == 2
+        assert os.path.exists(artifact["nodes_path"])
+        assert len(os.listdir(os.path.join(pipeline.render_queue_dir, "pending"))) == 1
+        assert not (tmp_path / "output" / "knowledge_graph.png").exists()
+
+    def test_worker_renders_newest_job(self, tmp_path):
+        pipeline = crawl(tmp_path, "queue")
+        crawl(tmp_path, "queue")  # second crawl supersedes the first job
+        assert run_render_worker(pipeline.render_queue_dir)
+        assert (tmp_path / "output" / "knowledge_graph.png").exists()
+        assert (tmp_path / "docs" / "index.html").exists()
+        assert len(os.listdir(os.path.join(pipeline.render_queue_dir, "done"))) == 1
+        assert os.listdir(os.path.join(pipeline.render_queue_dir, "pending")) == []
+        # Nothing left to do
+        assert claim_newest_job(pipeline.render_queue_dir) is None
+
+    def test_failed_render_is_kept(self, tmp_path):
+        pipeline = crawl(tmp_path, "queue")
+        os.remove(pipeline.nodes_path)
+        assert not run_render_worker(pipeline.render_queue_dir)
+        (failed,) = os.listdir(os.path.join(pipeline.render_queue_dir, "failed"))
+        job = json.loads(open(os.path.join(pipeline.render_queue_dir, "failed", failed)).read())
+        assert "Traceback" in job["status"]
+
+    def test_off_mode(self, tmp_path):
+        pipeline = crawl(tmp_path, "off")
+        assert (tmp_path / "output" / "graph_artifact.json").exists()
+        assert not os.path.exists(pipeline.render_queue_dir)
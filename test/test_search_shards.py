@@ -0,0 +1,101 @@
+import json
+from scrapy.http import TextResponse
+from scrapy.spidermiddlewares.depth import DepthMiddleware
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping.crawl_state import CrawlStateStore
+from sayari_graph_scraping.search_shards import SearchShardPlanner
+from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+
+def make_spider(tmp_path, **settings):
+    crawler = get_crawler(
+        BusinessSpider,
+        {"CRAWL_STATE_PATH": str(tmp_path / "state.sqlite"), **settings},
+    )
+    return BusinessSpider.from_crawler(crawler)
+
+
+def search_response(request, ids):
+    rows = {str(i): {"ID": i, "TITLE": [f"X{i}", "Corporation"]} for i in ids}
+    body = json.dumps({"rows": rows}).encode()
+    return TextResponse(request.url, body=body, encoding="utf-8", request=request)
+
+
+class TestSearchShards:
+    def test_resume_unfinished_shards(self, tmp_path):
+        store = CrawlStateStore(str(tmp_path / "state.sqlite"))
+        planner = SearchShardPlanner("AB", store=store)
+        assert planner.initial_shards() == ["A", "B"]
+
+        # Shard A finishes, B has a drawer in flight when the crawl dies
+        planner.shard_parsed("A", 0)
+        planner.drawer_scheduled("B")
+        planner.shard_parsed("B", 1)
+        assert SearchShardPlanner("AB", store=store).initial_shards() == ["B"]
+
+        planner.drawer_finished("B")
+        # Everything finished, next crawl starts over
+        assert SearchShardPlanner("AB", store=store).initial_shards() == ["A", "B"]
+        store.close()
+
+    def test_shard_with_failed_drawer_stays_pending(self, tmp_path):
+        store = CrawlStateStore(str(tmp_path / "state.sqlite"))
+        planner = SearchShardPlanner("AB", store=store)
+        planner.initial_shards()
+        for shard in "AB":
+            planner.drawer_scheduled(shard)
+            planner.shard_parsed(shard, 1)
+        planner.drawer_finished("A")
+        planner.drawer_failed("B")
+        assert store.unfinished_shards() == ["B"]
+        store.close()
+
+    def test_large_shard_splits_and_rows_are_deduped(self, tmp_path):
+        spider = make_spider(
+            tmp_path,
+            SEARCH_SHARD_PREFIXES="XY",
+            SEARCH_SHARD_MAX_ROWS=3,
+            SEARCH_SHARD_SPLIT_ALPHABET="AB",
+        )
+        shard_x, shard_y = list(spider.start_requests())
+        assert json.loads(shard_x.body)["SEARCH_VALUE"] == "X"
+
+        output = list(spider.parse(search_response(shard_x, [1, 2, 4])))
+        searches = [r.meta["shard"] for r in output if r.callback == spider.parse]
+        drawers = [r for r in output if r.callback == spider.parse_drawer_information]
+        assert searches == ["XA", "XB"]
+        assert len(drawers) == 3
+
+        # Business 2 was already requested by shard X
+        output = list(spider.parse(search_response(shard_y, [2, 3])))
+        assert [r.meta["business_id"] for r in output] == [3]
+        spider.closed("finished")
+
+    def test_deep_splits_are_within_depth_limit(self, tmp_path):
+        spider = make_spider(
+            tmp_path,
+            SEARCH_SHARD_PREFIXES="X",
+            SEARCH_SHARD_MAX_ROWS=1,
+            SEARCH_SHARD_SPLIT_ALPHABET="A",
+            SEARCH_SHARD_MAX_PREFIX_LEN=3,
+        )
+        depth = DepthMiddleware.from_crawler(spider.crawler)
+        (request,) = spider.start_requests()
+        for shard in ("XA", "XAA", None):
+            response = search_response(request, [len(request.meta["shard"])])
+            output = list(depth.process_spider_output(response, spider.parse(response), spider))
+            if shard:
+                (request,) = [r for r in output if r.callback == spider.parse and r.meta["shard"] == shard]
+        # Longest prefix: no more splits, its drawer is not dropped
+        assert [(r.meta["business_id"], r.meta["depth"]) for r in output] == [(3, 3)]
+        spider.closed("finished")
+
+    def test_streaming_and_full_decode_yield_same_requests(self, tmp_path):
+        requests = {}
+        for streaming in (True, False):
+            spider = make_spider(tmp_path, SEARCH_STREAMING_JSON_ENABLED=streaming)
+            (shard,) = list(spider.start_requests())
+            output = spider.parse(search_response(shard, [5, 6, 7]))
+            requests[streaming] = [(r.url, r.cb_kwargs) for r in output]
+            spider.closed("finished")
+        assert requests[True] == requests[False]
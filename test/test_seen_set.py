@@ -0,0 +1,110 @@
+import json
+from scrapy import signals
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+from sayari_graph_scraping import seen_set
+from sayari_graph_scraping.seen_set import DrawerSeenSet, drawer_key
+from sayari_graph_scraping.spiders.sayari_spider import BusinessSpider
+
+
+def make_spider(tmp_path, resume=True):
+    crawler = get_crawler(
+        BusinessSpider,
+        {
+            "CRAWL_STATE_PATH": str(tmp_path / "state.sqlite"),
+            "DRAWER_SEEN_SET_PATH": str(tmp_path / "drawer_seen.npy"),
+            "SEARCH_SHARD_PREFIXES": "XY",
+            "SEARCH_SHARD_RESUME": resume,
+        },
+    )
+    return BusinessSpider.from_crawler(crawler)
+
+
+def search_response(request, ids):
+    rows = {str(i): {"ID": i, "TITLE": [f"X{i}", "Corporation"]} for i in ids}
+    body = json.dumps({"rows": rows}).encode()
+    return TextResponse(request.url, body=body, encoding="utf-8", request=request)
+
+
+def drawer_response(request):
+    body = json.dumps({"DRAWER_DETAIL_LIST": []}).encode()
+    return TextResponse(request.url, body=body, encoding="utf-8", request=request)
+
+
+def fetch(spider, request, exported=True):
+    """
+    Run a drawer callback. With exported, its items reach the feed.
+    """
+    response = drawer_response(request)
+    items = list(spider.parse_drawer_information(response, **request.cb_kwargs))
+    if exported:
+        for item in items:
+            spider.crawler.signals.send_catch_log(signals.item_scraped, item=item, response=response, spider=spider)
+    return items
+
+
+class TestSeenSet:
+    def test_membership_and_persistence(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(seen_set, "MERGE_EVERY", 100)
+        path = str(tmp_path / "seen.npy")
+        seen = DrawerSeenSet(path)
+        keys = [drawer_key(i * 7919) for i in range(1000)] + [drawer_key("abc")]
+        for key in keys:
+            seen.add(key)
+        assert len(seen.pending) < 100
+        assert all(key in seen for key in keys)
+        assert drawer_key(3) not in seen and drawer_key("abd") not in seen
+        seen.save()
+        assert seen.ids.nbytes == 8 * len(keys)
+
+        loaded = DrawerSeenSet(path)
+        assert len(loaded) == len(keys) and drawer_key("abc") in loaded
+        loaded.clear()
+        assert len(DrawerSeenSet(path)) == 0
+
+    def test_coalesce_and_resume(self, tmp_path):
+        spider = make_spider(tmp_path)
+        shard_x, shard_y = spider.start_requests()
+        (drawer_1, drawer_2) = spider.parse(search_response(shard_x, [1, 2]))
+        # Business 2 is in flight, shard Y waits on the same request
+        (drawer_3,) = spider.parse(search_response(shard_y, [2, 3]))
+        assert spider.crawler.stats.get_value("drawers/coalesced") == 1
+        fetch(spider, drawer_1)
+        fetch(spider, drawer_3, exported=False)
+        assert spider.state_store.unfinished_shards() == ["X", "Y"]
+        # Crawl dies: drawer 2 never came back, the item of drawer 3 never reached the feed
+        spider.closed("shutdown")
+
+        spider = make_spider(tmp_path)
+        assert [r.meta["shard"] for r in spider.start_requests()] == ["X", "Y"]
+        # Resumed crawls append, the item of drawer 1 is kept
+        feeds = spider.crawler.settings.getdict("FEEDS")
+        assert all(options["overwrite"] is False for options in feeds.values())
+        # Only drawers without an exported item are requested again
+        requests = list(spider.parse(search_response(shard_x, [1, 2])))
+        requests += spider.parse(search_response(shard_y, [2, 3]))
+        assert [r.meta["business_id"] for r in requests] == [2, 3]
+        for request in requests:
+            fetch(spider, request)
+        assert spider.state_store.unfinished_shards() == []
+        spider.closed("finished")
+
+        # Next crawl starts fresh
+        spider = make_spider(tmp_path)
+        list(spider.start_requests())
+        assert len(spider.seen_drawers) == 0
+        spider.closed("finished")
+
+    def test_seen_set_cleared_when_outputs_are_overwritten(self, tmp_path):
+        spider = make_spider(tmp_path)
+        shard_x, _ = spider.start_requests()
+        (drawer_1,) = spider.parse(search_response(shard_x, [1]))
+        fetch(spider, drawer_1)
+        spider.closed("shutdown")  # shard Y never came back
+
+        # Not resumed, the feed is overwritten and drawer 1 is fetched again
+        spider = make_spider(tmp_path, resume=False)
+        feeds = spider.crawler.settings.getdict("FEEDS")
+        assert all(options["overwrite"] for options in feeds.values())
+        shard_x, _ = spider.start_requests()
+        assert [r.meta["business_id"] for r in spider.parse(search_response(shard_x, [1]))] == [1]